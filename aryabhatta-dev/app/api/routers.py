@@ -1,6 +1,12 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.api.version1 import pricing
+from app.api.version1 import pricing, rate_card
+from app.calculator.motor_adaptor import MotorAdaptor
+from app.services.dataverse import Dataverse
+from app.services.premium_cache import PremiumCache
+from app.services.warm_up import WarmUp
+from app.utils.timing import Timing
 
 api_router = APIRouter()
 
@@ -13,4 +19,34 @@ def health_check() -> dict:
     }
 
 
+@api_router.get("/ready")
+def ready() -> JSONResponse:
+    if not WarmUp.is_ready():
+        return JSONResponse(status_code=503, content={
+            "status": 1,
+            "message": "Server is warming up.",
+            "warm_up": WarmUp.status()
+        })
+    return JSONResponse(content={
+        "status": 0,
+        "message": "Server is ready.",
+        "warm_up": WarmUp.status()
+    })
+
+
+@api_router.get("/cache_stats")
+def cache_stats() -> dict:
+    return {
+        "dataverse": Dataverse.stats(),
+        "premium": PremiumCache.stats(),
+        "single_flight": MotorAdaptor.in_flight.stats()
+    }
+
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    return Timing.exposition() + "\n".join(MotorAdaptor.in_flight.exposition()) + "\n"
+
+
 api_router.include_router(pricing.router, prefix="/v1", tags=["pricing"])
+api_router.include_router(rate_card.router, prefix="/v1", tags=["rate_card"])
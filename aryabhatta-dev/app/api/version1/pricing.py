@@ -1,19 +1,21 @@
 import logging
-from typing import Union
+from typing import List, Union
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
 from app.calculator.motor_adaptor import MotorAdaptor
 from app.schema.pricing import DiscountRequest, DiscountResponse, PriceRequest, PriceResponse, \
-    IdvRangeResponse
+    IdvRangeResponse, BatchPriceRequest, PriceSweepRequest, PriceSweepResponse
 from app.utils.code_utils import calculate_vehicle_age
+from app.utils.responses import PricingJSONResponse
 from app.services.db_interactions import Pricing
+from app.settings import PRICING_SWEEP_MAX_POINTS
 
 router = APIRouter()
 logger = logging.getLogger("api")
 
 
-@router.post("/calculate_premium/", response_model=Union[PriceResponse, None])
+@router.post("/calculate_premium/", response_model=Union[PriceResponse, None], response_class=PricingJSONResponse)
 async def calculate_premium(price_request: PriceRequest):
     """
     this method calculate the price for passed quote request for specific insurer
@@ -27,7 +29,52 @@ async def calculate_premium(price_request: PriceRequest):
                 "".format(price_request.get("quote_request_id"), price_request))
 
     vehicle_premium = await MotorAdaptor().compute_premium(vehicle_data=price_request)
-    return vehicle_premium
+    return PricingJSONResponse(vehicle_premium)
+
+
+@router.post("/calculate_batch_premium/", response_model=List[PriceResponse], response_class=PricingJSONResponse)
+async def calculate_batch_premium(batch_price_request: BatchPriceRequest):
+    """
+    this method calculate the price for passed quote request for every insurer in the request,
+    vehicle details are resolved once and shared by all insurers
+
+    :param batch_price_request
+    :return: list: premium breakup for each insurer which could be priced
+    """
+    price_request = batch_price_request.dict()
+    insurers = price_request.pop("insurers")
+    logger.info("Batch pricing request received to compute premium for transaction id: {} for insurers {}"
+                "".format(price_request.get("quote_request_id"), [insurer["insurer_code"] for insurer in insurers]))
+
+    vehicle_premiums = await MotorAdaptor().compute_batch_premium(vehicle_data=price_request, insurers=insurers)
+    return PricingJSONResponse(vehicle_premiums)
+
+
+@router.post("/calculate_premium_sweep/", response_model=Union[PriceSweepResponse, None],
+             response_class=PricingJSONResponse)
+async def calculate_premium_sweep(price_sweep_request: PriceSweepRequest):
+    """
+    this method calculate the price for passed quote request for every combination of idv, OD discount
+    and addon set in the request, the quote request is resolved once for the whole grid
+
+    :param price_sweep_request
+    :return: dict: {"quote_request_id": uuid, "quote_id": uuid, "points": premium of each combination}
+    """
+    price_request = price_sweep_request.dict()
+    idv_values = price_request.pop("idv_values")
+    discount_percents = price_request.pop("discount_percents")
+    addon_sets = price_request.pop("addon_sets")
+    grid_points = len(idv_values) * len(discount_percents) * max(len(addon_sets or []), 1)
+    if grid_points > PRICING_SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Sweep of {grid_points} points is above the maximum of "
+                                                    f"{PRICING_SWEEP_MAX_POINTS}.")
+    logger.info("Pricing sweep request received to compute {} premiums for transaction id: {} - {}"
+                "".format(grid_points, price_request.get("quote_request_id"), price_request))
+
+    vehicle_premiums = await MotorAdaptor().compute_premium_sweep(
+        vehicle_data=price_request, idv_values=idv_values, discount_percents=discount_percents,
+        addon_sets=addon_sets)
+    return PricingJSONResponse(vehicle_premiums)
 
 
 @router.get("/idv_range/", response_model=IdvRangeResponse)
@@ -0,0 +1,39 @@
+import logging
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+
+from app.schema.pricing import RateCardLoadReport
+from app.services.rate_card_loader import RateCardLoader
+from app.services.rate_engine import RateEngine
+from app.settings import RATE_ENGINE_ENABLED
+from app.utils.exceptions import RateCardValidationException
+
+router = APIRouter()
+logger = logging.getLogger("api")
+
+
+@router.post("/rate_card/{table_name}/", response_model=RateCardLoadReport)
+async def upload_rate_card(table_name: str, rate_card_file: UploadFile = File(...),
+                           insurer_code: Optional[str] = Form(default=None),
+                           valid_from: Optional[datetime] = Form(default=None)):
+    """
+    this method bulk loads a CSV or Parquet rate card into the rate table, replacing the current card of
+    the table (or of the insurer for the addon price tables) at once
+
+    :return: dict: row counts and throughput of the load
+    """
+    logger.info(f"Rate card {rate_card_file.filename} received for {table_name} of insurer {insurer_code}")
+    try:
+        report = await RateCardLoader.load(
+            table_name=table_name, source=rate_card_file.file,
+            file_format=RateCardLoader.file_format(rate_card_file.filename), insurer_code=insurer_code,
+            valid_from=valid_from)
+    except RateCardValidationException as e:
+        raise HTTPException(status_code=400, detail={"message": e.message, "errors": e.errors})
+    # published from this worker whether or not it is the snapshot loader, the other workers map the new
+    # snapshot (or read the new card) on their next refresh
+    if RATE_ENGINE_ENABLED:
+        await RateEngine.load(publish=True)
+    return report
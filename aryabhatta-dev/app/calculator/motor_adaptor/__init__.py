@@ -1,17 +1,29 @@
+import asyncio
+import hashlib
+import json
 import logging
-from datetime import datetime
-from typing import Union
+from datetime import date, datetime
+from typing import List, Optional, Union
 
-from pytz import timezone
-from rb_utils.async_http_client import AsyncHttpClient
+import numpy as np
 
 from app.calculator.base import Adaptor
 from app.calculator.motor_adaptor.addon_premium_calculator import AddonPremiumCalculator
+from app.calculator.motor_adaptor.book_premium_calculator import BookPremiumCalculator
 from app.calculator.motor_adaptor.component_calculation import ComponentCalculator
 from app.calculator.motor_adaptor.od_premium_calculator import ODPremiumCalculator
 from app.calculator.motor_adaptor.tp_premium_calculator import TPPremiumCalculator
-from app.schema.pricing import PriceResponse
-from app.settings import SERVICE_CREDENTIALS
+from app.schema.pricing import PriceResponse, PriceSweepPoint, PriceSweepResponse
+from app.services.dataverse import Dataverse
+from app.services.db_interactions import Pricing
+from app.services.premium_cache import PremiumCache
+from app.services.rate_engine import RateEngine
+from app.settings import BATCH_PRICING_CONCURRENCY, DATAVERSE_CALL_TIMEOUT_SECONDS, PREMIUM_CACHE_ENABLED, \
+    PRICING_SINGLE_FLIGHT_ENABLED
+from app.utils.code_utils import india_date, round_array
+from app.utils.fan_out import FanOut
+from app.utils.single_flight import SingleFlight
+from app.utils.timing import Timing
 
 
 class MotorAdaptor(Adaptor):
@@ -19,9 +31,82 @@ class MotorAdaptor(Adaptor):
     addon_premium = AddonPremiumCalculator()
     od_premium = ODPremiumCalculator()
     tp_premium = TPPremiumCalculator()
+    in_flight = SingleFlight(name="compute_premium")
 
     @classmethod
     async def compute_premium(cls, vehicle_data: dict) -> Union[PriceResponse, None]:
+        """
+        Identical price requests arriving while one is being priced, retries and double clicks, share its
+        computation and its response instead of pricing again.
+        """
+        if not PRICING_SINGLE_FLIGHT_ENABLED:
+            return await cls.compute_request_premium(vehicle_data)
+        return await cls.in_flight.run(cls.request_key(vehicle_data),
+                                       lambda: cls.compute_request_premium(vehicle_data))
+
+    @classmethod
+    def request_key(cls, vehicle_data: dict) -> str:
+        canonical = json.dumps(vehicle_data, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(f"{date.today().isoformat()}|{canonical}".encode()).hexdigest()
+
+    @classmethod
+    async def compute_request_premium(cls, vehicle_data: dict) -> Union[PriceResponse, None]:
+        with Timing.stage("compute_premium"):
+            with Timing.stage("infuse_model_data"):
+                vehicle_data = await cls.infuse_model_data(vehicle_data)
+            return await cls.compute_infused_premium(vehicle_data)
+
+    @classmethod
+    async def compute_batch_premium(cls, vehicle_data: dict, insurers: List[dict]) -> List[PriceResponse]:
+        """
+        Prices one vehicle for every insurer in insurers. The variant, RTO and tenure details are resolved
+        once and shared, then each insurer is priced concurrently. Insurers which fail to price are logged
+        and left out of the response.
+
+        :param vehicle_data: dict: price request without the insurer specific fields
+        :param insurers: list of dict with insurer_code and optionally insurer_logo, quote_id, discount_percent
+        :return: list of PriceResponse in the order of insurers
+        """
+        logger = logging.getLogger("app")
+        with Timing.stage("infuse_model_data"):
+            vehicle_data = await cls.infuse_model_data(vehicle_data)
+        semaphore = asyncio.Semaphore(BATCH_PRICING_CONCURRENCY)
+
+        async def price_insurer(insurer: dict):
+            insurer_vehicle_data = dict(vehicle_data)
+            insurer_vehicle_data.update({key: value for key, value in insurer.items() if value is not None})
+            async with semaphore:
+                return await cls.compute_infused_premium(insurer_vehicle_data)
+
+        results = await asyncio.gather(*[price_insurer(insurer) for insurer in insurers], return_exceptions=True)
+        response_data = []
+        for insurer, result in zip(insurers, results):
+            if isinstance(result, Exception):
+                logger.error(f"Exception encounter {result} while pricing insurer {insurer['insurer_code']} for "
+                             f"quote request id {vehicle_data['quote_request_id']}.")
+            elif result:
+                response_data.append(result)
+        return response_data
+
+    @classmethod
+    async def compute_infused_premium(cls, vehicle_data: dict) -> Union[PriceResponse, None]:
+        """
+        Prices vehicle data already infused with its dataverse details, answered from the premium cache
+        when the same inputs were priced against the current pricing data.
+        """
+        cache_key = PremiumCache.key(vehicle_data) if PREMIUM_CACHE_ENABLED else None
+        if cache_key:
+            cached_premium = await PremiumCache.get(cache_key, vehicle_data)
+            if cached_premium:
+                return cached_premium
+
+        vehicle_premium = await cls.calculate_infused_premium(vehicle_data)
+        if vehicle_premium and cache_key:
+            await PremiumCache.set(cache_key, vehicle_premium)
+        return vehicle_premium
+
+    @classmethod
+    async def calculate_infused_premium(cls, vehicle_data: dict) -> Union[PriceResponse, None]:
         pricing_data = {
             "quote_request_id": vehicle_data["quote_request_id"],
             "quote_id": vehicle_data["quote_id"],
@@ -33,21 +118,22 @@ class MotorAdaptor(Adaptor):
         logger = logging.getLogger("app")
         net_premium = 0
 
-        vehicle_data = await cls.infuse_model_data(vehicle_data)
-
-        idv_depreciation_rate = await cls.component_calculator.get_idv_depreciation_rate(
-            vehicle_age=vehicle_data["vehicle_age"])
+        with Timing.stage("depreciation"):
+            idv_depreciation_rate = await cls.component_calculator.get_idv_depreciation_rate(
+                vehicle_age=vehicle_data["vehicle_age"])
 
         # depreciated_total_idv = vehicle_data["idv"] * idv_depreciation_rate.response_data["depreciation_rate"]
         depreciated_total_idv = vehicle_data["idv"]
 
-        is_breakin, left_days = await cls.checking_isbreakin_case(vehicle_data)
+        with Timing.stage("checking_isbreakin_case"):
+            is_breakin, left_days = await cls.checking_isbreakin_case(vehicle_data)
 
         if vehicle_data["od_tenure"] != 0:
-            basic_od_details = await cls.od_premium.calculate_basic_od_premium(
-                vehicle_data=vehicle_data, vehicle_idv=vehicle_data["idv"],
-                depreciation_rate=idv_depreciation_rate.response_data["depreciation_rate"], is_breakin=is_breakin,
-                left_days=left_days)
+            with Timing.stage("od_premium"):
+                basic_od_details = await cls.od_premium.calculate_basic_od_premium(
+                    vehicle_data=vehicle_data, vehicle_idv=vehicle_data["idv"],
+                    depreciation_rate=idv_depreciation_rate.response_data["depreciation_rate"], is_breakin=is_breakin,
+                    left_days=left_days)
             if not basic_od_details.status:
                 logger.exception(f"Error encounter while calculating OD premium for vehicle data {vehicle_data}")
                 return None
@@ -58,8 +144,9 @@ class MotorAdaptor(Adaptor):
             pricing_data["total_idv"] = basic_od_details.total_idv
 
         if vehicle_data["tp_tenure"] != 0:
-            basic_tp_details = await cls.tp_premium.calculate_basic_tp_premium(vehicle_data=vehicle_data,
-                                                                               is_breakin=is_breakin)
+            with Timing.stage("tp_premium"):
+                basic_tp_details = await cls.tp_premium.calculate_basic_tp_premium(vehicle_data=vehicle_data,
+                                                                                   is_breakin=is_breakin)
             if not basic_tp_details.status:
                 logger.exception(f"Error encounter while calculating TP premium for vehicle data {vehicle_data}")
                 return None
@@ -67,11 +154,13 @@ class MotorAdaptor(Adaptor):
             net_premium = net_premium + basic_tp_details.net_tp_premium
             pricing_data["tp_premium"] = basic_tp_details
 
-        addonbundle_list = await cls.addon_premium.calculate_addon_bundle_premium(vehicle_data=vehicle_data,
-                                                                                  total_idv=depreciated_total_idv)
+        with Timing.stage("addon_premium"):
+            addon_list = await cls.addon_premium.calculate_addon_premium(vehicle_data=vehicle_data,
+                                                                         total_idv=depreciated_total_idv)
 
-        addon_list = await cls.addon_premium.calculate_addon_premium(vehicle_data=vehicle_data,
-                                                                     total_idv=depreciated_total_idv)
+        with Timing.stage("addon_bundle_premium"):
+            addonbundle_list = await cls.addon_premium.calculate_addon_bundle_premium(
+                vehicle_data=vehicle_data, total_idv=depreciated_total_idv, addon_premiums=addon_list)
 
         calculated_tax = cls.component_calculator.calculate_tax(net_premium)
 
@@ -85,40 +174,209 @@ class MotorAdaptor(Adaptor):
         logger.info(
             f"Computed pricing for insurer {vehicle_data['insurer_code']} with quote request id {vehicle_data['quote_request_id']} is {pricing_data}.")
 
-        return PriceResponse(**pricing_data)
+        return PriceResponse.from_computed(**pricing_data)
 
     @classmethod
-    async def infuse_model_data(cls, vehicle_data):
+    async def compute_book_premium(cls, vehicle_data_list: List[dict]) -> List[Union[PriceResponse, Exception, None]]:
+        """
+        Prices many requests at once with `BookPremiumCalculator`. Every request is infused and its dataverse
+        values resolved concurrently, the whole batch is then priced as arrays with every addon and bundle of
+        the rate tables, as `compute_premium` prices them.
 
-        tenure_service_url = SERVICE_CREDENTIALS["dataverse"][
-                                 "dns"] + f"/api/v1/vehicle_cover_by_id/?vehicle_cover_id={vehicle_data['vehicle_cover_id']}"
-        tenure_details = await AsyncHttpClient.get(url=tenure_service_url)
+        :param vehicle_data_list: list of price requests
+        :return: in the order of the requests, the PriceResponse of a request, None when it could not be priced
+            or the exception resolving its dataverse details raised
+        """
+        logger = logging.getLogger("app")
+        semaphore = asyncio.Semaphore(BATCH_PRICING_CONCURRENCY)
+
+        async def resolve(vehicle_data: dict):
+            async with semaphore:
+                vehicle_data = await cls.infuse_model_data(dict(vehicle_data))
+                breakin_details = await cls.checking_isbreakin_case(vehicle_data)
+                batch_row = await BookPremiumCalculator.batch_row(vehicle_data, left_days=breakin_details[1])
+                return vehicle_data, breakin_details, batch_row
+
+        with Timing.stage("book_resolve"):
+            resolved = await asyncio.gather(*[resolve(vehicle_data) for vehicle_data in vehicle_data_list],
+                                            return_exceptions=True)
+        for vehicle_data, result in zip(vehicle_data_list, resolved):
+            if isinstance(result, Exception):
+                logger.error(f"Exception encounter {result} while resolving book pricing details for quote request "
+                             f"id {vehicle_data.get('quote_request_id')}.")
+        priced = [result for result in resolved if not isinstance(result, Exception)]
+        responses = []
+        if priced:
+            with Timing.stage("book_premium"):
+                if not RateEngine.is_ready():
+                    await RateEngine.load()
+                rate_tables = RateEngine.snapshot().tables
+                addon_ids = sorted({row.addon_id for row in rate_tables["addon_price"]})
+                addon_bundle_ids = sorted({row.addon_bundle_id for row in rate_tables["addon_bundle_price"]})
+                batch_rows = [batch_row for _, _, batch_row in priced]
+                book_premium = await BookPremiumCalculator.calculate_book_premium(
+                    {name: [batch_row[name] for batch_row in batch_rows] for name in batch_rows[0]},
+                    addon_ids=addon_ids, addon_bundle_ids=addon_bundle_ids)
+                responses = BookPremiumCalculator.price_responses(
+                    [vehicle_data for vehicle_data, _, _ in priced], [details for _, details, _ in priced],
+                    book_premium, addon_ids, addon_bundle_ids)
+
+        responses = iter(responses)
+        return [result if isinstance(result, Exception) else next(responses) for result in resolved]
 
-        variant_service_url = SERVICE_CREDENTIALS["dataverse"][
-                                  "dns"] + f"/api/v1/get_variant_by_id/{vehicle_data['variant_id']}"
-        variant_details = await AsyncHttpClient.get(url=variant_service_url)
+    @classmethod
+    async def compute_premium_sweep(cls, vehicle_data: dict, idv_values: List[int], discount_percents: List[int],
+                                    addon_sets: Optional[List[List[int]]] = None) -> Union[PriceSweepResponse, None]:
+        """
+        Prices one request for every combination of idv, requested OD discount and addon set. The request
+        is infused and its rates resolved once, the premiums of the whole grid are then computed as arrays.
+        Combinations with a discount above the insurer discount are left out of the response.
+
+        :param vehicle_data: dict: price request, its idv and discount_percent are replaced by the grid values
+        :param idv_values: list of vehicle idv
+        :param discount_percents: list of requested OD discount percent, 0 for the insurer discount
+        :param addon_sets: list of addon id lists, each priced as the sum of its addon premiums
+        :return: PriceSweepResponse with the points ordered by addon set, idv and discount
+        """
+        logger = logging.getLogger("app")
+        with Timing.stage("infuse_model_data"):
+            vehicle_data = await cls.infuse_model_data(vehicle_data)
 
-        sub_variant_service_url = SERVICE_CREDENTIALS["dataverse"][
-                                      "dns"] + f"/api/v1/sub_variant/?variant_id={vehicle_data['variant_id']}"
-        sub_variant_details = await AsyncHttpClient.get(url=sub_variant_service_url)
-        sub_variant_details = sub_variant_details[0]
-        sub_variant_id = sub_variant_details["id"]
+        with Timing.stage("depreciation"):
+            idv_depreciation_rate = await cls.component_calculator.get_idv_depreciation_rate(
+                vehicle_age=vehicle_data["vehicle_age"])
 
-        exshowroom_price_service_url = SERVICE_CREDENTIALS["dataverse"][
-                                           "dns"] + f"/api/v1/exshowroom_price/?subvariant_id={sub_variant_id}"
-        exshowroom_price_detail = await AsyncHttpClient.get(url=exshowroom_price_service_url)
-        exshowroom_price_detail = exshowroom_price_detail[0]
+        with Timing.stage("checking_isbreakin_case"):
+            is_breakin, left_days = await cls.checking_isbreakin_case(vehicle_data)
 
-        rto_location_service_url = SERVICE_CREDENTIALS["dataverse"][
-                                       "dns"] + f"/api/v1/policy_summary/?rto_location_id={vehicle_data['rto_id']}"
-        rto_zone_details = await AsyncHttpClient.get(url=rto_location_service_url)
-        rto_zone_details = rto_zone_details.get("rto_location") or None
+        grid_shape = (len(idv_values), len(discount_percents))
+        net_od_premium = np.zeros(grid_shape)
+        total_idv = np.asarray(idv_values, dtype=np.float64)
+        max_discount_percent = None
+        if vehicle_data["od_tenure"] != 0:
+            with Timing.stage("od_premium"):
+                try:
+                    od_inputs = await cls.od_premium.resolve_inputs(
+                        vehicle_data=vehicle_data, vehicle_idv=vehicle_data["idv"],
+                        depreciation_rate=idv_depreciation_rate.response_data["depreciation_rate"],
+                        is_breakin=is_breakin, left_days=left_days)
+                except Exception as e:
+                    logger.exception(f"Exception encounter {e} while resolving OD sweep inputs for vehicle data "
+                                     f"{vehicle_data}.")
+                    return None
+                od_grid = cls.od_premium.compute_grid(od_inputs, vehicle_idvs=idv_values,
+                                                      discount_percents=discount_percents)
+            net_od_premium = od_grid["net_od_premium"]
+            total_idv = od_grid["total_idv"]
+            max_discount_percent = od_inputs.insurer_discount_percent
+
+        net_tp_premium = 0
+        if vehicle_data["tp_tenure"] != 0:
+            with Timing.stage("tp_premium"):
+                basic_tp_details = await cls.tp_premium.calculate_basic_tp_premium(vehicle_data=vehicle_data,
+                                                                                   is_breakin=is_breakin)
+            if not basic_tp_details.status:
+                logger.exception(f"Error encounter while calculating TP premium for vehicle data {vehicle_data}")
+                return None
+            net_tp_premium = basic_tp_details.basic_tp_premium.net_tp_premium
+
+        # addon premiums per addon set and idv
+        addon_premium = np.zeros((1, len(idv_values)))
+        if addon_sets:
+            with Timing.stage("addon_premium"):
+                addon_prices = await Pricing.get_addon_prices(
+                    vehicle_data=vehicle_data, addon_id_list=list({addon_id for addons in addon_sets
+                                                                   for addon_id in addons}))
+            addon_ids = [addon.addon_id for addon in addon_prices]
+            fixed_premium = np.array([addon.addon_premium or 0 for addon in addon_prices], dtype=np.float64)
+            addon_percent = np.array([addon.addon_percent or 0 for addon in addon_prices], dtype=np.float64)
+            premiums = np.where(fixed_premium != 0, fixed_premium,
+                                round_array(total_idv[:, np.newaxis] * addon_percent / 100, 2))
+            in_set = np.array([[addon_id in addons for addon_id in addon_ids] for addons in addon_sets],
+                              dtype=np.float64).reshape(len(addon_sets), len(addon_ids))
+            addon_premium = round_array(in_set @ premiums.T, 2)
+
+        net_premium = net_od_premium + net_tp_premium
+        calculated_tax = cls.component_calculator.calculate_tax(net_premium)
+        total_premium = round_array(net_premium + calculated_tax, 2)
+        net_premium = round_array(net_premium, 2)
+        total_tax = np.trunc(np.nan_to_num(calculated_tax))
+
+        points = []
+        for set_index, set_addon_premium in enumerate(addon_premium.tolist()):
+            for idv_index, idv in enumerate(idv_values):
+                for discount_index, discount_percent in enumerate(discount_percents):
+                    if np.isnan(net_premium[idv_index, discount_index]):
+                        continue
+                    points.append(PriceSweepPoint.from_computed(
+                        idv=idv,
+                        discount_percent=discount_percent,
+                        addon_set=set_index if addon_sets else None,
+                        total_idv=total_idv[idv_index],
+                        net_od_premium=net_od_premium[idv_index, discount_index],
+                        net_tp_premium=net_tp_premium,
+                        addon_premium=set_addon_premium[idv_index],
+                        net_premium=net_premium[idv_index, discount_index],
+                        total_tax=total_tax[idv_index, discount_index],
+                        total_premium=total_premium[idv_index, discount_index]))
+
+        return PriceSweepResponse.from_computed(
+            quote_request_id=vehicle_data["quote_request_id"],
+            quote_id=vehicle_data["quote_id"],
+            insurer_code=vehicle_data["insurer_code"],
+            is_breakin=is_breakin,
+            left_days=left_days,
+            max_discount_percent=max_discount_percent,
+            points=points)
+
+    @classmethod
+    async def infuse_model_data(cls, vehicle_data):
+        """
+        Resolves the vehicle cover, variant, ex-showroom price and RTO zone of the request from dataverse.
+        The calls run concurrently, only the ex-showroom price waits for the sub variant it is looked up by.
+        """
+        async def get_tenure_details(results):
+            return await Dataverse.get(
+                "vehicle_cover", f"/api/v1/vehicle_cover_by_id/?vehicle_cover_id={vehicle_data['vehicle_cover_id']}")
+
+        async def get_variant_details(results):
+            return await Dataverse.get("variant", f"/api/v1/get_variant_by_id/{vehicle_data['variant_id']}")
+
+        async def get_sub_variant_details(results):
+            sub_variant_details = await Dataverse.get(
+                "sub_variant", f"/api/v1/sub_variant/?variant_id={vehicle_data['variant_id']}")
+            return sub_variant_details[0]
+
+        async def get_exshowroom_price_detail(results):
+            sub_variant_id = results["sub_variant"]["id"]
+            exshowroom_price_detail = await Dataverse.get(
+                "exshowroom_price", f"/api/v1/exshowroom_price/?subvariant_id={sub_variant_id}")
+            return exshowroom_price_detail[0]
+
+        async def get_rto_zone_details(results):
+            rto_zone_details = await Dataverse.get(
+                "rto_zone", f"/api/v1/policy_summary/?rto_location_id={vehicle_data['rto_id']}")
+            return rto_zone_details.get("rto_location") or None
+
+        dataverse_calls = FanOut(name="infuse_model_data", timeout=DATAVERSE_CALL_TIMEOUT_SECONDS)
+        dataverse_calls.add("tenure", get_tenure_details)
+        dataverse_calls.add("variant", get_variant_details)
+        dataverse_calls.add("sub_variant", get_sub_variant_details, required=False)
+        dataverse_calls.add("exshowroom_price", get_exshowroom_price_detail, depends_on=["sub_variant"],
+                            required=False)
+        dataverse_calls.add("rto_zone", get_rto_zone_details, required=False)
+        results = await dataverse_calls.run()
+
+        tenure_details = results["tenure"]
+        variant_details = results["variant"]
+        exshowroom_price_detail = results["exshowroom_price"] or {}
+        rto_zone_details = results["rto_zone"]
 
         vehicle_data["vehicle_class"] = variant_details["vehicle_class_id"]
         vehicle_data["vehicle_type"] = variant_details["vehicle_type_id"]
         vehicle_data["cubic_capacity"] = variant_details["cubic_capacity"]
         vehicle_data["seating_capacity"] = variant_details["seating_capacity"]
-        vehicle_data["ex_showroom_price"] = exshowroom_price_detail["exShowRoomPrice"]
+        vehicle_data["ex_showroom_price"] = exshowroom_price_detail.get("exShowRoomPrice")
         vehicle_data["kilowatt_range"] = variant_details["kilowatt_range"]
         vehicle_data["rto_zone"] = rto_zone_details["rto_zone_id"] if rto_zone_details else None
         vehicle_data["fuel_type_id"] = variant_details["fuel_type_id"]
@@ -148,11 +406,11 @@ class MotorAdaptor(Adaptor):
             vehicle_cover_id = vehicle_data.get('vehicle_cover_id')
             prev_od_policy_exp_date = datetime.strptime(vehicle_data['prev_od_policy_exp_date'], "%d-%m-%Y").date()
             prev_tp_policy_exp_date = datetime.strptime(vehicle_data['prev_tp_policy_exp_date'], "%d-%m-%Y").date()
-            current_date = datetime.now(timezone('Asia/Kolkata')).date()
+            current_date = india_date()
 
-            policy_summary_url = f"{SERVICE_CREDENTIALS['dataverse']['dns']}/api/v1/policy_summary/?insurer_code=" \
-                                 f"{insurer_code}&vehicle_cover_id={vehicle_cover_id}"
-            policy_summary_response = await AsyncHttpClient.get(url=policy_summary_url)
+            policy_summary_path = f"/api/v1/policy_summary/?insurer_code={insurer_code}" \
+                                  f"&vehicle_cover_id={vehicle_cover_id}"
+            policy_summary_response = await Dataverse.get("vehicle_cover", policy_summary_path)
             vehicle_cover = policy_summary_response['vehicle_cover']
 
             if vehicle_cover['od_tenure'] and not vehicle_cover['tp_tenure']:
@@ -1,34 +1,51 @@
 import logging
-from typing import List
-
-from rb_utils.async_http_client import AsyncHttpClient
+from typing import Dict, List, Optional
 
 from app.schema.pricing import AddonBundleResponse, AddonResponse
+from app.services.dataverse import Dataverse
 from app.services.db_interactions import Pricing
-from app.settings import SERVICE_CREDENTIALS
 
 
 class AddonPremiumCalculator:
     logger = logging.getLogger("app")
 
     @classmethod
-    async def calculate_addon_bundle_premium(cls, vehicle_data: dict, total_idv: float) -> List[AddonBundleResponse]:
+    async def calculate_addon_bundle_premium(cls, vehicle_data: dict, total_idv: float,
+                                             addon_premiums: Optional[List[AddonResponse]] = None
+                                             ) -> List[AddonBundleResponse]:
+        """
+        Bundles without a fixed premium are priced as the sum of their addon premiums. The addons of every
+        bundle come from one (cached) dataverse call and their prices from one query, or from
+        addon_premiums when the caller already holds the addon prices of the vehicle.
+        """
         try:
             response_data = []
             addon_bundles = await Pricing.get_addon_bundle_premium(vehicle_data=vehicle_data)
+            priced_bundle_ids = [addon_bundle.addon_bundle_id for addon_bundle in addon_bundles
+                                 if not addon_bundle.bundle_premium]
+
+            bundle_addon_ids = {}
+            if priced_bundle_ids:
+                bundle_addon_ids = await cls.get_bundle_addon_ids()
+                if addon_premiums is None:
+                    addon_id_list = {addon_id for bundle_id in priced_bundle_ids
+                                     for addon_id in bundle_addon_ids.get(bundle_id, [])}
+                    addon_premiums = await Pricing.get_addon_premium(
+                        vehicle_data=vehicle_data, total_idv=total_idv, addon_id_list=list(addon_id_list)
+                    ) if addon_id_list else []
+
             for addon_bundle in addon_bundles:
                 if not addon_bundle.bundle_premium:
-                    dataverse_url = f"{SERVICE_CREDENTIALS['dataverse']['dns']}/api/v1/bundle_addons/?addon_bundle_id={addon_bundle.addon_bundle_id}"
-                    addon_bundle_detail = await AsyncHttpClient.get(dataverse_url)
-                    bundle_addon_ids = [item.get("id") for item in addon_bundle_detail["bundle_list"][0]["addons_list"]]
-                    addon = await Pricing.get_addon_premium(vehicle_data=vehicle_data, total_idv=total_idv,
-                                                            addon_id_list=bundle_addon_ids)
-                    bundle_premium = sum([round(item.premium, 2) for item in addon])
-                    response_data.append(
-                        AddonBundleResponse(id=addon_bundle.addon_bundle_id, premium=round(bundle_premium, 2)))
+                    if addon_bundle.addon_bundle_id not in bundle_addon_ids:
+                        cls.logger.warning(f"Addons of bundle {addon_bundle.addon_bundle_id} are not available.")
+                        continue
+                    addon_ids = set(bundle_addon_ids[addon_bundle.addon_bundle_id])
+                    bundle_premium = sum([round(item.premium, 2) for item in addon_premiums or [] if item.id in addon_ids])
+                    response_data.append(AddonBundleResponse.from_computed(id=addon_bundle.addon_bundle_id,
+                                                                           premium=round(bundle_premium, 2)))
                 else:
-                    response_data.append(
-                        AddonBundleResponse(id=addon_bundle.addon_bundle_id, premium=addon_bundle.bundle_premium))
+                    response_data.append(AddonBundleResponse.from_computed(id=addon_bundle.addon_bundle_id,
+                                                                           premium=addon_bundle.bundle_premium))
 
             return response_data
 
@@ -36,6 +53,15 @@ class AddonPremiumCalculator:
             error_message = f"Exception encounter {e} while calculating Addon bundle pricing for {vehicle_data}."
             cls.logger.exception(error_message)
 
+    @classmethod
+    async def get_bundle_addon_ids(cls) -> Dict[int, List[int]]:
+        """
+        :return: addon ids of every active bundle, keyed by bundle id
+        """
+        bundle_details = await Dataverse.get("bundle_addons", "/api/v1/bundle_addons/")
+        return {bundle["id"]: [item.get("id") for item in bundle["addons_list"]]
+                for bundle in bundle_details["bundle_list"]}
+
     @classmethod
     async def calculate_addon_premium(cls, vehicle_data: dict, total_idv: float) -> List[AddonResponse]:
         try:
@@ -0,0 +1,594 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from app.calculator.motor_adaptor.addon_premium_calculator import AddonPremiumCalculator
+from app.calculator.motor_adaptor.component_calculation import ComponentCalculator
+from app.calculator.motor_adaptor.od_premium_calculator import ODPremiumCalculator
+from app.schema.pricing import AddonBundleResponse, AddonResponse, ODPremium, PriceResponse, TPPremium
+from app.services.cover_rates import CoverRates
+from app.services.dataverse import Dataverse
+from app.services.rate_engine import RateEngine
+from app.utils.code_utils import round_array
+
+OD_PREMIUM_FIELDS = ("od_discount_rate", "basic_od", "discounted_od", "non_electrical_accessories_price",
+                     "electrical_accessories_price", "bi_fuel_kit_od_price", "geo_extension_od_price",
+                     "anti_theft_price", "aai_membership_price", "handicap_discount", "voluntary_deductible_price",
+                     "ncb_price", "sub_total_od_premium", "sub_total_deduction_premium", "net_od_premium",
+                     "non_electrical_accessories_idv", "electrical_accessories_idv", "bi_fuel_kit_idv")
+TP_PREMIUM_FIELDS = ("basic_liability", "bi_fuel_kit_tp_price", "geo_extension_tp_price", "pa_paid_driver_price",
+                     "pa_unnamed_passenger_price", "cpa_price", "ll_paid_driver_price", "ll_employees_price",
+                     "net_tp_premium")
+
+
+def in_range_mask(lower, upper, values: np.ndarray, lower_inclusive: bool = False) -> np.ndarray:
+    """Vector form of `rate_engine.in_range`, a NULL bound never matches."""
+    if lower is None or upper is None:
+        return np.zeros(len(values), dtype=bool)
+    if lower_inclusive:
+        return (lower <= values) & (values < upper)
+    return (lower < values) & (values < upper)
+
+
+class RateTable:
+    """
+    Rows of one rate table grouped on its exact match key columns, joined against a whole batch at once.
+    Columns are built on first use and shared, index them rather than writing to them.
+    """
+
+    def __init__(self, rows: List, key_columns: List[str]):
+        self.rows = sorted(rows, key=lambda row: row.id)
+        self.by_key: Dict[tuple, List[int]] = defaultdict(list)
+        for position, row in enumerate(self.rows):
+            self.by_key[tuple(getattr(row, column) for column in key_columns)].append(position)
+        self.columns: Dict[str, np.ndarray] = {}
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            self.columns[name] = np.array(
+                [np.nan if getattr(row, name) is None else getattr(row, name) for row in self.rows] + [np.nan],
+                dtype=np.float64)
+        return self.columns[name]
+
+    def join(self, keys: List[np.ndarray], condition: Callable = None, active: np.ndarray = None) -> np.ndarray:
+        """
+        For every batch row returns the position of the lowest id rate row with the same key for which
+        `condition(row, indices)` holds, or -1. Rows outside `active` are not joined.
+        """
+        active = np.ones(len(keys[0]), dtype=bool) if active is None else active
+        matched = np.full(len(active), -1, dtype=np.int64)
+        if not active.any():
+            return matched
+
+        active_indices = np.flatnonzero(active)
+        group_ids = np.zeros(len(active_indices), dtype=np.int64)
+        for key in keys:
+            uniques, codes = np.unique(key[active_indices], return_inverse=True)
+            group_ids = group_ids * len(uniques) + codes.reshape(-1)
+        order = np.argsort(group_ids, kind="stable")
+        boundaries = np.flatnonzero(np.diff(group_ids[order])) + 1
+
+        for group in np.split(active_indices[order], boundaries):
+            first = group[0]
+            key_values = tuple(key[first].item() if isinstance(key[first], np.generic) else key[first] for key in keys)
+            positions = self.by_key.get(key_values, [])
+            pending = group
+            for position in positions:
+                if not len(pending):
+                    break
+                mask = condition(self.rows[position], pending) if condition else np.ones(len(pending), dtype=bool)
+                matched[pending[mask]] = position
+                pending = pending[~mask]
+        return matched
+
+
+class BookPremiumCalculator:
+    """
+    Prices a columnar batch of vehicles (a pandas DataFrame or any mapping of column name to array) with
+    NumPy array operations. Rates are resolved by vectorized interval joins on the rate engine snapshot and
+    every component follows the arithmetic of `ODPremiumCalculator` and `TPPremiumCalculator` step for step,
+    so a row prices exactly as `MotorAdaptor.compute_premium` would price it.
+
+    The batch carries the vehicle details `MotorAdaptor.infuse_model_data` resolves from dataverse:
+
+        required: idv, vehicle_age, vehicle_type, rto_zone, fuel_type_id, fuel_type_code, cubic_capacity,
+                  kilowatt_range, od_tenure, tp_tenure, insurer_code
+        optional: variant_id, discount_percent, non_electrical_accessories_idv, electrical_accessories_idv,
+                  bi_fuel_kit_idv, geo_extension, is_antitheft, is_aai_member, is_handicapped,
+                  voluntary_deductible (deductible amount), ncb_percent (applicable slab value), is_claim_case,
+                  left_days, pa_paid_driver_value, pa_unnamed_passenger_value (sum insured), is_cpa,
+                  cpa_tenure, legal_liability_paid_driver, legal_liability_employees (count)
+
+    `batch_row` builds such a row from an infused price request and `price_responses` turns the priced book
+    back into the responses of the scalar path, `MotorAdaptor.compute_book_premium` chains them for the
+    renewal job. `benchmarks/book_premium_parity.py` checks both paths agree on the benchmark fixtures.
+    """
+    logger = logging.getLogger("app")
+    _rate_tables_source: Optional[Mapping] = None
+    _rate_tables: Dict[Tuple[str, Tuple[str, ...]], RateTable] = {}
+
+    @classmethod
+    def rate_table(cls, rate_tables: Mapping[str, Iterable], name: str, key_columns: List[str]) -> RateTable:
+        """
+        The `RateTable` of a rate table, built once per rate tables mapping. The rate engine snapshot is
+        immutable, so the tables of a snapshot are reused by every batch priced until the next load.
+        """
+        if cls._rate_tables_source is not rate_tables:
+            cls._rate_tables_source, cls._rate_tables = rate_tables, {}
+        key = (name, tuple(key_columns))
+        if key not in cls._rate_tables:
+            cls._rate_tables[key] = RateTable(rate_tables[name], key_columns)
+        return cls._rate_tables[key]
+
+    @classmethod
+    async def calculate_book_premium(cls, batch: Mapping, addon_ids: List[int] = None,
+                                     addon_bundle_ids: List[int] = None, as_of: datetime = None
+                                     ) -> Dict[str, np.ndarray]:
+        """
+        :param batch: columnar vehicle batch
+        :param addon_ids: addons to price, each one is returned as an `addon_<id>` column (nan if not offered)
+        :param addon_bundle_ids: bundles to price, each one is returned as an `addon_bundle_<id>` column (nan if
+            not offered), priced like `AddonPremiumCalculator.calculate_addon_bundle_premium`
+        :param as_of: date the cover rates are taken at, defaults to now
+        :return: dict of arrays, `status` is 0 for rows the scalar path would fail to price
+        """
+        if not RateEngine.is_ready():
+            await RateEngine.load()
+        if not CoverRates.is_ready():
+            await CoverRates.load()
+
+        bundle_addon_ids = await AddonPremiumCalculator.get_bundle_addon_ids() if addon_bundle_ids else {}
+        return cls.compute(batch, rate_tables=RateEngine.snapshot().tables, cover_rates=CoverRates.snapshot(),
+                           as_of=as_of or datetime.now(), addon_ids=addon_ids or [],
+                           addon_bundle_ids=addon_bundle_ids or [], bundle_addon_ids=bundle_addon_ids)
+
+    @classmethod
+    def compute(cls, batch: Mapping, rate_tables: Mapping[str, Iterable], cover_rates, as_of: datetime,
+                addon_ids: List[int] = (), addon_bundle_ids: List[int] = (),
+                bundle_addon_ids: Dict[int, List[int]] = None) -> Dict[str, np.ndarray]:
+        size = len(np.asarray(batch["idv"]))
+
+        def column(name: str, default=0, dtype=np.float64) -> np.ndarray:
+            if name not in batch:
+                return np.full(size, default, dtype=dtype)
+            values = np.asarray(batch[name], dtype=object)
+            values[values == None] = default  # noqa: E711
+            return values.astype(dtype)
+
+        def cover(code: str):
+            return cover_rates.get(code, at=as_of) if cover_rates else None
+
+        idv = column("idv")
+        vehicle_age = column("vehicle_age")
+        vehicle_type = column("vehicle_type", default=np.nan)
+        rto_zone = column("rto_zone", default=np.nan)
+        fuel_type_id = column("fuel_type_id", default=np.nan)
+        cubic_capacity = column("cubic_capacity")
+        kilowatt_range = column("kilowatt_range")
+        od_tenure = column("od_tenure")
+        tp_tenure = column("tp_tenure")
+        insurer_code = column("insurer_code", default="", dtype=str)
+        is_cng = np.char.find(column("fuel_type_code", default="", dtype=str), "cng") >= 0
+        status = np.ones(size, dtype=bool)
+
+        depreciation = cls.rate_table(rate_tables, "depreciation", [])
+        matched = depreciation.join(
+            [], lambda row, rows: in_range_mask(row.min_vehicle_age, row.max_vehicle_age, vehicle_age[rows], True),
+            active=np.ones(size, dtype=bool))
+        status &= matched >= 0
+        depreciation_rate = depreciation.column("depreciation_rate")[matched]
+
+        od_premium = cls.compute_od(
+            column, cover, rate_tables, status, depreciation_rate, idv, vehicle_age, vehicle_type, rto_zone,
+            cubic_capacity, kilowatt_range, od_tenure, insurer_code, is_cng)
+        tp_premium = cls.compute_tp(
+            column, cover, rate_tables, status, vehicle_type, fuel_type_id, cubic_capacity, kilowatt_range,
+            tp_tenure, insurer_code)
+
+        has_od = od_tenure != 0
+        has_tp = tp_tenure != 0
+        net_premium = np.where(has_od, od_premium["net_od_premium"], 0)
+        net_premium = net_premium + np.where(has_tp, tp_premium["net_tp_premium"], 0)
+        total_tax = ComponentCalculator.calculate_tax(net_premium)
+        total_idv = np.where(has_od, od_premium["total_idv"], idv)
+
+        response_data = {
+            "status": status.astype(np.int8),
+            "idv": idv,
+            "total_idv": total_idv,
+            "net_premium": round_array(net_premium),
+            "total_tax": np.trunc(total_tax),
+            "total_premium": round_array(net_premium + total_tax),
+        }
+        response_data.update({key: np.where(has_od, value, 0) for key, value in od_premium.items()
+                              if key != "total_idv"})
+        response_data.update({key: np.where(has_tp, value, 0) for key, value in tp_premium.items()})
+
+        if addon_ids or addon_bundle_ids:
+            response_data.update(cls.compute_addons(
+                column, rate_tables, addon_ids, addon_bundle_ids, bundle_addon_ids or {}, total_idv, vehicle_age,
+                vehicle_type, cubic_capacity, insurer_code))
+        return response_data
+
+    @classmethod
+    def compute_od(cls, column, cover, rate_tables, status, depreciation_rate, idv, vehicle_age, vehicle_type,
+                   rto_zone, cubic_capacity, kilowatt_range, tenure, insurer_code, is_cng) -> Dict[str, np.ndarray]:
+        size = len(idv)
+        active = tenure != 0
+        failed = np.zeros(size, dtype=bool)
+
+        discount = cls.rate_table(rate_tables, "discount", ["insurer_code"])
+        matched = discount.join([insurer_code], active=active)
+        failed |= active & (matched < 0)
+        od_discount_rate = discount.column("discount_precent")[matched]
+        discount_percent = column("discount_percent")
+        failed |= active & (discount_percent != 0) & (od_discount_rate < discount_percent)
+        od_discount_rate = np.where(discount_percent != 0, discount_percent, od_discount_rate)
+        od_discount_rate = 1 - (od_discount_rate / 100)
+
+        od_rate = cls.rate_table(rate_tables, "od_rate", ["od_term", "rto_zone", "vehicle_type"])
+
+        def od_rate_condition(row, rows):
+            mask = in_range_mask(row.min_vehicle_age, row.max_vehicle_age, vehicle_age[rows], True)
+            mask &= (cubic_capacity[rows] == 0) | in_range_mask(row.min_cc, row.max_cc, cubic_capacity[rows])
+            mask &= (kilowatt_range[rows] == 0) | in_range_mask(row.min_kw, row.max_kw, kilowatt_range[rows])
+            return mask
+
+        matched = od_rate.join([tenure, rto_zone, vehicle_type], od_rate_condition, active=active)
+        failed |= active & (matched < 0)
+        basic_od_rate = od_rate.column("rate_percent")[matched] / 100
+
+        depreciation_factor = (100 - depreciation_rate) / 100
+        discounted_od = idv * od_discount_rate * basic_od_rate
+
+        non_electrical_accessories_idv = column("non_electrical_accessories_idv")
+        non_electrical_accessories = np.where(
+            non_electrical_accessories_idv != 0,
+            non_electrical_accessories_idv * depreciation_factor * od_discount_rate * basic_od_rate, 0)
+
+        def cover_amount(code: str, base: np.ndarray, applies: np.ndarray) -> np.ndarray:
+            nonlocal failed
+            cover_object = cover(code)
+            if cover_object is None:
+                failed |= active & applies
+                return np.zeros(size)
+            if cover_object.cover_percent and cover_object.max_amount:
+                amount = np.minimum(base * cover_object.cover_percent / 100, cover_object.max_amount)
+            else:
+                amount = base * cover_object.cover_percent / 100
+                amount = np.where(amount != 0, amount, cover_object.max_amount)
+            return np.where(applies, amount, 0)
+
+        def flat_cover_amount(code: str, applies: np.ndarray) -> np.ndarray:
+            nonlocal failed
+            cover_object = cover(code)
+            if cover_object is None:
+                failed |= active & applies
+                return np.zeros(size)
+            if cover_object.cover_percent and cover_object.max_amount:
+                amount = min(cover_object.cover_percent / 100, cover_object.max_amount)
+            else:
+                amount = cover_object.cover_percent / 100 or cover_object.max_amount
+            return np.where(applies, amount, 0)
+
+        electrical_accessories_idv = column("electrical_accessories_idv")
+        electrical_accessories = cover_amount(
+            "electrical_accessories", electrical_accessories_idv * depreciation_factor, electrical_accessories_idv != 0)
+
+        bi_fuel_kit_idv = column("bi_fuel_kit_idv")
+        bi_fuel_kit_premium = cover_amount(
+            "external_bi_fuel_od", bi_fuel_kit_idv * depreciation_factor, bi_fuel_kit_idv != 0)
+
+        geo_extension_amount = flat_cover_amount("od_geo_extension", column("geo_extension") != 0)
+
+        basic_od = idv * basic_od_rate
+        bi_fuel_kit_premium = np.where(
+            is_cng,
+            cover_amount("internal_bi_fuel_od", basic_od + non_electrical_accessories + electrical_accessories, is_cng),
+            bi_fuel_kit_premium)
+
+        premium_entities = [
+            round_array(discounted_od),
+            round_array(tenure * non_electrical_accessories),
+            round_array(tenure * electrical_accessories),
+            round_array(bi_fuel_kit_premium),
+        ]
+        sub_total_od_premium = premium_entities[0] + premium_entities[1] + premium_entities[2] + premium_entities[3]
+
+        anti_theft_premium = cover_amount("anti_theft", sub_total_od_premium, column("is_antitheft", False, bool))
+        aai_membership_premium = cover_amount(
+            "aai_membership", sub_total_od_premium, column("is_aai_member", False, bool))
+        handicap_discount = cover_amount("handicapped", sub_total_od_premium, column("is_handicapped", False, bool))
+
+        deductible = column("voluntary_deductible")
+        voluntary_deductible = cls.rate_table(rate_tables, "voluntary_deductible", ["vehicle_type", "deductible"])
+        matched = voluntary_deductible.join([vehicle_type, deductible], active=active & (deductible != 0))
+        failed |= active & (deductible != 0) & (matched < 0)
+        voluntary_deductible_price = np.where(deductible != 0, round_array(np.minimum(
+            sub_total_od_premium * voluntary_deductible.column("discount_percent")[matched] / 100,
+            voluntary_deductible.column("max_discount")[matched])), 0)
+
+        discount_entities = [
+            round_array(tenure * anti_theft_premium),
+            round_array(tenure * aai_membership_premium),
+            round_array(handicap_discount),
+            round_array(voluntary_deductible_price),
+        ]
+        sub_total_deduction = discount_entities[0] + discount_entities[1] + discount_entities[2] + discount_entities[3]
+        geo_extension_od_price = tenure * geo_extension_amount
+
+        ncb_percent = np.trunc(column("ncb_percent"))
+        ncb_applies = (ncb_percent != 0) & ~column("is_claim_case", False, bool) & (column("left_days") >= -90)
+        ncb_price = np.where(ncb_applies, round_array(
+            (sub_total_od_premium - (sub_total_deduction + 0) + geo_extension_od_price) * ncb_percent / 100), 0)
+        sub_total_deduction = sub_total_deduction + ncb_price
+
+        idv_rounded = round_array(idv)
+        non_electrical_accessories_idv = round_array(non_electrical_accessories_idv * depreciation_factor)
+        electrical_accessories_idv = round_array(electrical_accessories_idv * depreciation_factor)
+        bi_fuel_kit_idv = round_array(bi_fuel_kit_idv)
+
+        status &= ~failed
+        return {
+            "od_discount_rate": 100 - round_array(od_discount_rate * 100),
+            "basic_od": premium_entities[0],
+            "discounted_od": premium_entities[0],
+            "non_electrical_accessories_price": premium_entities[1],
+            "electrical_accessories_price": premium_entities[2],
+            "bi_fuel_kit_od_price": premium_entities[3],
+            "geo_extension_od_price": round_array(geo_extension_od_price),
+            "anti_theft_price": discount_entities[0],
+            "aai_membership_price": discount_entities[1],
+            "handicap_discount": discount_entities[2],
+            "voluntary_deductible_price": discount_entities[3],
+            "ncb_price": ncb_price,
+            "sub_total_od_premium": round_array(sub_total_od_premium),
+            "sub_total_deduction_premium": round_array(sub_total_deduction),
+            "net_od_premium": round_array(sub_total_od_premium - sub_total_deduction + geo_extension_od_price),
+            "non_electrical_accessories_idv": non_electrical_accessories_idv,
+            "electrical_accessories_idv": electrical_accessories_idv,
+            "bi_fuel_kit_idv": bi_fuel_kit_idv,
+            "total_idv": idv_rounded + non_electrical_accessories_idv + electrical_accessories_idv + bi_fuel_kit_idv,
+        }
+
+    @classmethod
+    def compute_tp(cls, column, cover, rate_tables, status, vehicle_type, fuel_type_id, cubic_capacity,
+                   kilowatt_range, tenure, insurer_code) -> Dict[str, np.ndarray]:
+        size = len(tenure)
+        active = tenure != 0
+        failed = np.zeros(size, dtype=bool)
+
+        tp_rate = cls.rate_table(rate_tables, "tp_rate", ["tp_term", "fuel_type", "vehicle_type"])
+
+        def tp_rate_condition(row, rows):
+            mask = (cubic_capacity[rows] == 0) | in_range_mask(row.min_cc, row.max_cc, cubic_capacity[rows])
+            mask &= (kilowatt_range[rows] == 0) | in_range_mask(row.min_kw, row.max_kw, kilowatt_range[rows])
+            return mask
+
+        matched = tp_rate.join([tenure, fuel_type_id, vehicle_type], tp_rate_condition, active=active)
+        failed |= active & (matched < 0)
+        basic_liability = tp_rate.column("rate")[matched]
+
+        def flat_cover_amount(code: str, applies: np.ndarray) -> np.ndarray:
+            nonlocal failed
+            cover_object = cover(code)
+            if cover_object is None:
+                failed |= active & applies
+                return np.zeros(size)
+            return np.where(applies, max(cover_object.cover_percent / 100, cover_object.max_amount) * tenure, 0)
+
+        pa_rate = cls.rate_table(rate_tables, "pa_rate", ["vehicle_type", "cover_code", "tp_tenure", "insurer_code"])
+
+        def pa_cover_amount(pa_cover_type: str, pa_tenure: np.ndarray, pa_cover_value: np.ndarray,
+                            applies: np.ndarray) -> np.ndarray:
+            nonlocal failed
+            cover_code = np.full(size, pa_cover_type, dtype=object)
+            matched_rate = pa_rate.join([vehicle_type, cover_code, pa_tenure, insurer_code], active=active & applies)
+            failed |= active & applies & (matched_rate < 0)
+            multiplier = pa_rate.column("per_10k_rate")[matched_rate]
+            return np.where(applies, multiplier * pa_cover_value * pa_tenure, 0)
+
+        bi_fuel_premium = flat_cover_amount("bi_fuel_tp", column("bi_fuel_kit_idv") != 0)
+        geo_extension_amount = flat_cover_amount("tp_geo_extension", column("geo_extension") != 0)
+
+        pa_paid_driver_value = column("pa_paid_driver_value")
+        pa_paid_driver_cover = pa_cover_amount(
+            "paid_driver", tenure, pa_paid_driver_value / 10000, pa_paid_driver_value != 0)
+        pa_unnamed_passenger_value = column("pa_unnamed_passenger_value")
+        pa_unnamed_passenger_cover = pa_cover_amount(
+            "unnamed_passenger", tenure, pa_unnamed_passenger_value / 10000, pa_unnamed_passenger_value != 0)
+        cpa_cover_premium = round_array(pa_cover_amount(
+            "cpa_cover", column("cpa_tenure"), np.full(size, 150), column("is_cpa", False, bool)), 0)
+
+        ll_paid_driver_premium = flat_cover_amount(
+            "ll_paid_driver", column("legal_liability_paid_driver", False, bool))
+        legal_liability_employees = column("legal_liability_employees")
+        ll_employee_premium = flat_cover_amount("ll_employees", legal_liability_employees != 0)
+        ll_employee_premium = ll_employee_premium * legal_liability_employees
+
+        basic_tp_calculation = {
+            "basic_liability": round_array(basic_liability),
+            "bi_fuel_kit_tp_price": round_array(bi_fuel_premium),
+            "geo_extension_tp_price": round_array(geo_extension_amount),
+            "pa_paid_driver_price": round_array(pa_paid_driver_cover),
+            "pa_unnamed_passenger_price": round_array(pa_unnamed_passenger_cover),
+            "cpa_price": round_array(cpa_cover_premium),
+            "ll_paid_driver_price": round_array(ll_paid_driver_premium),
+            "ll_employees_price": round_array(ll_employee_premium),
+        }
+        net_tp_premium = np.zeros(size)
+        for value in basic_tp_calculation.values():
+            net_tp_premium = net_tp_premium + value
+        basic_tp_calculation["net_tp_premium"] = round_array(net_tp_premium)
+
+        status &= ~failed
+        return basic_tp_calculation
+
+    @classmethod
+    def compute_addons(cls, column, rate_tables, addon_ids: List[int], addon_bundle_ids: List[int],
+                       bundle_addon_ids: Dict[int, List[int]], total_idv, vehicle_age, vehicle_type, cubic_capacity,
+                       insurer_code) -> Dict[str, np.ndarray]:
+        size = len(total_idv)
+        variant_id = column("variant_id", default=np.nan)
+        # a bundle without a fixed premium is priced as the sum of its addon premiums
+        priced_addon_ids = set(addon_ids).union(
+            *[bundle_addon_ids.get(bundle_id, []) for bundle_id in addon_bundle_ids])
+        addon_price = cls.rate_table(rate_tables, "addon_price",
+                                     ["addon_id", "variant_id", "vehicle_type_id", "insurer_code"])
+        addon_premium_column = addon_price.column("addon_premium")
+        addon_percent_column = addon_price.column("addon_percent")
+
+        def addon_price_condition(row, rows):
+            mask = in_range_mask(row.vehicle_min_age, row.vehicle_max_age, vehicle_age[rows], True)
+            mask &= (cubic_capacity[rows] == 0) | in_range_mask(row.min_cc, row.max_cc, cubic_capacity[rows])
+            return mask
+
+        addon_premiums = {}
+        for addon_id in sorted(priced_addon_ids):
+            matched = addon_price.join(
+                [np.full(size, addon_id), variant_id, vehicle_type, insurer_code], addon_price_condition)
+            addon_premium = addon_premium_column[matched]
+            premium = np.where(
+                np.nan_to_num(addon_premium) != 0, addon_premium,
+                round_array(total_idv * addon_percent_column[matched] / 100))
+            addon_premiums[addon_id] = np.where(matched >= 0, premium, np.nan)
+        response_data = {f"addon_{addon_id}": addon_premiums[addon_id] for addon_id in addon_ids}
+
+        bundle_price = cls.rate_table(rate_tables, "addon_bundle_price",
+                                      ["addon_bundle_id", "variant_id", "vehicle_type_id", "insurer_code"])
+        bundle_premium_column = bundle_price.column("bundle_premium")
+        for bundle_id in addon_bundle_ids:
+            matched = bundle_price.join(
+                [np.full(size, bundle_id), variant_id, vehicle_type, insurer_code], addon_price_condition)
+            bundle_premium = bundle_premium_column[matched]
+            # the scalar path leaves out a bundle whose addons dataverse does not list
+            addons_premium = np.full(size, np.nan)
+            if bundle_id in bundle_addon_ids:
+                addons_premium = np.zeros(size)
+                for addon_id in sorted(set(bundle_addon_ids[bundle_id])):
+                    addons_premium = addons_premium + np.nan_to_num(round_array(addon_premiums[addon_id]))
+                addons_premium = round_array(addons_premium)
+            premium = np.where(np.nan_to_num(bundle_premium) != 0, bundle_premium, addons_premium)
+            response_data[f"addon_bundle_{bundle_id}"] = np.where(matched >= 0, premium, np.nan)
+        return response_data
+
+    @classmethod
+    async def batch_row(cls, vehicle_data: dict, left_days: int) -> dict:
+        """
+        The batch row of a price request infused by `MotorAdaptor.infuse_model_data`, with the deductible
+        amount, NCB slab and PA sums insured looked up in dataverse as the scalar calculators look them up.
+        """
+        voluntary_deductible = 0
+        if vehicle_data.get("voluntary_deductible_id"):
+            voluntary_deductible = (await Dataverse.get(
+                "voluntary_deductible",
+                f"/api/v1/voluntary_deductible/?id={vehicle_data['voluntary_deductible_id']}"))[0]["value"]
+
+        ncb_percent = 0
+        if vehicle_data.get("ncb_carry_forward_id", 0) or vehicle_data.get("last_year_ncb_id", 0):
+            ncb_percent = await ODPremiumCalculator.get_ncb_percent(
+                is_endoresment=vehicle_data.get("is_endorsement", False),
+                ncb_carry_forward_id=vehicle_data.get("ncb_carry_forward_id", 0),
+                last_year_ncb_id=vehicle_data.get("last_year_ncb_id", 0),
+                left_days=left_days, is_claim_case=vehicle_data.get("is_claim_case", False))
+
+        pa_values = {}
+        for pa_cover_type in ("pa_paid_driver", "pa_unnamed_passenger"):
+            pa_values[pa_cover_type] = 0
+            if vehicle_data.get(f"{pa_cover_type}_id"):
+                pa_cover = await Dataverse.get(
+                    "pa_cover", f"/api/v1/pa_cover/?id={vehicle_data[f'{pa_cover_type}_id']}")
+                pa_values[pa_cover_type] = pa_cover[0].get("value", 0)
+
+        return {
+            **{name: vehicle_data.get(name) for name in (
+                "idv", "vehicle_age", "vehicle_type", "rto_zone", "fuel_type_id", "fuel_type_code", "cubic_capacity",
+                "kilowatt_range", "od_tenure", "tp_tenure", "insurer_code", "variant_id", "discount_percent",
+                "non_electrical_accessories_idv", "electrical_accessories_idv", "bi_fuel_kit_idv", "is_antitheft",
+                "is_aai_member", "is_handicapped", "is_claim_case", "is_cpa", "legal_liability_paid_driver")},
+            "geo_extension": bool(vehicle_data.get("geo_extension_ids")),
+            "voluntary_deductible": voluntary_deductible,
+            "ncb_percent": ncb_percent,
+            "left_days": left_days,
+            "pa_paid_driver_value": pa_values["pa_paid_driver"],
+            "pa_unnamed_passenger_value": pa_values["pa_unnamed_passenger"],
+            "cpa_tenure": vehicle_data.get("cpa_tenure_id"),
+            "legal_liability_employees": vehicle_data.get("legal_liability_employees_id"),
+        }
+
+    @classmethod
+    def price_responses(cls, vehicle_datas: List[dict], breakin_details: List[Tuple[bool, int]],
+                        book_premium: Dict[str, np.ndarray], addon_ids: List[int],
+                        addon_bundle_ids: List[int]) -> List[Optional[PriceResponse]]:
+        """
+        The `PriceResponse` of every row of a book priced from vehicle_datas, as `MotorAdaptor.compute_premium`
+        builds it, None for the rows it could not price. Addons and bundles are ordered by id.
+        """
+        pricing_date = date.today()
+        columns = {name: values.tolist() for name, values in book_premium.items()}
+
+        def policy_period(tenure: int, is_breakin: bool) -> Tuple[str, str]:
+            if is_breakin:
+                return (pricing_date + timedelta(days=1)).strftime("%d-%m-%Y"), \
+                       (pricing_date + relativedelta(years=tenure)).strftime("%d-%m-%Y")
+            return pricing_date.strftime("%d-%m-%Y"), \
+                (pricing_date + relativedelta(years=tenure) - timedelta(days=1)).strftime("%d-%m-%Y")
+
+        responses = []
+        for index, (vehicle_data, (is_breakin, left_days)) in enumerate(zip(vehicle_datas, breakin_details)):
+            if not columns["status"][index]:
+                responses.append(None)
+                continue
+            row = {name: values[index] for name, values in columns.items()}
+            pricing_data = {
+                "quote_request_id": vehicle_data["quote_request_id"],
+                "quote_id": vehicle_data["quote_id"],
+                "insurer_code": vehicle_data["insurer_code"],
+                "insurer_logo": vehicle_data["insurer_logo"],
+                "idv": vehicle_data["idv"],
+                "total_idv": row["total_idv"],
+                "net_premium": row["net_premium"],
+                "total_tax": row["total_tax"],
+                "total_premium": row["total_premium"],
+                "is_breakin": is_breakin,
+                "left_days": left_days,
+                "addons": [AddonResponse.from_computed(id=addon_id, premium=row[f"addon_{addon_id}"])
+                           for addon_id in sorted(addon_ids) if not np.isnan(row[f"addon_{addon_id}"])],
+                "addon_bundles": [
+                    AddonBundleResponse.from_computed(id=bundle_id, premium=row[f"addon_bundle_{bundle_id}"])
+                    for bundle_id in sorted(addon_bundle_ids) if not np.isnan(row[f"addon_bundle_{bundle_id}"])],
+            }
+
+            od_tenure = vehicle_data["od_tenure"]
+            if od_tenure != 0:
+                od_premium = {name: row[name] for name in OD_PREMIUM_FIELDS}
+                od_premium["od_start_date"], od_premium["od_end_date"] = policy_period(od_tenure, is_breakin)
+                od_premium.update(
+                    od_tenure=od_tenure, idv=round(vehicle_data["idv"], 2), total_idv=row["total_idv"],
+                    voluntary_deductible_id=vehicle_data.get("voluntary_deductible_id") or 0,
+                    od_premium_per_day=row["net_od_premium"] / (365 * od_tenure))
+                pricing_data["od_premium"] = ODPremium.from_computed(**od_premium)
+
+            tp_tenure = vehicle_data["tp_tenure"]
+            if tp_tenure != 0:
+                tp_premium = {name: row[name] for name in TP_PREMIUM_FIELDS}
+                tp_premium["tp_start_date"], tp_premium["tp_end_date"] = policy_period(tp_tenure, is_breakin)
+                tp_premium.update(
+                    tp_tenure=tp_tenure,
+                    total_tp_liability=tp_premium["basic_liability"] + tp_premium["bi_fuel_kit_tp_price"] +
+                    tp_premium["geo_extension_tp_price"],
+                    total_pa_cover=tp_premium["pa_paid_driver_price"] + tp_premium["pa_unnamed_passenger_price"] +
+                    tp_premium["cpa_price"],
+                    total_ll_cover=tp_premium["ll_paid_driver_price"] + tp_premium["ll_employees_price"],
+                    tp_premium_per_day=tp_premium["net_tp_premium"] / (365 * tp_tenure),
+                    **{name: vehicle_data.get(name) for name in (
+                        "pa_unnamed_passenger_id", "pa_paid_driver_id", "legal_liability_employees_id",
+                        "legal_liability_paid_driver", "cpa_tenure_id", "is_cpa", "cpa_waiver_reason_id")})
+                pricing_data["tp_premium"] = TPPremium.from_computed(**tp_premium)
+
+            responses.append(PriceResponse.from_computed(**pricing_data))
+        return responses
@@ -1,179 +1,36 @@
 import logging
 from datetime import date, timedelta
+from typing import Dict
 
+import numpy as np
 from dateutil.relativedelta import relativedelta
-from rb_utils.async_http_client import AsyncHttpClient
-from rb_utils.database import sqldb
-from sqlalchemy import select
 
-from app.models.pricing import CoverRate, VoluntaryDeductible
-from app.schema.pricing import ODPremiumResponse, ODPremium
+from app.schema.pricing import CoverTerms, ODPremium, ODPremiumResponse, ODPricingInputs, VoluntaryDeductibleTerms
+from app.services.cover_rates import CoverRates
+from app.services.dataverse import Dataverse
 from app.services.db_interactions import Pricing
-from app.settings import SERVICE_CREDENTIALS
+from app.utils.code_utils import round_array
 
 
 class ODPremiumCalculator:
+    """
+    OD pricing runs in two phases. `resolve_inputs` gathers every rate, cover and dataverse value the
+    request needs into an immutable `ODPricingInputs`, `compute` is a pure function of those inputs, so
+    it can be batched, cached or run in a process pool.
+    """
     logger = logging.getLogger("app")
+    cover_codes = ("electrical_accessories", "external_bi_fuel_od", "od_geo_extension", "internal_bi_fuel_od",
+                   "anti_theft", "aai_membership", "handicapped")
 
     @classmethod
     async def calculate_basic_od_premium(cls, vehicle_data: dict, vehicle_idv: float,
                                          depreciation_rate: float, is_breakin: bool,
                                          left_days: int) -> ODPremiumResponse:
         try:
-            tenure = vehicle_data["od_tenure"]
-            od_discount_rate = await Pricing.get_od_discount_rate(vehicle_data=vehicle_data)
-            if not od_discount_rate.status:
-                raise Exception(od_discount_rate.error_message)
-            od_discount_rate = od_discount_rate.response_data["rate_percent"]
-            if vehicle_data["discount_percent"] and od_discount_rate < vehicle_data["discount_percent"]:
-                raise Exception("Discount is out of range for this Request.")
-
-            od_discount_rate = vehicle_data["discount_percent"] or od_discount_rate
-
-            od_discount_rate = 1 - (od_discount_rate / 100)
-
-            basic_od_rate = await Pricing.get_od_premium_rate(vehicle_data=vehicle_data, tenure=tenure)
-            if not basic_od_rate.status:
-                raise Exception(basic_od_rate.error_message)
-            basic_od_rate = basic_od_rate.response_data["od_premium"] / 100  # 1.708
-
-            discounted_od = vehicle_idv * od_discount_rate * basic_od_rate
-
-            non_electrical_accessories = vehicle_data.get("non_electrical_accessories_idv") or 0
-            if non_electrical_accessories:
-                non_electrical_accessories = non_electrical_accessories * (
-                        (100 - depreciation_rate) / 100) * od_discount_rate * basic_od_rate
-
-            electrical_accessories = vehicle_data.get("electrical_accessories_idv") or 0
-            if electrical_accessories:
-                cover_object = await CoverRate.fetch_by_code(code="electrical_accessories")
-                if cover_object.cover_percent and cover_object.max_amount:
-                    electrical_accessories = min(
-                        electrical_accessories * ((100 - depreciation_rate) / 100) * cover_object.cover_percent / 100,
-                        cover_object.max_amount)
-                else:
-                    electrical_accessories = electrical_accessories * ((100 - depreciation_rate) / 100) * \
-                                             cover_object.cover_percent / 100 or cover_object.max_amount
-
-            bi_fuel_kit_premium = vehicle_data.get("bi_fuel_kit_idv") or 0
-            if bi_fuel_kit_premium:
-                cover_object = await CoverRate.fetch_by_code(code="external_bi_fuel_od")
-                if cover_object.cover_percent and cover_object.max_amount:
-                    bi_fuel_kit_premium = min(
-                        bi_fuel_kit_premium * ((100 - depreciation_rate) / 100) * cover_object.cover_percent / 100,
-                        cover_object.max_amount)
-                else:
-                    bi_fuel_kit_premium = bi_fuel_kit_premium * ((100 - depreciation_rate) / 100) * \
-                                          cover_object.cover_percent / 100 or cover_object.max_amount
-
-            geo_extension_amount = vehicle_data.get("geo_extension_ids") or 0
-            if geo_extension_amount:
-                cover_object = await CoverRate.fetch_by_code(code="od_geo_extension")
-                if cover_object.cover_percent and cover_object.max_amount:
-                    geo_extension_amount = min(cover_object.cover_percent / 100, cover_object.max_amount)
-                else:
-                    geo_extension_amount = cover_object.cover_percent / 100 or cover_object.max_amount
-
-            basic_od = vehicle_idv * basic_od_rate
-            if "cng" in vehicle_data["fuel_type_code"]:
-                cover_object = await CoverRate.fetch_by_code(code="internal_bi_fuel_od")
-                if cover_object.cover_percent and cover_object.max_amount:
-                    bi_fuel_kit_premium = min((basic_od + non_electrical_accessories + electrical_accessories
-                                               ) * cover_object.cover_percent / 100, cover_object.max_amount)
-                else:
-                    bi_fuel_kit_premium = (basic_od + non_electrical_accessories + electrical_accessories) * \
-                                          cover_object.cover_percent / 100 or cover_object.max_amount
-
-            premium_entities = {
-                "basic_od": round(discounted_od, 2),
-                "non_electrical_accessories_price": round(tenure * non_electrical_accessories, 2),
-                "electrical_accessories_price": round(tenure * electrical_accessories, 2),
-                "bi_fuel_kit_od_price": round(bi_fuel_kit_premium, 2)
-            }
-
-            anti_theft_premium = 0
-            if vehicle_data.get("is_antitheft", False):
-                cover_object = await CoverRate.fetch_by_code(code="anti_theft")
-                if cover_object.cover_percent and cover_object.max_amount:
-                    anti_theft_premium = min(sum(premium_entities.values()) * cover_object.cover_percent / 100,
-                                             cover_object.max_amount)
-                else:
-                    anti_theft_premium = sum(
-                        premium_entities.values()) * cover_object.cover_percent / 100 or cover_object.max_amount
-
-            aai_membership_premium = 0
-            if vehicle_data.get("is_aai_member", False):
-                cover_object = await CoverRate.fetch_by_code(code="aai_membership")
-                if cover_object.cover_percent and cover_object.max_amount:
-                    aai_membership_premium = min(sum(premium_entities.values()) * cover_object.cover_percent / 100,
-                                                 cover_object.max_amount)
-                else:
-                    aai_membership_premium = sum(
-                        premium_entities.values()) * cover_object.cover_percent / 100 or cover_object.max_amount
-
-            handicap_discount = 0
-            if vehicle_data.get("is_handicapped", False):
-                cover_object = await CoverRate.fetch_by_code(code="handicapped")
-                if cover_object.cover_percent and cover_object.max_amount:
-                    handicap_discount = min(sum(premium_entities.values()) * cover_object.cover_percent / 100,
-                                            cover_object.max_amount)
-                else:
-                    handicap_discount = sum(
-                        premium_entities.values()) * cover_object.cover_percent / 100 or cover_object.max_amount
-
-            voluntary_deductible_detail = vehicle_data.get("voluntary_deductible_id") or 0
-            if voluntary_deductible_detail:
-                voluntary_deductible_detail = await cls.get_voluntary_deductible(
-                    vehicle_data["vehicle_type"], vehicle_data["voluntary_deductible_id"],
-                    sum(premium_entities.values()))
-
-            discount_entities = {
-                "anti_theft_price": round(tenure * anti_theft_premium, 2),
-                "aai_membership_price": round(tenure * aai_membership_premium, 2),
-                "handicap_discount": round(handicap_discount, 2),
-                "voluntary_deductible_price": round(voluntary_deductible_detail, 2),
-                "ncb_price": 0,
-            }
-
-            ncb_deduction = vehicle_data.get("ncb_carry_forward_id", 0) or vehicle_data.get("last_year_ncb_id", 0) or 0
-            if ncb_deduction:
-                discount_entities["ncb_price"] = await cls.get_ncb_deduction(
-                    is_endoresment=vehicle_data.get("is_endorsement", False),
-                    ncb_carry_forward_id=vehicle_data.get("ncb_carry_forward_id", 0),
-                    last_year_ncb_id=vehicle_data.get("last_year_ncb_id", 0),
-                    left_days=left_days, is_claim_case=vehicle_data.get("is_claim_case", False),
-                    net_od=sum(premium_entities.values()) - sum(discount_entities.values()) + (
-                            tenure * geo_extension_amount))
-
-            response_dict = {
-                "od_discount_rate": 100 - round(od_discount_rate * 100, 2),
-                "basic_od": round(basic_od, 2),
-                "discounted_od": round(discounted_od, 2),
-                "geo_extension_od_price": round(tenure * geo_extension_amount, 2),
-                "net_od_premium": round(sum(premium_entities.values()) - sum(discount_entities.values()) + (
-                        tenure * geo_extension_amount), 2),
-                "sub_total_od_premium": round(sum(premium_entities.values()), 2),
-                "sub_total_deduction_premium": round(sum(discount_entities.values()), 2),
-                "od_tenure": tenure,
-                "od_start_date": (date.today() + timedelta(days=1)).strftime("%d-%m-%Y") if is_breakin else date.today().strftime("%d-%m-%Y"),
-                "od_end_date": (date.today() + relativedelta(years=tenure)).strftime("%d-%m-%Y") if is_breakin else (date.today() + relativedelta(years=tenure) - timedelta(days=1)).strftime("%d-%m-%Y"),
-                "non_electrical_accessories_idv": round((vehicle_data.get("non_electrical_accessories_idv") or 0) * (
-                        (100 - depreciation_rate) / 100), 2),
-                "electrical_accessories_idv": round((vehicle_data.get("electrical_accessories_idv") or 0) * (
-                        (100 - depreciation_rate) / 100), 2),
-                "bi_fuel_kit_idv": round(vehicle_data.get("bi_fuel_kit_idv") or 0 * (
-                        (100 - depreciation_rate) / 100), 2),
-                "voluntary_deductible_id": vehicle_data.get("voluntary_deductible_id") or 0,
-                # "idv": round(vehicle_idv * ((100 - depreciation_rate) / 100))
-                "idv": round(vehicle_idv, 2)
-            }
-            response_dict.update(discount_entities)
-            response_dict.update(premium_entities)
-            response_dict["od_premium_per_day"] = response_dict["net_od_premium"] / (365 * tenure)
-            response_dict["total_idv"] = response_dict["idv"] + response_dict["non_electrical_accessories_idv"] + \
-                                         response_dict["electrical_accessories_idv"] + response_dict["bi_fuel_kit_idv"]
-
-            return ODPremiumResponse(status=1, basic_od_premium=ODPremium(**response_dict))
+            od_inputs = await cls.resolve_inputs(vehicle_data=vehicle_data, vehicle_idv=vehicle_idv,
+                                                 depreciation_rate=depreciation_rate, is_breakin=is_breakin,
+                                                 left_days=left_days)
+            return ODPremiumResponse(status=1, basic_od_premium=cls.compute(od_inputs))
 
         except Exception as e:
             error_message = f"Exception encounter {e} while calculating TP pricing for {vehicle_data}."
@@ -181,34 +38,301 @@ class ODPremiumCalculator:
             return ODPremiumResponse(error_message=error_message)
 
     @classmethod
-    async def get_ncb_deduction(cls,is_endoresment,  ncb_carry_forward_id, last_year_ncb_id, left_days, net_od, is_claim_case):
+    async def resolve_inputs(cls, vehicle_data: dict, vehicle_idv: float, depreciation_rate: float,
+                             is_breakin: bool, left_days: int) -> ODPricingInputs:
+        tenure = vehicle_data["od_tenure"]
+        od_discount_rate = await Pricing.get_od_discount_rate(vehicle_data=vehicle_data)
+        if not od_discount_rate.status:
+            raise Exception(od_discount_rate.error_message)
+
+        basic_od_rate = await Pricing.get_od_premium_rate(vehicle_data=vehicle_data, tenure=tenure)
+        if not basic_od_rate.status:
+            raise Exception(basic_od_rate.error_message)
+
+        cover_flags = {
+            "electrical_accessories": vehicle_data.get("electrical_accessories_idv"),
+            "external_bi_fuel_od": vehicle_data.get("bi_fuel_kit_idv"),
+            "od_geo_extension": vehicle_data.get("geo_extension_ids"),
+            "internal_bi_fuel_od": "cng" in vehicle_data["fuel_type_code"],
+            "anti_theft": vehicle_data.get("is_antitheft", False),
+            "aai_membership": vehicle_data.get("is_aai_member", False),
+            "handicapped": vehicle_data.get("is_handicapped", False),
+        }
+        covers = {}
+        for code in cls.cover_codes:
+            if cover_flags[code]:
+                cover_object = await CoverRates.fetch_by_code(code=code)
+                covers[code] = CoverTerms(cover_percent=cover_object.cover_percent,
+                                          max_amount=cover_object.max_amount) if cover_object else None
+
+        voluntary_deductible = None
+        if vehicle_data.get("voluntary_deductible_id"):
+            voluntary_deductible = await cls.get_voluntary_deductible_terms(
+                vehicle_data["vehicle_type"], vehicle_data["voluntary_deductible_id"])
+
+        ncb_percent = 0
+        if vehicle_data.get("ncb_carry_forward_id", 0) or vehicle_data.get("last_year_ncb_id", 0):
+            ncb_percent = await cls.get_ncb_percent(
+                is_endoresment=vehicle_data.get("is_endorsement", False),
+                ncb_carry_forward_id=vehicle_data.get("ncb_carry_forward_id", 0),
+                last_year_ncb_id=vehicle_data.get("last_year_ncb_id", 0),
+                left_days=left_days, is_claim_case=vehicle_data.get("is_claim_case", False))
+
+        return ODPricingInputs(
+            tenure=tenure,
+            vehicle_idv=vehicle_idv,
+            depreciation_rate=depreciation_rate,
+            is_breakin=is_breakin,
+            pricing_date=date.today(),
+            insurer_discount_percent=od_discount_rate.response_data["rate_percent"],
+            requested_discount_percent=vehicle_data["discount_percent"],
+            od_rate_percent=basic_od_rate.response_data["od_premium"],
+            fuel_type_code=vehicle_data["fuel_type_code"],
+            non_electrical_accessories_idv=vehicle_data.get("non_electrical_accessories_idv"),
+            electrical_accessories_idv=vehicle_data.get("electrical_accessories_idv"),
+            bi_fuel_kit_idv=vehicle_data.get("bi_fuel_kit_idv"),
+            has_geo_extension=bool(vehicle_data.get("geo_extension_ids")),
+            is_antitheft=bool(vehicle_data.get("is_antitheft", False)),
+            is_aai_member=bool(vehicle_data.get("is_aai_member", False)),
+            is_handicapped=bool(vehicle_data.get("is_handicapped", False)),
+            voluntary_deductible_id=vehicle_data.get("voluntary_deductible_id"),
+            voluntary_deductible=voluntary_deductible,
+            ncb_percent=ncb_percent,
+            covers=covers,
+        )
+
+    @staticmethod
+    def cover_amount(cover: CoverTerms, base: float) -> float:
+        """Percent of base capped at the cover max amount, the max amount alone when there is no percent."""
+        if cover.cover_percent and cover.max_amount:
+            return min(base * cover.cover_percent / 100, cover.max_amount)
+        return base * cover.cover_percent / 100 or cover.max_amount
+
+    @classmethod
+    def compute(cls, od_inputs: ODPricingInputs) -> ODPremium:
+        tenure = od_inputs.tenure
+        vehicle_idv = od_inputs.vehicle_idv
+        depreciation_rate = od_inputs.depreciation_rate
+        covers = od_inputs.covers
+
+        od_discount_rate = od_inputs.insurer_discount_percent
+        if od_inputs.requested_discount_percent and od_discount_rate < od_inputs.requested_discount_percent:
+            raise Exception("Discount is out of range for this Request.")
+
+        od_discount_rate = od_inputs.requested_discount_percent or od_discount_rate
+
+        od_discount_rate = 1 - (od_discount_rate / 100)
+
+        basic_od_rate = od_inputs.od_rate_percent / 100
+
+        discounted_od = vehicle_idv * od_discount_rate * basic_od_rate
+
+        non_electrical_accessories = od_inputs.non_electrical_accessories_idv or 0
+        if non_electrical_accessories:
+            non_electrical_accessories = non_electrical_accessories * (
+                    (100 - depreciation_rate) / 100) * od_discount_rate * basic_od_rate
+
+        electrical_accessories = od_inputs.electrical_accessories_idv or 0
+        if electrical_accessories:
+            electrical_accessories = cls.cover_amount(
+                covers["electrical_accessories"], electrical_accessories * ((100 - depreciation_rate) / 100))
+
+        bi_fuel_kit_premium = od_inputs.bi_fuel_kit_idv or 0
+        if bi_fuel_kit_premium:
+            bi_fuel_kit_premium = cls.cover_amount(
+                covers["external_bi_fuel_od"], bi_fuel_kit_premium * ((100 - depreciation_rate) / 100))
+
+        geo_extension_amount = 0
+        if od_inputs.has_geo_extension:
+            geo_extension_amount = cls.cover_amount(covers["od_geo_extension"], 1)
+
+        basic_od = vehicle_idv * basic_od_rate
+        if "cng" in od_inputs.fuel_type_code:
+            bi_fuel_kit_premium = cls.cover_amount(
+                covers["internal_bi_fuel_od"], basic_od + non_electrical_accessories + electrical_accessories)
+
+        premium_entities = {
+            "basic_od": round(discounted_od, 2),
+            "non_electrical_accessories_price": round(tenure * non_electrical_accessories, 2),
+            "electrical_accessories_price": round(tenure * electrical_accessories, 2),
+            "bi_fuel_kit_od_price": round(bi_fuel_kit_premium, 2)
+        }
+
+        anti_theft_premium = 0
+        if od_inputs.is_antitheft:
+            anti_theft_premium = cls.cover_amount(covers["anti_theft"], sum(premium_entities.values()))
+
+        aai_membership_premium = 0
+        if od_inputs.is_aai_member:
+            aai_membership_premium = cls.cover_amount(covers["aai_membership"], sum(premium_entities.values()))
+
+        handicap_discount = 0
+        if od_inputs.is_handicapped:
+            handicap_discount = cls.cover_amount(covers["handicapped"], sum(premium_entities.values()))
+
+        voluntary_deductible_detail = 0
+        if od_inputs.voluntary_deductible_id:
+            voluntary_deductible_detail = round(min(
+                sum(premium_entities.values()) * od_inputs.voluntary_deductible.discount_percent / 100,
+                od_inputs.voluntary_deductible.max_discount), 2)
+
+        discount_entities = {
+            "anti_theft_price": round(tenure * anti_theft_premium, 2),
+            "aai_membership_price": round(tenure * aai_membership_premium, 2),
+            "handicap_discount": round(handicap_discount, 2),
+            "voluntary_deductible_price": round(voluntary_deductible_detail, 2),
+            "ncb_price": 0,
+        }
+
+        if od_inputs.ncb_percent:
+            net_od = sum(premium_entities.values()) - sum(discount_entities.values()) + (
+                    tenure * geo_extension_amount)
+            discount_entities["ncb_price"] = round(net_od * od_inputs.ncb_percent / 100, 2)
+
+        pricing_date = od_inputs.pricing_date
+        response_dict = {
+            "od_discount_rate": 100 - round(od_discount_rate * 100, 2),
+            "basic_od": round(basic_od, 2),
+            "discounted_od": round(discounted_od, 2),
+            "geo_extension_od_price": round(tenure * geo_extension_amount, 2),
+            "net_od_premium": round(sum(premium_entities.values()) - sum(discount_entities.values()) + (
+                    tenure * geo_extension_amount), 2),
+            "sub_total_od_premium": round(sum(premium_entities.values()), 2),
+            "sub_total_deduction_premium": round(sum(discount_entities.values()), 2),
+            "od_tenure": tenure,
+            "od_start_date": (pricing_date + timedelta(days=1)).strftime("%d-%m-%Y") if od_inputs.is_breakin else pricing_date.strftime("%d-%m-%Y"),
+            "od_end_date": (pricing_date + relativedelta(years=tenure)).strftime("%d-%m-%Y") if od_inputs.is_breakin else (pricing_date + relativedelta(years=tenure) - timedelta(days=1)).strftime("%d-%m-%Y"),
+            "non_electrical_accessories_idv": round((od_inputs.non_electrical_accessories_idv or 0) * (
+                    (100 - depreciation_rate) / 100), 2),
+            "electrical_accessories_idv": round((od_inputs.electrical_accessories_idv or 0) * (
+                    (100 - depreciation_rate) / 100), 2),
+            "bi_fuel_kit_idv": round(od_inputs.bi_fuel_kit_idv or 0 * (
+                    (100 - depreciation_rate) / 100), 2),
+            "voluntary_deductible_id": od_inputs.voluntary_deductible_id or 0,
+            # "idv": round(vehicle_idv * ((100 - depreciation_rate) / 100))
+            "idv": round(vehicle_idv, 2)
+        }
+        response_dict.update(discount_entities)
+        response_dict.update(premium_entities)
+        response_dict["od_premium_per_day"] = response_dict["net_od_premium"] / (365 * tenure)
+        response_dict["total_idv"] = response_dict["idv"] + response_dict["non_electrical_accessories_idv"] + \
+                                     response_dict["electrical_accessories_idv"] + response_dict["bi_fuel_kit_idv"]
+
+        return ODPremium.from_computed(**response_dict)
+
+    @staticmethod
+    def cover_amounts(cover: CoverTerms, base: np.ndarray) -> np.ndarray:
+        """`cover_amount` over an array of bases."""
+        amounts = base * cover.cover_percent / 100
+        if cover.cover_percent and cover.max_amount:
+            return np.minimum(amounts, cover.max_amount)
+        return np.where(amounts != 0, amounts, cover.max_amount)
+
+    @classmethod
+    def compute_grid(cls, od_inputs: ODPricingInputs, vehicle_idvs: np.ndarray,
+                     discount_percents: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        `compute` over every pair of vehicle idv and requested discount percent, as arrays of shape
+        (len(vehicle_idvs), len(discount_percents)). A discount of 0 takes the insurer discount like an
+        unset one does in `compute`, discounts above the insurer discount price to NaN.
+
+        :return: dict of net_od_premium per pair and total_idv per vehicle idv
+        """
+        tenure = od_inputs.tenure
+        depreciation_rate = od_inputs.depreciation_rate
+        covers = od_inputs.covers
+        vehicle_idv = np.asarray(vehicle_idvs, dtype=np.float64)[:, np.newaxis]
+        discount_percent = np.asarray(discount_percents, dtype=np.float64)[np.newaxis, :]
+
+        discount_percent = np.where(discount_percent != 0, discount_percent, od_inputs.insurer_discount_percent)
+        out_of_range = discount_percent > od_inputs.insurer_discount_percent
+        od_discount_rate = 1 - (discount_percent / 100)
+        basic_od_rate = od_inputs.od_rate_percent / 100
+
+        discounted_od = vehicle_idv * od_discount_rate * basic_od_rate
+
+        non_electrical_accessories = np.zeros_like(od_discount_rate)
+        if od_inputs.non_electrical_accessories_idv:
+            non_electrical_accessories = od_inputs.non_electrical_accessories_idv * (
+                    (100 - depreciation_rate) / 100) * od_discount_rate * basic_od_rate
+
+        electrical_accessories = 0
+        if od_inputs.electrical_accessories_idv:
+            electrical_accessories = cls.cover_amount(
+                covers["electrical_accessories"],
+                od_inputs.electrical_accessories_idv * ((100 - depreciation_rate) / 100))
+
+        bi_fuel_kit_premium = np.zeros_like(discounted_od)
+        if od_inputs.bi_fuel_kit_idv:
+            bi_fuel_kit_premium += cls.cover_amount(
+                covers["external_bi_fuel_od"], od_inputs.bi_fuel_kit_idv * ((100 - depreciation_rate) / 100))
+
+        geo_extension_amount = 0
+        if od_inputs.has_geo_extension:
+            geo_extension_amount = cls.cover_amount(covers["od_geo_extension"], 1)
+
+        basic_od = vehicle_idv * basic_od_rate
+        if "cng" in od_inputs.fuel_type_code:
+            bi_fuel_kit_premium = cls.cover_amounts(
+                covers["internal_bi_fuel_od"], basic_od + non_electrical_accessories + electrical_accessories)
+
+        # summed in the order of `compute` so that both round to the same paisa
+        sub_total_od_premium = round_array(discounted_od, 2) + round_array(tenure * non_electrical_accessories, 2) + \
+            round(tenure * electrical_accessories, 2) + round_array(bi_fuel_kit_premium, 2)
+
+        sub_total_deduction_premium = np.zeros_like(sub_total_od_premium)
+        if od_inputs.is_antitheft:
+            sub_total_deduction_premium += round_array(
+                tenure * cls.cover_amounts(covers["anti_theft"], sub_total_od_premium), 2)
+        if od_inputs.is_aai_member:
+            sub_total_deduction_premium += round_array(
+                tenure * cls.cover_amounts(covers["aai_membership"], sub_total_od_premium), 2)
+        if od_inputs.is_handicapped:
+            sub_total_deduction_premium += round_array(
+                cls.cover_amounts(covers["handicapped"], sub_total_od_premium), 2)
+        if od_inputs.voluntary_deductible_id:
+            sub_total_deduction_premium += round_array(np.minimum(
+                sub_total_od_premium * od_inputs.voluntary_deductible.discount_percent / 100,
+                od_inputs.voluntary_deductible.max_discount), 2)
+        if od_inputs.ncb_percent:
+            net_od = sub_total_od_premium - sub_total_deduction_premium + (tenure * geo_extension_amount)
+            sub_total_deduction_premium += round_array(net_od * od_inputs.ncb_percent / 100, 2)
+
+        net_od_premium = round_array(
+            sub_total_od_premium - sub_total_deduction_premium + (tenure * geo_extension_amount), 2)
+        net_od_premium[np.broadcast_to(out_of_range, net_od_premium.shape)] = np.nan
+
+        total_idv = round_array(vehicle_idv, 2) + round((od_inputs.non_electrical_accessories_idv or 0) * (
+                (100 - depreciation_rate) / 100), 2) + round((od_inputs.electrical_accessories_idv or 0) * (
+                (100 - depreciation_rate) / 100), 2) + round(od_inputs.bi_fuel_kit_idv or 0 * (
+                (100 - depreciation_rate) / 100), 2)
+
+        return {
+            "net_od_premium": net_od_premium,
+            "total_idv": total_idv[:, 0],
+        }
+
+    @classmethod
+    async def get_ncb_percent(cls, is_endoresment, ncb_carry_forward_id, last_year_ncb_id, left_days,
+                              is_claim_case) -> int:
         if is_claim_case or left_days < -90:
             return 0
         ncb_value = 0
         if last_year_ncb_id:
-                
-            service_url = SERVICE_CREDENTIALS["dataverse"][
-                              "dns"] + f"/api/v1/policy_summary/?last_year_ncb_id={last_year_ncb_id}"
-            ncb_details = await AsyncHttpClient.get(url=service_url)
-            ncb_value = int(ncb_details["last_year_ncb"]["value"].replace("%", "")) if is_endoresment else  ncb_details["last_year_ncb"]["new_slab_value"]
+            ncb_details = await Dataverse.get("ncb", f"/api/v1/policy_summary/?last_year_ncb_id={last_year_ncb_id}")
+            ncb_value = int(ncb_details["last_year_ncb"]["value"].replace("%", "")) if is_endoresment else \
+                ncb_details["last_year_ncb"]["new_slab_value"]
         if ncb_carry_forward_id:
-            service_url = SERVICE_CREDENTIALS["dataverse"][
-                              "dns"] + f"/api/v1/policy_summary/?ncb_carry_forward_id={ncb_carry_forward_id}"
-            ncb_details = await AsyncHttpClient.get(url=service_url)
+            ncb_details = await Dataverse.get(
+                "ncb", f"/api/v1/policy_summary/?ncb_carry_forward_id={ncb_carry_forward_id}")
             ncb_value = ncb_details["ncb_carry_forward"]["value"]
-        return round(net_od * int(ncb_value) / 100, 2)
+        return int(ncb_value)
 
     @classmethod
-    async def get_voluntary_deductible(cls, vehicle_type, voluntary_deductible_id, premium_entities):
-        service_url = SERVICE_CREDENTIALS["dataverse"][
-                          "dns"] + f"/api/v1/voluntary_deductible/?id={voluntary_deductible_id}"
-        voluntary_deductible_value = await AsyncHttpClient.get(url=service_url)
-
-        query = select(VoluntaryDeductible).filter(
-            VoluntaryDeductible.vehicle_type == vehicle_type,
-            VoluntaryDeductible.deductible == voluntary_deductible_value[0]["value"]
-        )
-        voluntary_deductible_details = await sqldb.execute(query)
-        voluntary_deductible_details = voluntary_deductible_details.scalars().first()
-        return round(min(premium_entities * voluntary_deductible_details.discount_percent / 100,
-                         voluntary_deductible_details.max_discount), 2)
+    async def get_voluntary_deductible_terms(cls, vehicle_type, voluntary_deductible_id) -> VoluntaryDeductibleTerms:
+        voluntary_deductible_value = await Dataverse.get(
+            "voluntary_deductible", f"/api/v1/voluntary_deductible/?id={voluntary_deductible_id}")
+
+        voluntary_deductible_details = await Pricing.get_voluntary_deductible(
+            vehicle_type=vehicle_type, deductible=voluntary_deductible_value[0]["value"])
+        return VoluntaryDeductibleTerms(**voluntary_deductible_details.response_data)
@@ -1,18 +1,24 @@
+import asyncio
 import logging
 from logging import config
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from sqladmin import Admin
 from app import settings
 from app.admin import CoverRateAdmin, TPRateAdmin, PARateAdmin, ODRateAdmin, DepreciationAdmin, AddOnBundlePriceAdmin, \
     DiscountAdmin, NCBAdmin, DeductibleAdmin
 from app.api.routers import api_router
+from app.services.cover_rates import CoverRates
+from app.services.rate_engine import RateEngine
+from app.services.warm_up import WarmUp
+from app.utils.timing import Timing
 from rb_utils.database import initiate_database, sqldb
 
 from typing import Optional
 import aiohttp
 from fastapi.openapi.utils import get_openapi
 from fastapi.param_functions import Form
-from app.settings import AUTH_LOGIN_URL, CONNECTION_CONFIG
+from app.settings import AUTH_LOGIN_URL, CONNECTION_CONFIG, RATE_ENGINE_ENABLED, RATE_ENGINE_REFRESH_SECONDS, \
+    COVER_RATE_SNAPSHOT_ENABLED, COVER_RATE_REFRESH_SECONDS, PRICING_TIMING_HEADER_ENABLED, WARM_UP_ENABLED
 
 app = FastAPI(title="Pricing Service")
 
@@ -24,8 +30,28 @@ logging.config.fileConfig(settings.LOGGER_CONFIG_PATH)
 @app.on_event("startup")
 async def startup_event():
     initiate_database(database_type="sql", connection_config=CONNECTION_CONFIG)
+    Timing.instrument_engine(sqldb.get_engine())
     admin = Admin(app, sqldb.get_engine())
     register_admin_models(admin)
+    if WARM_UP_ENABLED:
+        # /ready reports the worker not ready until the warm up is done
+        asyncio.create_task(WarmUp.run())
+    else:
+        await WarmUp.load_snapshots()
+        WarmUp.mark_ready()
+    if RATE_ENGINE_ENABLED:
+        asyncio.create_task(RateEngine.refresh_periodically(RATE_ENGINE_REFRESH_SECONDS))
+    if COVER_RATE_SNAPSHOT_ENABLED:
+        asyncio.create_task(CoverRates.refresh_periodically(COVER_RATE_REFRESH_SECONDS))
+
+
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    spans = Timing.start_request()
+    response = await call_next(request)
+    if PRICING_TIMING_HEADER_ENABLED and spans:
+        response.headers["Server-Timing"] = Timing.server_timing(spans)
+    return response
 
 
 def register_admin_models(admin):
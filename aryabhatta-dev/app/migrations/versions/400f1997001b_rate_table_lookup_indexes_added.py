@@ -0,0 +1,50 @@
+"""rate table lookup indexes added
+
+Revision ID: 400f1997001b
+Revises: a67e77ad3c66
+Create Date: 2026-10-18 11:20:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '400f1997001b'
+down_revision = 'a67e77ad3c66'
+branch_labels = None
+depends_on = None
+
+# GiST indexes on the int4range expressions `IntRangeContains` compiles to, they must match it exactly. The
+# CASE skips rows whose lower bound is above the upper, int4range fails on them and the index could not be built.
+# The kW bounds are compared to a fractional kW with plain comparisons, an int4range index would not serve them
+RANGE_INDEXES = {
+    'ix_od_rate_ranges': ('od_rate', [
+        "(CASE WHEN min_cc <= max_cc THEN int4range(min_cc, max_cc, '()') END)",
+        "(CASE WHEN min_vehicle_age <= max_vehicle_age THEN int4range(min_vehicle_age, max_vehicle_age, '[)') END)",
+    ]),
+    'ix_tp_rate_ranges': ('tp_rate', [
+        "(CASE WHEN min_cc <= max_cc THEN int4range(min_cc, max_cc, '()') END)",
+    ]),
+}
+
+
+def upgrade() -> None:
+    op.create_index('ix_od_rate_lookup', 'od_rate', ['od_term', 'rto_zone', 'vehicle_type'])
+    op.create_index('ix_tp_rate_lookup', 'tp_rate', ['tp_term', 'fuel_type', 'vehicle_type'])
+    op.create_index('ix_addon_price_lookup', 'addon_price',
+                    ['insurer_code', 'variant_id', 'vehicle_type_id', 'addon_id'])
+    op.create_index('ix_addon_bundle_price_lookup', 'addon_bundle_price',
+                    ['insurer_code', 'variant_id', 'vehicle_type_id', 'addon_bundle_id'])
+    for index_name, (table_name, expressions) in RANGE_INDEXES.items():
+        op.create_index(index_name, table_name, [sa.text(expression) for expression in expressions],
+                        postgresql_using='gist')
+
+
+def downgrade() -> None:
+    for index_name, (table_name, expressions) in RANGE_INDEXES.items():
+        op.drop_index(index_name, table_name=table_name)
+    op.drop_index('ix_addon_bundle_price_lookup', table_name='addon_bundle_price')
+    op.drop_index('ix_addon_price_lookup', table_name='addon_price')
+    op.drop_index('ix_tp_rate_lookup', table_name='tp_rate')
+    op.drop_index('ix_od_rate_lookup', table_name='od_rate')
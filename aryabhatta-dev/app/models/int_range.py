@@ -0,0 +1,55 @@
+from sqlalchemy import Boolean, Integer, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import coercions, roles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+LOWER_COMPARISONS = {"[": "<=", "(": "<"}
+UPPER_COMPARISONS = {"]": ">=", ")": ">"}
+
+
+class IntRangeContains(ColumnElement):
+    """
+    `value` within the range of the `lower` and `upper` columns, bounds inclusive or exclusive as in
+    `int4range`. On postgres it compiles to `CASE WHEN lower <= upper THEN int4range(lower, upper, bounds)
+    END @> value`, the expression the range indexes of the rate tables are built on, elsewhere to the
+    equivalent comparisons. The CASE keeps a row whose lower bound is above its upper from failing the
+    query in `int4range`, such a row and one with a NULL bound never match, like the comparisons, instead
+    of taking a NULL bound as unbounded like `int4range`.
+    """
+    type = Boolean()
+    inherit_cache = True
+    _traverse_internals = [
+        ("lower", InternalTraversal.dp_clauseelement),
+        ("upper", InternalTraversal.dp_clauseelement),
+        ("bounds", InternalTraversal.dp_string),
+        ("value", InternalTraversal.dp_clauseelement),
+        ("upper_value", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, lower, upper, value, bounds: str = "[)"):
+        if len(bounds) != 2 or bounds[0] not in "[(" or bounds[1] not in "])":
+            raise ValueError(f"Invalid range bounds {bounds}.")
+        self.lower = lower
+        self.upper = upper
+        self.bounds = bounds
+        if isinstance(value, int):
+            self.value = literal(value, Integer)
+            # positional paramstyles can not render one parameter twice, the comparisons take one each
+            self.upper_value = literal(value, Integer)
+        else:
+            # a closure variable of a lambda statement, a parameter of the cached statement
+            self.value = self.upper_value = coercions.expect(roles.ExpressionElementRole, value, type_=Integer)
+
+
+@compiles(IntRangeContains, "postgresql")
+def compile_int_range_contains_postgresql(element, compiler, **kw):
+    lower, upper = compiler.process(element.lower, **kw), compiler.process(element.upper, **kw)
+    return f"(CASE WHEN {lower} <= {upper} THEN int4range({lower}, {upper}, '{element.bounds}') END " \
+           f"@> {compiler.process(element.value, **kw)})"
+
+@compiles(IntRangeContains)
+def compile_int_range_contains(element, compiler, **kw):
+    return f"({compiler.process(element.lower, **kw)} {LOWER_COMPARISONS[element.bounds[0]]} " \
+           f"{compiler.process(element.value, **kw)} AND {compiler.process(element.upper, **kw)} " \
+           f"{UPPER_COMPARISONS[element.bounds[1]]} {compiler.process(element.upper_value, **kw)})"
@@ -2,7 +2,7 @@ from datetime import datetime
 
 from rb_utils.database.sql.sql_base import Base
 from rb_utils.database.sql.sql_crud_operations import SQLBaseCrud
-from sqlalchemy import Column, Integer, Boolean, VARCHAR, TIMESTAMP, Float, DateTime
+from sqlalchemy import Column, Integer, Boolean, VARCHAR, TIMESTAMP, Float, DateTime, Index
 
 
 class Config:
@@ -29,6 +29,8 @@ class CoverRate(TimeStamp, Base, Config, SQLBaseCrud):
 
 class ODRate(TimeStamp, Base, Config, SQLBaseCrud):
     __tablename__ = "od_rate"
+    # the int4range indexes on the range columns are created by migration 400f1997001b, postgres only
+    __table_args__ = (Index("ix_od_rate_lookup", "od_term", "rto_zone", "vehicle_type"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     fuel_type = Column(Integer, nullable=True)
@@ -48,6 +50,8 @@ class ODRate(TimeStamp, Base, Config, SQLBaseCrud):
 
 class TPRate(TimeStamp, Base, Config, SQLBaseCrud):
     __tablename__ = "tp_rate"
+    # the int4range indexes on the range columns are created by migration 400f1997001b, postgres only
+    __table_args__ = (Index("ix_tp_rate_lookup", "tp_term", "fuel_type", "vehicle_type"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     vehicle_type = Column(Integer, nullable=True)
@@ -146,6 +150,8 @@ class Discount(TimeStamp, Base, Config, SQLBaseCrud):
 
 class AddOnBundlePrice(TimeStamp, Base, Config, SQLBaseCrud):
     __tablename__ = "addon_bundle_price"
+    __table_args__ = (
+        Index("ix_addon_bundle_price_lookup", "insurer_code", "variant_id", "vehicle_type_id", "addon_bundle_id"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     addon_bundle_id = Column(Integer, nullable=True)
@@ -165,6 +171,7 @@ class AddOnBundlePrice(TimeStamp, Base, Config, SQLBaseCrud):
 
 class AddOnPrice(TimeStamp, Base, Config, SQLBaseCrud):
     __tablename__ = "addon_price"
+    __table_args__ = (Index("ix_addon_price_lookup", "insurer_code", "variant_id", "vehicle_type_id", "addon_id"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     addon_id = Column(Integer, nullable=True)
@@ -1,6 +1,68 @@
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Dict, Optional, List
 
 from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST
+
+
+SCALAR_TYPES = (int, float, str, bool)
+
+
+def computed_field_converter(field):
+    """Converts a computed value to the type of the field the way validation does, None stays None."""
+    field_type = field.type_
+    if field_type in SCALAR_TYPES and field.shape != SHAPE_LIST:
+        return lambda value: value if value is None or type(value) is field_type else field_type(value)
+    if field_type in SCALAR_TYPES:
+        def convert(value):
+            return value if type(value) is field_type else field_type(value)
+    elif isinstance(field_type, type) and issubclass(field_type, BaseModel):
+        def convert(value):
+            if isinstance(value, field_type):
+                return value
+            if issubclass(field_type, ComputedModel):
+                return field_type.from_computed(**value)
+            return field_type.parse_obj(value)
+    else:
+        def convert(value):
+            return value
+    if field.shape == SHAPE_LIST:
+        convert_item = convert
+
+        def convert(value):
+            return [convert_item(item) for item in value]
+    return lambda value: None if value is None else convert(value)
+
+
+class ComputedModel(BaseModel):
+    """
+    A response built from values the pricing pipeline computed itself. `from_computed` builds it without
+    validating them again, the scalars are only converted to the type of their field as validation would
+    and nested models are kept as they are (dicts, as read from the premium cache, become models). Fields
+    left out take their default like in `construct`.
+    """
+
+    @classmethod
+    def from_computed(cls, **values):
+        fields = COMPUTED_FIELDS.get(cls)
+        if fields is None:
+            fields = COMPUTED_FIELDS[cls] = [(name, computed_field_converter(field), field)
+                                             for name, field in cls.__fields__.items()]
+        field_values = {}
+        for name, convert, field in fields:
+            if name in values:
+                field_values[name] = convert(values[name])
+            elif not field.required:
+                field_values[name] = field.get_default()
+        model = cls.__new__(cls)
+        object.__setattr__(model, "__dict__", field_values)
+        object.__setattr__(model, "__fields_set__", values.keys() & cls.__fields__.keys())
+        if cls.__private_attributes__:
+            model._init_private_attributes()
+        return model
+
+
+COMPUTED_FIELDS: Dict[type, list] = {}
 
 
 class PriceRequest(BaseModel):
@@ -54,7 +116,19 @@ class PriceRequest(BaseModel):
     policy_type_id: Optional[int]
 
 
-class ODPremium(BaseModel):
+class InsurerPriceRequest(BaseModel):
+    insurer_code: str
+    insurer_logo: Optional[str]
+    quote_id: Optional[str]
+    discount_percent: Optional[int]
+
+
+class BatchPriceRequest(PriceRequest):
+    insurer_code: Optional[str]
+    insurers: List[InsurerPriceRequest]
+
+
+class ODPremium(ComputedModel):
     basic_od: float
     bi_fuel_kit_od_price: float
     discounted_od: Optional[float]
@@ -88,7 +162,7 @@ class ODPremiumResponse(BaseModel):
     basic_od_premium: Optional[ODPremium]
 
 
-class TPPremium(BaseModel):
+class TPPremium(ComputedModel):
     basic_liability: float
     bi_fuel_kit_tp_price: float
     geo_extension_tp_price: float
@@ -120,17 +194,84 @@ class TPPremiumResponse(BaseModel):
     basic_tp_premium: Optional[TPPremium]
 
 
-class AddonResponse(BaseModel):
+class PricingInputs(BaseModel):
+    """Immutable inputs of a pricing kernel, resolved before any arithmetic is done."""
+
+    class Config:
+        allow_mutation = False
+
+
+class CoverTerms(PricingInputs):
+    cover_percent: float
+    max_amount: float
+
+
+class VoluntaryDeductibleTerms(PricingInputs):
+    discount_percent: float
+    max_discount: float
+
+
+class PACoverTerms(PricingInputs):
+    multiplier: float
+    cover_value: float
+    tenure: int
+
+
+class ODPricingInputs(PricingInputs):
+    tenure: int
+    vehicle_idv: float
+    depreciation_rate: float
+    is_breakin: bool
+    pricing_date: date
+    insurer_discount_percent: float
+    requested_discount_percent: Optional[float]
+    od_rate_percent: float
+    fuel_type_code: str
+    non_electrical_accessories_idv: Optional[float]
+    electrical_accessories_idv: Optional[float]
+    bi_fuel_kit_idv: Optional[float]
+    has_geo_extension: bool = False
+    is_antitheft: bool = False
+    is_aai_member: bool = False
+    is_handicapped: bool = False
+    voluntary_deductible_id: Optional[int]
+    voluntary_deductible: Optional[VoluntaryDeductibleTerms]
+    ncb_percent: int = 0
+    # cover rates by code, None for a code without an applicable rate
+    covers: Dict[str, Optional[CoverTerms]] = {}
+
+
+class TPPricingInputs(PricingInputs):
+    tenure: int
+    is_breakin: bool
+    pricing_date: date
+    basic_liability: float
+    has_bi_fuel_kit: bool = False
+    has_geo_extension: bool = False
+    pa_paid_driver: Optional[PACoverTerms]
+    pa_unnamed_passenger: Optional[PACoverTerms]
+    cpa_cover: Optional[PACoverTerms]
+    legal_liability_paid_driver: Optional[bool]
+    legal_liability_employees_id: Optional[int]
+    pa_unnamed_passenger_id: Optional[int]
+    pa_paid_driver_id: Optional[int]
+    cpa_tenure_id: Optional[int]
+    is_cpa: Optional[bool]
+    cpa_waiver_reason_id: Optional[int]
+    covers: Dict[str, Optional[CoverTerms]] = {}
+
+
+class AddonResponse(ComputedModel):
     id: int
     premium: float
 
 
-class AddonBundleResponse(BaseModel):
+class AddonBundleResponse(ComputedModel):
     id: int
     premium: float
 
 
-class PriceResponse(BaseModel):
+class PriceResponse(ComputedModel):
     quote_request_id: str
     quote_id: str
     insurer_code: str
@@ -148,6 +289,35 @@ class PriceResponse(BaseModel):
     addon_bundles: Optional[List[AddonBundleResponse]]
 
 
+class PriceSweepRequest(PriceRequest):
+    idv_values: List[int]
+    discount_percents: List[int]
+    addon_sets: Optional[List[List[int]]]
+
+
+class PriceSweepPoint(ComputedModel):
+    idv: float
+    discount_percent: int
+    addon_set: Optional[int]
+    total_idv: float
+    net_od_premium: float
+    net_tp_premium: float
+    addon_premium: float
+    net_premium: float
+    total_tax: int
+    total_premium: float
+
+
+class PriceSweepResponse(ComputedModel):
+    quote_request_id: str
+    quote_id: str
+    insurer_code: str
+    is_breakin: bool
+    left_days: int
+    max_discount_percent: Optional[float]
+    points: List[PriceSweepPoint]
+
+
 class IdvRequest(BaseModel):
     invoice_date: str
     exshowroom_price: int
@@ -174,6 +344,19 @@ class DiscountResponse(BaseModel):
     max_discount: float
 
 
+class RateCardLoadReport(BaseModel):
+    table_name: str
+    insurer_code: Optional[str]
+    valid_from: datetime
+    rows: int
+    replaced_rows: int
+    chunks: int
+    load_seconds: float
+    swap_seconds: float
+    total_seconds: float
+    rows_per_second: float
+
+
 class CommunicationResponse(BaseModel):
     status: int = 0
     error_message: str = ""
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from rb_utils.database import sqldb
+from sqlalchemy import select
+
+from app.models.pricing import CoverRate
+
+
+class CoverRateSnapshot:
+    """Cover rates of one read of the cover_rate table grouped by code, latest `valid_from` first."""
+
+    def __init__(self, rows: List, version: str):
+        self.version = version
+        self.loaded_at = datetime.now()
+        self.by_code: Dict[str, List] = defaultdict(list)
+        for row in rows:
+            self.by_code[row.code].append(row)
+        for code_rows in self.by_code.values():
+            code_rows.sort(key=lambda row: (row.valid_from or datetime.min, row.id), reverse=True)
+
+    def get(self, code: str, at: datetime):
+        for row in self.by_code.get(code, []):
+            if row.valid_from is not None and row.valid_from > at:
+                continue
+            if row.valid_till is not None and row.valid_till <= at:
+                continue
+            return row
+        return None
+
+
+class CoverRates:
+    """
+    In memory cover rates shared by the OD and TP calculators. A cover rate applies from its `valid_from`
+    up to its `valid_till`, an empty bound is open, and the most recent applicable rate wins.
+    """
+    logger = logging.getLogger("app.services.cover_rates")
+    _snapshot: Optional[CoverRateSnapshot] = None
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        return cls._snapshot is not None
+
+    @classmethod
+    def version(cls) -> Optional[str]:
+        return cls._snapshot.version if cls._snapshot else None
+
+    @classmethod
+    def snapshot(cls) -> Optional[CoverRateSnapshot]:
+        return cls._snapshot
+
+    @classmethod
+    async def load(cls) -> bool:
+        try:
+            result = await sqldb.execute(select(CoverRate.__table__).order_by(CoverRate.id))
+            rows = result.all()
+            version = hashlib.sha1(repr([tuple(row) for row in rows]).encode()).hexdigest()
+            if cls._snapshot and cls._snapshot.version == version:
+                return True
+            cls._snapshot = CoverRateSnapshot(rows=rows, version=version)
+            cls.logger.info(f"Cover rates loaded version {version} with {len(rows)} rows.")
+            return True
+        except Exception as e:
+            cls.logger.exception(f"Exception encounter {e} while loading cover rates.")
+            return False
+
+    @classmethod
+    async def refresh_periodically(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            await cls.load()
+
+    @classmethod
+    def reset(cls):
+        cls._snapshot = None
+
+    @classmethod
+    async def fetch_by_code(cls, code: str):
+        """
+        :param code: cover code
+        :return: the cover rate applicable now, read from the database until the first snapshot is loaded
+        """
+        if not cls.is_ready():
+            return await CoverRate.fetch_by_code(code=code)
+        return cls._snapshot.get(code, at=datetime.now())
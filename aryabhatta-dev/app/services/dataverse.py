@@ -0,0 +1,57 @@
+import logging
+from typing import Dict
+
+from rb_utils.async_http_client import AsyncHttpClient
+
+from app.settings import DATAVERSE_CACHE_DEFAULT_TTL_SECONDS, DATAVERSE_CACHE_ENABLED, DATAVERSE_CACHE_MAX_SIZE, \
+    DATAVERSE_CACHE_TTL_SECONDS, SERVICE_CREDENTIALS
+from app.utils.cache import AsyncTTLCache
+from app.utils.timing import Timing
+
+
+class Dataverse:
+    """
+    Reads reference data from dataverse through one `AsyncTTLCache` per entity. Responses are shared
+    between callers and must not be mutated.
+    """
+    logger = logging.getLogger("app.services.dataverse")
+    caches: Dict[str, AsyncTTLCache] = {}
+
+    @classmethod
+    def url(cls, path: str) -> str:
+        return SERVICE_CREDENTIALS["dataverse"]["dns"] + path
+
+    @classmethod
+    def cache(cls, entity: str) -> AsyncTTLCache:
+        if entity not in cls.caches:
+            cls.caches[entity] = AsyncTTLCache(
+                name=entity, ttl=DATAVERSE_CACHE_TTL_SECONDS.get(entity, DATAVERSE_CACHE_DEFAULT_TTL_SECONDS),
+                max_size=DATAVERSE_CACHE_MAX_SIZE)
+        return cls.caches[entity]
+
+    @classmethod
+    async def get(cls, entity: str, path: str):
+        """
+        :param entity: name of the reference data, selects the cache and its ttl
+        :param path: dataverse path including the query string, used as the cache key
+        :return: the decoded dataverse response
+        """
+        url = cls.url(path)
+
+        async def fetch():
+            with Timing.external_call("dataverse", entity):
+                return await AsyncHttpClient.get(url=url)
+
+        if not DATAVERSE_CACHE_ENABLED:
+            return await fetch()
+        return await cls.cache(entity).get_or_load(path, fetch)
+
+    @classmethod
+    def invalidate(cls, entity: str = None):
+        for name, cache in cls.caches.items():
+            if entity is None or name == entity:
+                cache.invalidate()
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {entity: cache.stats() for entity, cache in cls.caches.items()}
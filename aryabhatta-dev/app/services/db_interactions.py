@@ -1,19 +1,115 @@
 import logging
 from typing import List
 
-from rb_utils.async_http_client import AsyncHttpClient
 from rb_utils.database import sqldb
-from sqlalchemy import select
+from sqlalchemy import Float, cast, lambda_stmt, select
 from sqlalchemy.sql import func
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 
+from app.models.int_range import IntRangeContains
 from app.models.pricing import AddOnBundlePrice, AddOnPrice, Discount, ODRate, TPRate, \
-    Depreciation, PARate
+    Depreciation, PARate, VoluntaryDeductible
 from app.schema.pricing import AddonResponse, CommunicationResponse, DiscountResponse
-from app.settings import SERVICE_CREDENTIALS
+from app.services.dataverse import Dataverse
+from app.services.rate_engine import RateEngine
 from app.utils.exceptions import *
 
+od_rate_table, tp_rate_table, depreciation_table, discount_table = \
+    ODRate.__table__, TPRate.__table__, Depreciation.__table__, Discount.__table__
+pa_rate_table, voluntary_deductible_table, addon_price_table, addon_bundle_price_table = \
+    PARate.__table__, VoluntaryDeductible.__table__, AddOnPrice.__table__, AddOnBundlePrice.__table__
+
 
 class Pricing:
+    """
+    Rate lookups of the pricing pipeline, answered by the `RateEngine` when it is loaded and by the
+    database otherwise. The range predicates of the rate queries are `IntRangeContains`, matching the
+    range indexes of the rate tables on postgres.
+
+    The queries are Core lambda statements over the rate tables: each shape of a query is built and
+    compiled once, later calls only bind their values, and rows come back as plain named tuples like the
+    ones of the `RateEngine` instead of ORM entities. Values used by a query are read out of
+    `vehicle_data` before its lambdas, so that the lambdas close over plain values tracked as parameters.
+    """
+
+    @classmethod
+    def od_rate_query(cls, vehicle_data: dict, tenure: int) -> StatementLambdaElement:
+        rto_zone, vehicle_type, vehicle_age = \
+            vehicle_data["rto_zone"], vehicle_data["vehicle_type"], vehicle_data["vehicle_age"]
+        cubic_capacity, kilowatt_range = vehicle_data["cubic_capacity"], vehicle_data["kilowatt_range"]
+        query = lambda_stmt(lambda: select(od_rate_table).where(
+            od_rate_table.c.od_term == tenure,
+            od_rate_table.c.rto_zone == rto_zone,
+            od_rate_table.c.vehicle_type == vehicle_type,
+            IntRangeContains(od_rate_table.c.min_vehicle_age, od_rate_table.c.max_vehicle_age, vehicle_age,
+                             "[)"),
+        ))
+        if cubic_capacity != 0:
+            query += lambda s: s.where(
+                IntRangeContains(od_rate_table.c.min_cc, od_rate_table.c.max_cc, cubic_capacity, "()"))
+        if kilowatt_range != 0:
+            # the kW of an EV is fractional, it is compared as a float like `RateEngine` compares it
+            query += lambda s: s.where(od_rate_table.c.min_kw < cast(kilowatt_range, Float),
+                                       od_rate_table.c.max_kw > cast(kilowatt_range, Float))
+        return query
+
+    @classmethod
+    def tp_rate_query(cls, vehicle_data: dict, tenure: int) -> StatementLambdaElement:
+        fuel_type, vehicle_type = vehicle_data["fuel_type_id"], vehicle_data["vehicle_type"]
+        cubic_capacity, kilowatt_range = vehicle_data["cubic_capacity"], vehicle_data["kilowatt_range"]
+        query = lambda_stmt(lambda: select(tp_rate_table).where(
+            tp_rate_table.c.tp_term == tenure,
+            tp_rate_table.c.fuel_type == fuel_type,
+            tp_rate_table.c.vehicle_type == vehicle_type,
+        ))
+        if cubic_capacity != 0:
+            query += lambda s: s.where(
+                IntRangeContains(tp_rate_table.c.min_cc, tp_rate_table.c.max_cc, cubic_capacity, "()"))
+        if kilowatt_range != 0:
+            # the kW of an EV is fractional, it is compared as a float like `RateEngine` compares it
+            query += lambda s: s.where(tp_rate_table.c.min_kw < cast(kilowatt_range, Float),
+                                       tp_rate_table.c.max_kw > cast(kilowatt_range, Float))
+        return query
+
+    @classmethod
+    def addon_price_query(cls, vehicle_data: dict, addon_id_list=None) -> StatementLambdaElement:
+        variant_id, vehicle_type, vehicle_age, insurer_code, cubic_capacity = \
+            vehicle_data["variant_id"], vehicle_data["vehicle_type"], vehicle_data["vehicle_age"], \
+            vehicle_data["insurer_code"], vehicle_data["cubic_capacity"]
+        query = lambda_stmt(lambda: select(addon_price_table))
+        if addon_id_list:
+            addon_ids = list(addon_id_list)
+            query += lambda s: s.where(addon_price_table.c.addon_id.in_(addon_ids))
+
+        query += lambda s: s.where(
+            addon_price_table.c.variant_id == variant_id,
+            addon_price_table.c.vehicle_type_id == vehicle_type,
+            IntRangeContains(addon_price_table.c.vehicle_min_age, addon_price_table.c.vehicle_max_age,
+                             vehicle_age, "[)"),
+            addon_price_table.c.insurer_code == insurer_code
+        )
+        if cubic_capacity != 0:
+            query += lambda s: s.where(
+                IntRangeContains(addon_price_table.c.min_cc, addon_price_table.c.max_cc, cubic_capacity, "()"))
+        return query
+
+    @classmethod
+    def addon_bundle_price_query(cls, vehicle_data: dict) -> StatementLambdaElement:
+        variant_id, vehicle_type, vehicle_age, insurer_code, cubic_capacity = \
+            vehicle_data["variant_id"], vehicle_data["vehicle_type"], vehicle_data["vehicle_age"], \
+            vehicle_data["insurer_code"], vehicle_data["cubic_capacity"]
+        query = lambda_stmt(lambda: select(addon_bundle_price_table).where(
+            addon_bundle_price_table.c.variant_id == variant_id,
+            addon_bundle_price_table.c.vehicle_type_id == vehicle_type,
+            IntRangeContains(addon_bundle_price_table.c.vehicle_min_age, addon_bundle_price_table.c.vehicle_max_age,
+                             vehicle_age, "[)"),
+            addon_bundle_price_table.c.insurer_code == insurer_code
+        ))
+        if cubic_capacity != 0:
+            query += lambda s: s.where(
+                IntRangeContains(addon_bundle_price_table.c.min_cc, addon_bundle_price_table.c.max_cc,
+                                 cubic_capacity, "()"))
+        return query
 
     @classmethod
     async def get_od_premium_rate(cls, vehicle_data: dict, tenure: int) -> CommunicationResponse:
@@ -24,24 +120,12 @@ class Pricing:
         """
         logger = logging.getLogger("app.db.db_calls.get_tp_premium")
         try:
-            query = select(ODRate).filter(
-                ODRate.od_term == tenure,
-                ODRate.rto_zone == vehicle_data["rto_zone"],
-                ODRate.vehicle_type == vehicle_data["vehicle_type"],
-                ODRate.min_vehicle_age <= vehicle_data["vehicle_age"],
-                ODRate.max_vehicle_age > vehicle_data["vehicle_age"],
-            )
-            if vehicle_data["cubic_capacity"] != 0:
-                query = query.filter(
-                    ODRate.min_cc < vehicle_data["cubic_capacity"],
-                    ODRate.max_cc > vehicle_data["cubic_capacity"])
-            if vehicle_data["kilowatt_range"] != 0:
-                query = query.filter(
-                    ODRate.min_kw < vehicle_data["kilowatt_range"],
-                    ODRate.max_kw > vehicle_data["kilowatt_range"])
-
-            result = await sqldb.execute(query)
-            result = result.scalars().first()
+            if RateEngine.is_ready():
+                result = RateEngine.get_od_rate(vehicle_data=vehicle_data, tenure=tenure)
+            else:
+                query = cls.od_rate_query(vehicle_data=vehicle_data, tenure=tenure)
+                result = await sqldb.execute(query)
+                result = result.first()
             response_dict = {"od_premium": result.rate_percent}
             return CommunicationResponse(status=1, response_data=response_dict)
         except Exception as e:
@@ -58,22 +142,12 @@ class Pricing:
         """
         logger = logging.getLogger("app.db.db_calls.get_tp_premium")
         try:
-            query = select(TPRate).filter(
-                TPRate.tp_term == tenure,
-                TPRate.fuel_type == vehicle_data["fuel_type_id"],
-                TPRate.vehicle_type == vehicle_data["vehicle_type"],
-            )
-            if vehicle_data["cubic_capacity"] != 0:
-                query = query.filter(
-                    TPRate.min_cc < vehicle_data["cubic_capacity"],
-                    TPRate.max_cc > vehicle_data["cubic_capacity"])
-            if vehicle_data["kilowatt_range"] != 0:
-                query = query.filter(
-                    TPRate.min_kw < vehicle_data["kilowatt_range"],
-                    TPRate.max_kw > vehicle_data["kilowatt_range"])
-
-            result = await sqldb.execute(query)
-            result = result.scalars().first()
+            if RateEngine.is_ready():
+                result = RateEngine.get_tp_rate(vehicle_data=vehicle_data, tenure=tenure)
+            else:
+                query = cls.tp_rate_query(vehicle_data=vehicle_data, tenure=tenure)
+                result = await sqldb.execute(query)
+                result = result.first()
             response_dict = {"tp_premium": result.rate}
             return CommunicationResponse(status=1, response_data=response_dict)
         except Exception as e:
@@ -89,12 +163,15 @@ class Pricing:
         """
         logger = logging.getLogger("app.db.db_calls.get_vehicle_depreciation")
         try:
-            query = select(Depreciation).filter(
-                Depreciation.min_vehicle_age <= vehicle_age,
-                Depreciation.max_vehicle_age > vehicle_age,
-            )
-            result = await sqldb.execute(query)
-            result = result.scalars().first()
+            if RateEngine.is_ready():
+                result = RateEngine.get_depreciation(vehicle_age=vehicle_age)
+            else:
+                query = lambda_stmt(lambda: select(depreciation_table).where(
+                    depreciation_table.c.min_vehicle_age <= vehicle_age,
+                    depreciation_table.c.max_vehicle_age > vehicle_age,
+                ))
+                result = await sqldb.execute(query)
+                result = result.first()
             response_dict = {"depreciation_rate": result.depreciation_rate}
             return CommunicationResponse(status=1, response_data=response_dict)
         except Exception as e:
@@ -111,11 +188,15 @@ class Pricing:
         """
         logger = logging.getLogger("app.db.db_calls.get_tp_premium")
         try:
-            query = select(Discount).filter(
-                Discount.insurer_code == vehicle_data['insurer_code'],
-            )
-            result = await sqldb.execute(query)
-            result = result.scalars().first()
+            if RateEngine.is_ready():
+                result = RateEngine.get_od_discount(insurer_code=vehicle_data['insurer_code'])
+            else:
+                insurer_code = vehicle_data['insurer_code']
+                query = lambda_stmt(lambda: select(discount_table).where(
+                    discount_table.c.insurer_code == insurer_code,
+                ))
+                result = await sqldb.execute(query)
+                result = result.first()
             response_dict = {"rate_percent": result.discount_precent}
             return CommunicationResponse(status=1, response_data=response_dict)
         except Exception as e:
@@ -131,20 +212,12 @@ class Pricing:
         """
         logger = logging.getLogger("app.db.db_calls.get_addon_bundle_premium")
         try:
-            query = select(AddOnBundlePrice).filter(
-                AddOnBundlePrice.variant_id == vehicle_data["variant_id"],
-                AddOnBundlePrice.vehicle_type_id == vehicle_data["vehicle_type"],
-                AddOnBundlePrice.vehicle_min_age <= vehicle_data["vehicle_age"],
-                AddOnBundlePrice.vehicle_max_age > vehicle_data["vehicle_age"],
-                AddOnBundlePrice.insurer_code == vehicle_data["insurer_code"]
-            )
-            if vehicle_data["cubic_capacity"] != 0:
-                query = query.filter(
-                    AddOnBundlePrice.min_cc < vehicle_data["cubic_capacity"],
-                    AddOnBundlePrice.max_cc > vehicle_data["cubic_capacity"])
+            if RateEngine.is_ready():
+                return RateEngine.get_addon_bundle_prices(vehicle_data=vehicle_data)
+
+            query = cls.addon_bundle_price_query(vehicle_data=vehicle_data)
             result = await sqldb.execute(query)
-            result = result.scalars().all()
-            return result
+            return result.all()
         except Exception as e:
             error_message = f"Exception encounter {e} while fetching records with query {vehicle_data}."
             logger.exception(error_message)
@@ -159,34 +232,30 @@ class Pricing:
         :param total_idv:
         :return: this return the discount rates in percentage and rupees:
         """
+        response_data = []
+        for addon in await cls.get_addon_prices(vehicle_data=vehicle_data, addon_id_list=addon_id_list):
+            if addon.addon_premium:
+                response_data.append(AddonResponse.from_computed(id=addon.addon_id, premium=addon.addon_premium))
+            else:
+                response_data.append(AddonResponse.from_computed(
+                    id=addon.addon_id, premium=round(total_idv * addon.addon_percent / 100, 2)))
+        return response_data
+
+    @classmethod
+    async def get_addon_prices(cls, vehicle_data: dict, addon_id_list=None) -> List:
+        """
+        :param vehicle_data:
+        :param addon_id_list:
+        :return: the addon price rows of the vehicle, priced by a fixed addon_premium or an addon_percent of idv
+        """
         logger = logging.getLogger("app.db.db_calls.get_addon_premium")
         try:
-            query = select(AddOnPrice)
-            if addon_id_list:
-                query = query.filter(AddOnPrice.addon_id.in_(addon_id_list))
-
-            query = query.filter(
-                AddOnPrice.variant_id == vehicle_data["variant_id"],
-                AddOnPrice.vehicle_type_id == vehicle_data["vehicle_type"],
-                AddOnPrice.vehicle_min_age <= vehicle_data["vehicle_age"],
-                AddOnPrice.vehicle_max_age > vehicle_data["vehicle_age"],
-                AddOnPrice.insurer_code == vehicle_data["insurer_code"]
-            )
-            if vehicle_data["cubic_capacity"] != 0:
-                query = query.filter(
-                    AddOnPrice.min_cc < vehicle_data["cubic_capacity"],
-                    AddOnPrice.max_cc > vehicle_data["cubic_capacity"])
+            if RateEngine.is_ready():
+                return RateEngine.get_addon_prices(vehicle_data=vehicle_data, addon_id_list=addon_id_list)
+
+            query = cls.addon_price_query(vehicle_data=vehicle_data, addon_id_list=addon_id_list)
             result = await sqldb.execute(query)
-            result = result.scalars().all()
-
-            response_data = []
-            for addon in result:
-                if addon.addon_premium:
-                    response_data.append(AddonResponse(id=addon.addon_id, premium=addon.addon_premium))
-                else:
-                    response_data.append(
-                        AddonResponse(id=addon.addon_id, premium=round(total_idv * addon.addon_percent / 100, 2)))
-            return response_data
+            return result.all()
         except Exception as e:
             error_message = f"Exception encounter {e} while fetching records with query {vehicle_data}."
             logger.exception(error_message)
@@ -204,14 +273,18 @@ class Pricing:
         """
         logger = logging.getLogger("app.db.db_calls.get_pa_rate")
         try:
-            query = select(PARate).filter(
-                PARate.vehicle_type == vehicle_type,
-                PARate.cover_code == pa_type,
-                PARate.tp_tenure == tenure,
-                PARate.insurer_code == insurer_code
-            )
-            result = await sqldb.execute(query)
-            result = result.scalars().first()
+            if RateEngine.is_ready():
+                result = RateEngine.get_pa_rate(tenure=tenure, vehicle_type=vehicle_type, pa_type=pa_type,
+                                                insurer_code=insurer_code)
+            else:
+                query = lambda_stmt(lambda: select(pa_rate_table).where(
+                    pa_rate_table.c.vehicle_type == vehicle_type,
+                    pa_rate_table.c.cover_code == pa_type,
+                    pa_rate_table.c.tp_tenure == tenure,
+                    pa_rate_table.c.insurer_code == insurer_code
+                ))
+                result = await sqldb.execute(query)
+                result = result.first()
             response_dict = {"multiplier": result.per_10k_rate}
             return CommunicationResponse(status=1, response_data=response_dict)
         except Exception as e:
@@ -219,17 +292,42 @@ class Pricing:
             logger.exception(error_message)
             raise DatabaseConnectionException(logger.name, error_message)
 
+    @classmethod
+    async def get_voluntary_deductible(cls, vehicle_type: int, deductible: int) -> CommunicationResponse:
+        """
+        :param vehicle_type:
+        :param deductible:
+        :return: this return the discount rate in percentage and the max discount in rupees:
+        """
+        logger = logging.getLogger("app.db.db_calls.get_voluntary_deductible")
+        try:
+            if RateEngine.is_ready():
+                result = RateEngine.get_voluntary_deductible(vehicle_type=vehicle_type, deductible=deductible)
+            else:
+                query = lambda_stmt(lambda: select(voluntary_deductible_table).where(
+                    voluntary_deductible_table.c.vehicle_type == vehicle_type,
+                    voluntary_deductible_table.c.deductible == deductible
+                ))
+                result = await sqldb.execute(query)
+                result = result.first()
+            response_dict = {"discount_percent": result.discount_percent, "max_discount": result.max_discount}
+            return CommunicationResponse(status=1, response_data=response_dict)
+        except Exception as e:
+            error_message = f"Exception encounter {e} while fetching records with query {vehicle_type}."
+            logger.exception(error_message)
+            raise DatabaseConnectionException(logger.name, error_message)
+
     @classmethod
     async def get_od_discount_range(cls, discount_request) -> DiscountResponse:
-        variant_service_url = SERVICE_CREDENTIALS["dataverse"][
-                                  "dns"] + f"/api/v1/get_variant_by_id/{discount_request['variant_id']}"
-        variant_details = await AsyncHttpClient.get(url=variant_service_url)
-        max_value = select(func.max(Discount.discount_precent)).where(
-            Discount.variant_id == variant_details["id"],
-            Discount.model_id == str(variant_details["model_id"]),
-            Discount.fuel_type_id == variant_details["fuel_type_id"])
+        variant_details = await Dataverse.get("variant", f"/api/v1/get_variant_by_id/{discount_request['variant_id']}")
+        variant_id, model_id, fuel_type_id = \
+            variant_details["id"], str(variant_details["model_id"]), variant_details["fuel_type_id"]
+        max_value = lambda_stmt(lambda: select(func.max(discount_table.c.discount_precent)).where(
+            discount_table.c.variant_id == variant_id,
+            discount_table.c.model_id == model_id,
+            discount_table.c.fuel_type_id == fuel_type_id))
         max_value = await sqldb.execute(max_value)
-        max_value = max_value.scalars().first()
+        max_value = max_value.scalar()
         response_data = {
             "min_discount": 0,
             "max_discount": max_value
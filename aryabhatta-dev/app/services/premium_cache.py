@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import date
+from typing import Optional
+
+from app.schema.pricing import PriceResponse
+from app.services.cover_rates import CoverRates
+from app.services.rate_engine import RateEngine
+from app.settings import PREMIUM_CACHE_MAX_SIZE, PREMIUM_CACHE_SHARED_URL, PREMIUM_CACHE_TTL_SECONDS
+from app.utils.cache import AsyncTTLCache
+from app.utils.code_utils import india_date
+
+
+class InMemoryPremiumStore:
+    """Local stand-in for the shared tier, implements the subset of the redis client the cache uses."""
+
+    def __init__(self):
+        self._entries = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ex: int = None):
+        self._entries[key] = (time.monotonic() + (ex or PREMIUM_CACHE_TTL_SECONDS), value)
+
+
+def get_shared_store(url: str):
+    """
+    :param url: `redis://...` for a redis compatible server, `memory://` for the in process stand-in
+    :return: the shared store or None when no url is configured
+    """
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryPremiumStore()
+    # redis is only needed when a shared tier is configured
+    from redis import asyncio as redis
+    return redis.from_url(url)
+
+
+class PremiumCache:
+    """
+    Caches computed `PriceResponse`s under a hash of the pricing inputs and the version of the pricing
+    data, so a rate, cover or addon price change makes every older entry unreachable. The local tier is
+    backed by an optional shared tier, the quote identifiers are stamped on every hit.
+    """
+    logger = logging.getLogger("app.services.premium_cache")
+    local = AsyncTTLCache(name="premium", ttl=PREMIUM_CACHE_TTL_SECONDS, max_size=PREMIUM_CACHE_MAX_SIZE)
+    shared = get_shared_store(PREMIUM_CACHE_SHARED_URL)
+    shared_hits = 0
+    shared_errors = 0
+    # request fields echoed back or not used in pricing, rto_id is replaced by the rto_zone it resolves to
+    ignored_fields = {"quote_request_id", "quote_id", "insurer_logo", "vin_number", "prev_policy_number",
+                      "dealer_code", "rto_id", "registration_date", "policy_start_date", "policy_end_date"}
+    response_identifiers = ("quote_request_id", "quote_id", "insurer_logo")
+
+    @classmethod
+    def data_version(cls) -> Optional[str]:
+        """The versions of the rate engine snapshot, addon prices included, and of the cover rates."""
+        rate_version, cover_version = RateEngine.version(), CoverRates.version()
+        if not (rate_version and cover_version):
+            return None
+        return f"{rate_version}:{cover_version}"
+
+    @classmethod
+    def key(cls, vehicle_data: dict) -> Optional[str]:
+        """
+        :param vehicle_data: price request after `MotorAdaptor.infuse_model_data`
+        :return: cache key, None while the pricing data version is unknown
+        """
+        data_version = cls.data_version()
+        if not data_version:
+            return None
+        pricing_inputs = {key: value for key, value in vehicle_data.items() if key not in cls.ignored_fields}
+        # the break-in check runs on the date in India and the policy dates on the server date, a change of
+        # either changes left_days, is_breakin or the policy dates
+        pricing_inputs["pricing_date"] = [india_date().isoformat(), date.today().isoformat()]
+        canonical = json.dumps(pricing_inputs, sort_keys=True, default=str, separators=(",", ":"))
+        return "premium:" + hashlib.sha256(f"{data_version}|{canonical}".encode()).hexdigest()
+
+    @classmethod
+    async def get(cls, key: str, vehicle_data: dict) -> Optional[PriceResponse]:
+        cached = cls.local.get(key)
+        if cached is None and cls.shared:
+            try:
+                shared_value = await cls.shared.get(key)
+            except Exception as e:
+                cls.shared_errors += 1
+                cls.logger.warning(f"Exception encounter {e} while reading premium cache.")
+                shared_value = None
+            if shared_value is not None:
+                cls.shared_hits += 1
+                cached = json.loads(shared_value)
+                cls.local.set(key, cached)
+        if cached is None:
+            return None
+        return PriceResponse.from_computed(**cached,
+                                           **{field: vehicle_data.get(field) for field in cls.response_identifiers})
+
+    @classmethod
+    async def set(cls, key: str, price_response: PriceResponse):
+        cached = price_response.dict(exclude=set(cls.response_identifiers))
+        cls.local.set(key, cached)
+        if cls.shared:
+            try:
+                await cls.shared.set(key, json.dumps(cached), ex=PREMIUM_CACHE_TTL_SECONDS)
+            except Exception as e:
+                cls.shared_errors += 1
+                cls.logger.warning(f"Exception encounter {e} while writing premium cache.")
+
+    @classmethod
+    def stats(cls) -> dict:
+        stats = cls.local.stats()
+        stats.update({"shared_hits": cls.shared_hits, "shared_errors": cls.shared_errors,
+                      "data_version": cls.data_version()})
+        return stats
@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import itertools
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+from rb_utils.database import initiate_database, sqldb
+from sqlalchemy import Boolean, Float, Integer
+
+from app.models.pricing import AddOnBundlePrice, AddOnPrice, ODRate, TPRate
+from app.schema.pricing import RateCardLoadReport
+from app.settings import CONNECTION_CONFIG, RATE_CARD_CHUNK_SIZE, RATE_CARD_MAX_ERRORS
+from app.utils.exceptions import *
+
+# columns stamped by the loader, never read from the file
+LOADER_COLUMNS = ("id", "created_at", "modified_at", "valid_from", "valid_till")
+TRUE_VALUES = ("true", "t", "yes", "y", "1")
+FALSE_VALUES = ("false", "f", "no", "n", "0")
+FILE_FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+
+
+def to_integer(value) -> int:
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
+    if isinstance(value, bool) or value != int(value):
+        raise ValueError(f"{value!r} is not an integer")
+    return int(value)
+
+
+def to_boolean(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    lowered = str(value).lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return False
+    raise ValueError(f"{value!r} is not a boolean")
+
+
+def column_converter(column) -> Callable:
+    """Converts a file value to the python type COPY expects for the column, empty values to its default."""
+    if isinstance(column.type, Boolean):
+        convert = to_boolean
+    elif isinstance(column.type, Integer):
+        convert = to_integer
+    elif isinstance(column.type, Float):
+        convert = float
+    else:
+        convert = str
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+
+    def converter(value):
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            return default
+        return convert(value)
+    return converter
+
+
+class RateCard:
+    """
+    A rate table loadable in bulk. `scope` is the column a card of the table is keyed on, a load replaces
+    the rows of that insurer only, without it a load replaces the whole table.
+    """
+
+    def __init__(self, model, required: Tuple[str, ...], ranges: Tuple[Tuple[str, str], ...] = (),
+                 scope: Optional[str] = None):
+        self.model = model
+        self.table_name = model.__tablename__
+        self.required = required
+        self.ranges = ranges
+        self.scope = scope
+        self.columns = [column.name for column in model.__table__.columns if column.name not in LOADER_COLUMNS]
+        self.converters = [(column.name, column_converter(column)) for column in model.__table__.columns
+                           if column.name not in LOADER_COLUMNS]
+
+    def check_columns(self, file_columns: List[str]) -> List[str]:
+        errors = [f"unknown column {name}" for name in file_columns
+                  if name not in self.columns and name not in LOADER_COLUMNS]
+        errors += [f"missing required column {name}" for name in self.required if name not in file_columns]
+        return errors
+
+    def validate_row(self, row: dict, scope_value: Optional[str]) -> tuple:
+        record = {}
+        for name, converter in self.converters:
+            try:
+                record[name] = converter(row.get(name))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{name} {e}")
+        missing = [name for name in self.required if record[name] is None]
+        if missing:
+            raise ValueError(f"{', '.join(missing)} can not be empty")
+        for lower, upper in self.ranges:
+            if record[lower] is not None and record[upper] is not None and record[lower] >= record[upper]:
+                raise ValueError(f"{lower} {record[lower]} is not below {upper} {record[upper]}")
+        if self.scope:
+            if record[self.scope] is None:
+                record[self.scope] = scope_value
+            elif record[self.scope] != scope_value:
+                raise ValueError(f"{self.scope} {record[self.scope]} does not match the card {scope_value}")
+        return tuple(record[name] for name in self.columns)
+
+    def validate(self, rows: List[dict], first_row: int, scope_value: Optional[str]) -> Tuple[List[tuple], List[str]]:
+        """COPY records of the valid rows and the errors of the invalid ones, rows numbered from 1."""
+        records, errors = [], []
+        for number, row in enumerate(rows, start=first_row):
+            try:
+                records.append(self.validate_row(row, scope_value))
+            except ValueError as e:
+                errors.append(f"row {number}: {e}")
+        return records, errors
+
+
+class RateCardFile:
+    """Streams the rows of a CSV or Parquet rate card as chunks of dicts, Parquet needs the pyarrow package."""
+
+    def __init__(self, source: BinaryIO, file_format: str, chunk_size: int):
+        self.chunk_size = chunk_size
+        if file_format == "csv":
+            self.reader = csv.DictReader(codecs.iterdecode(source, "utf-8-sig"))
+            self.columns = [name.strip() for name in self.reader.fieldnames or []]
+            self.reader.fieldnames = self.columns
+        elif file_format == "parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RateCardValidationException("app.services.rate_card_loader",
+                                                  "Parquet rate cards need the pyarrow package.")
+            self.reader = pq.ParquetFile(source)
+            self.columns = self.reader.schema_arrow.names
+        else:
+            raise RateCardValidationException("app.services.rate_card_loader",
+                                              f"Unsupported rate card format {file_format}.")
+        self.file_format = file_format
+
+    def chunks(self) -> Iterator[List[dict]]:
+        if self.file_format == "parquet":
+            for batch in self.reader.iter_batches(batch_size=self.chunk_size):
+                yield batch.to_pylist()
+            return
+        while True:
+            chunk = list(itertools.islice(self.reader, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+class RateCardLoader:
+    """
+    Bulk loads rate cards from CSV or Parquet files. The file is read and validated in chunks off the
+    event loop and each chunk is COPYed into a session temp table while the next one is validated. The
+    card is then swapped in by one transaction, replacing the rows of the card with the staged rows
+    stamped with the `valid_from` cut-over. Pricing reads see either the old or the new card and are never
+    blocked, loads of the same card are serialized by an advisory lock. Nothing is written when any row
+    is invalid. Postgres (asyncpg) only.
+    """
+    logger = logging.getLogger("app.services.rate_card_loader")
+    cards = {
+        "od_rate": RateCard(
+            ODRate, required=("od_term", "rto_zone", "vehicle_type", "min_vehicle_age", "max_vehicle_age",
+                              "rate_percent"),
+            ranges=(("min_vehicle_age", "max_vehicle_age"), ("min_cc", "max_cc"), ("min_kw", "max_kw"))),
+        "tp_rate": RateCard(
+            TPRate, required=("tp_term", "fuel_type", "vehicle_type", "rate"),
+            ranges=(("min_cc", "max_cc"), ("min_kw", "max_kw"))),
+        "addon_price": RateCard(
+            AddOnPrice, required=("addon_id", "variant_id", "vehicle_type_id", "vehicle_min_age", "vehicle_max_age"),
+            ranges=(("vehicle_min_age", "vehicle_max_age"), ("min_cc", "max_cc")), scope="insurer_code"),
+        "addon_bundle_price": RateCard(
+            AddOnBundlePrice, required=("addon_bundle_id", "variant_id", "vehicle_type_id", "vehicle_min_age",
+                                        "vehicle_max_age", "bundle_premium"),
+            ranges=(("vehicle_min_age", "vehicle_max_age"), ("min_cc", "max_cc")), scope="insurer_code"),
+    }
+
+    @classmethod
+    def file_format(cls, filename: str) -> str:
+        suffix = "." + filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        if suffix not in FILE_FORMATS:
+            raise RateCardValidationException(cls.logger.name, f"Rate card {filename} is not a "
+                                                               f"{', '.join(FILE_FORMATS)} file.")
+        return FILE_FORMATS[suffix]
+
+    @classmethod
+    def card(cls, table_name: str, insurer_code: Optional[str]) -> RateCard:
+        card = cls.cards.get(table_name)
+        if card is None:
+            raise RateCardValidationException(cls.logger.name, f"{table_name} is not a bulk loadable rate table, "
+                                                               f"use one of {', '.join(cls.cards)}.")
+        if card.scope and not insurer_code:
+            raise RateCardValidationException(cls.logger.name, f"{table_name} cards are loaded per insurer, "
+                                                               f"insurer_code is required.")
+        if not card.scope and insurer_code:
+            raise RateCardValidationException(cls.logger.name, f"{table_name} cards are not loaded per insurer.")
+        return card
+
+    @classmethod
+    async def load(cls, table_name: str, source: BinaryIO, file_format: str, insurer_code: Optional[str] = None,
+                   valid_from: Optional[datetime] = None, chunk_size: int = RATE_CARD_CHUNK_SIZE) -> RateCardLoadReport:
+        """
+        Loads the rate card in `source` into `table_name`, replacing the current card of the table (or of
+        `insurer_code`) in one transaction.
+
+        :param valid_from: cut-over stamped on the new rows, the time of the swap when not given. Rate
+                           lookups do not filter on validity, a card is live from its swap, so it can not
+                           be in the future.
+        :return: row counts and throughput of the load
+        :raises RateCardValidationException: with the row errors when the file is not a valid card
+        """
+        card = cls.card(table_name, insurer_code)
+        if valid_from is not None and valid_from > datetime.now():
+            raise RateCardValidationException(cls.logger.name, f"valid_from {valid_from} is in the future, a rate "
+                                                               f"card is live from its swap.")
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        rate_card_file = await loop.run_in_executor(None, RateCardFile, source, file_format, chunk_size)
+        errors = card.check_columns(rate_card_file.columns)
+        if errors:
+            raise RateCardValidationException(cls.logger.name, f"Rate card columns do not match {table_name}.",
+                                              errors)
+
+        def next_chunk(chunks: Iterator[List[dict]], first_row: int):
+            chunk = next(chunks, None)
+            return (None, 0) if chunk is None else (card.validate(chunk, first_row, insurer_code), len(chunk))
+
+        staging_table = f"{table_name}_staging"
+        columns = ", ".join(card.columns)
+        rows, chunk_count, copying = 0, 0, None
+        try:
+            async with sqldb.get_engine().connect() as connection:
+                driver_connection = (await connection.get_raw_connection()).driver_connection
+                await driver_connection.execute(
+                    f"DROP TABLE IF EXISTS {staging_table}; "
+                    f"CREATE TEMP TABLE {staging_table} AS SELECT {columns} FROM {table_name} WITH NO DATA")
+                try:
+                    chunks = rate_card_file.chunks()
+                    while len(errors) < RATE_CARD_MAX_ERRORS:
+                        validated, size = await loop.run_in_executor(None, next_chunk, chunks, rows + 1)
+                        if validated is None:
+                            break
+                        records, chunk_errors = validated
+                        rows, chunk_count = rows + size, chunk_count + 1
+                        errors += chunk_errors
+                        if copying is not None:
+                            await copying
+                        if not errors:
+                            copying = asyncio.ensure_future(driver_connection.copy_records_to_table(
+                                staging_table, records=records, columns=card.columns))
+                    if copying is not None:
+                        await copying
+                    if errors:
+                        raise RateCardValidationException(
+                            cls.logger.name, f"Rate card for {table_name} has invalid rows, nothing was loaded.",
+                            errors[:RATE_CARD_MAX_ERRORS])
+                    loaded = time.perf_counter()
+
+                    valid_from = valid_from or datetime.now()
+                    async with driver_connection.transaction():
+                        await driver_connection.execute(
+                            "SELECT pg_advisory_xact_lock(hashtext($1))", f"rate_card:{table_name}:{insurer_code}")
+                        if card.scope:
+                            status = await driver_connection.execute(
+                                f"DELETE FROM {table_name} WHERE {card.scope} = $1", insurer_code)
+                        else:
+                            status = await driver_connection.execute(f"DELETE FROM {table_name}")
+                        await driver_connection.execute(
+                            f"INSERT INTO {table_name} ({columns}, valid_from, created_at) "
+                            f"SELECT {columns}, $1::timestamp, $1::timestamp FROM {staging_table}", valid_from)
+                    swapped = time.perf_counter()
+                    await driver_connection.execute(f"ANALYZE {table_name}")
+                finally:
+                    if copying is not None:
+                        await asyncio.gather(copying, return_exceptions=True)
+                    await driver_connection.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        except RateCardValidationException:
+            raise
+        except Exception as e:
+            msg = f"Exception encounter {e} while loading {table_name} rate card."
+            cls.logger.exception(msg)
+            raise DatabaseConnectionException(cls.logger.name, msg)
+
+        total_seconds = time.perf_counter() - started
+        report = RateCardLoadReport(
+            table_name=table_name, insurer_code=insurer_code, valid_from=valid_from, rows=rows,
+            replaced_rows=int(status.split()[-1]), chunks=chunk_count, load_seconds=round(loaded - started, 3),
+            swap_seconds=round(swapped - loaded, 3), total_seconds=round(total_seconds, 3),
+            rows_per_second=round(rows / total_seconds, 1) if total_seconds else 0)
+        cls.logger.info(f"Rate card loaded {report.dict()}.")
+        return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk load a CSV or Parquet rate card into a rate table.")
+    parser.add_argument("path", help="rate card file, .csv or .parquet")
+    parser.add_argument("--table", required=True, choices=list(RateCardLoader.cards), help="rate table to load")
+    parser.add_argument("--insurer-code", help="insurer of the card, required by the per insurer tables")
+    parser.add_argument("--valid-from", type=datetime.fromisoformat, help="cut-over stamped on the rows")
+    parser.add_argument("--chunk-size", type=int, default=RATE_CARD_CHUNK_SIZE)
+    parser.add_argument("--database-url", help="async SQLAlchemy url, the service database when not given")
+    return parser.parse_args()
+
+
+async def main(args):
+    connection_config = {"connection_string": args.database_url} if args.database_url else CONNECTION_CONFIG
+    initiate_database(database_type="sql", connection_config=connection_config)
+    try:
+        with open(args.path, "rb") as source:
+            report = await RateCardLoader.load(
+                table_name=args.table, source=source, file_format=RateCardLoader.file_format(args.path),
+                insurer_code=args.insurer_code, valid_from=args.valid_from, chunk_size=args.chunk_size)
+        print(json.dumps(report.dict(), default=str, indent=2))
+    except RateCardValidationException as e:
+        print(e.message)
+        for error in e.errors:
+            print(f"  {error}")
+        return 1
+    finally:
+        await sqldb.get_engine().dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,323 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from rb_utils.database import sqldb
+from sqlalchemy import select
+
+from app.models.pricing import AddOnBundlePrice, AddOnPrice, Depreciation, Discount, ODRate, PARate, TPRate, \
+    VoluntaryDeductible
+from app.services.rate_snapshot_file import MappedRateSnapshot, lock_publish, try_lock, write_snapshot
+from app.settings import RATE_SNAPSHOT_PATH
+
+
+def in_range(lower, upper, value, lower_inclusive: bool = False) -> bool:
+    """
+    Mirrors the SQL range predicates used by the pricing queries, a NULL bound never matches.
+    """
+    if lower is None or upper is None or value is None:
+        return False
+    if lower_inclusive:
+        return lower <= value < upper
+    return lower < value < upper
+
+
+class IntervalIndex:
+    """
+    Rows bucketed on an exact match key and sorted on the lower bound of one range column, so a lookup
+    only walks the rows of a single bucket whose lower bound does not exceed the probed value.
+    """
+
+    def __init__(self, key: Callable, lower: Optional[str] = None, upper: Optional[str] = None,
+                 lower_inclusive: bool = True):
+        self.key = key
+        self.lower = lower
+        self.upper = upper
+        self.lower_inclusive = lower_inclusive
+        self._buckets: Dict[tuple, List] = {}
+        self._bounds: Dict[tuple, List] = {}
+        self._unbounded: Dict[tuple, List] = {}
+
+    def build(self, rows) -> "IntervalIndex":
+        buckets = defaultdict(list)
+        for row in rows:
+            buckets[self.key(row)].append(row)
+
+        for bucket_key, bucket in buckets.items():
+            if not self.lower:
+                self._buckets[bucket_key] = sorted(bucket, key=lambda row: row.id)
+                continue
+            bounded = [row for row in bucket if getattr(row, self.lower) is not None]
+            bounded.sort(key=lambda row: (getattr(row, self.lower), row.id))
+            self._buckets[bucket_key] = bounded
+            self._bounds[bucket_key] = [getattr(row, self.lower) for row in bounded]
+            self._unbounded[bucket_key] = [row for row in bucket if getattr(row, self.lower) is None]
+        return self
+
+    def first(self, key: tuple, value=None, predicate: Callable = None):
+        """
+        Returns the lowest id row of the bucket which contains value (when given) and satisfies predicate,
+        the same row `.first()` would give for the equivalent query on an unordered heap scan.
+        """
+        return min(self.matches(key, value, predicate), key=lambda row: row.id, default=None)
+
+    def all(self, key: tuple, value=None, predicate: Callable = None) -> List:
+        return sorted(self.matches(key, value, predicate), key=lambda row: row.id)
+
+    def matches(self, key: tuple, value=None, predicate: Callable = None):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return
+
+        if self.lower and value is not None:
+            bounds = self._bounds[key]
+            end = bisect.bisect_right(bounds, value) if self.lower_inclusive else bisect.bisect_left(bounds, value)
+            candidates = (bucket[position] for position in range(end))
+        elif self.lower:
+            candidates = bucket + self._unbounded[key]
+        else:
+            candidates = bucket
+
+        for row in candidates:
+            if self.lower and value is not None:
+                upper = getattr(row, self.upper)
+                if upper is None or upper <= value:
+                    continue
+            if predicate and not predicate(row):
+                continue
+            yield row
+
+
+def vehicle_predicate(vehicle_data: dict, cubic_capacity: bool = True, kilowatt: bool = True) -> Callable:
+    """The cubic capacity and kilowatt filters the rate queries add when the vehicle has them."""
+    vehicle_cc = vehicle_data["cubic_capacity"] if cubic_capacity else 0
+    kilowatt_range = vehicle_data["kilowatt_range"] if kilowatt else 0
+
+    def predicate(row) -> bool:
+        if vehicle_cc != 0 and not in_range(row.min_cc, row.max_cc, vehicle_cc):
+            return False
+        if kilowatt_range != 0 and not in_range(row.min_kw, row.max_kw, kilowatt_range):
+            return False
+        return True
+
+    return predicate
+
+
+class RateSnapshot:
+    """Immutable set of interval indexes built from one read of the rate tables."""
+
+    def __init__(self, tables: Dict[str, List], version: str):
+        self.version = version
+        self.loaded_at = datetime.now()
+        self.tables = tables
+        self.row_counts = {name: len(rows) for name, rows in tables.items()}
+        self.od_rate = IntervalIndex(
+            key=lambda row: (row.od_term, row.rto_zone, row.vehicle_type),
+            lower="min_vehicle_age", upper="max_vehicle_age").build(tables["od_rate"])
+        self.tp_rate = IntervalIndex(
+            key=lambda row: (row.tp_term, row.fuel_type, row.vehicle_type),
+            lower="min_cc", upper="max_cc", lower_inclusive=False).build(tables["tp_rate"])
+        self.depreciation = IntervalIndex(
+            key=lambda row: (), lower="min_vehicle_age", upper="max_vehicle_age").build(tables["depreciation"])
+        self.pa_rate = IntervalIndex(
+            key=lambda row: (row.vehicle_type, row.cover_code, row.tp_tenure, row.insurer_code)
+        ).build(tables["pa_rate"])
+        self.discount = IntervalIndex(key=lambda row: (row.insurer_code,)).build(tables["discount"])
+        self.voluntary_deductible = IntervalIndex(
+            key=lambda row: (row.vehicle_type, row.deductible)).build(tables["voluntary_deductible"])
+        self.addon_price = IntervalIndex(
+            key=lambda row: (row.variant_id, row.vehicle_type_id, row.insurer_code),
+            lower="vehicle_min_age", upper="vehicle_max_age").build(tables["addon_price"])
+        self.addon_bundle_price = IntervalIndex(
+            key=lambda row: (row.variant_id, row.vehicle_type_id, row.insurer_code),
+            lower="vehicle_min_age", upper="vehicle_max_age").build(tables["addon_bundle_price"])
+
+    def get_od_rate(self, vehicle_data: dict, tenure: int):
+        return self.od_rate.first(
+            (tenure, vehicle_data["rto_zone"], vehicle_data["vehicle_type"]),
+            value=vehicle_data["vehicle_age"], predicate=vehicle_predicate(vehicle_data))
+
+    def get_tp_rate(self, vehicle_data: dict, tenure: int):
+        return self.tp_rate.first(
+            (tenure, vehicle_data["fuel_type_id"], vehicle_data["vehicle_type"]),
+            value=vehicle_data["cubic_capacity"] or None,
+            predicate=vehicle_predicate(vehicle_data, cubic_capacity=False))
+
+    def get_depreciation(self, vehicle_age: int):
+        return self.depreciation.first((), value=vehicle_age)
+
+    def get_od_discount(self, insurer_code: str):
+        return self.discount.first((insurer_code,))
+
+    def get_pa_rate(self, tenure: int, vehicle_type: int, pa_type: str, insurer_code: str):
+        return self.pa_rate.first((vehicle_type, pa_type, tenure, insurer_code))
+
+    def get_voluntary_deductible(self, vehicle_type: int, deductible: int):
+        return self.voluntary_deductible.first((vehicle_type, deductible))
+
+    def get_addon_prices(self, vehicle_data: dict, addon_id_list: List[int] = None) -> List:
+        predicate = vehicle_predicate(vehicle_data, kilowatt=False)
+        rows = self.addon_price.all(
+            (vehicle_data["variant_id"], vehicle_data["vehicle_type"], vehicle_data["insurer_code"]),
+            value=vehicle_data["vehicle_age"], predicate=predicate)
+        if addon_id_list:
+            rows = [row for row in rows if row.addon_id in addon_id_list]
+        return rows
+
+    def get_addon_bundle_prices(self, vehicle_data: dict) -> List:
+        return self.addon_bundle_price.all(
+            (vehicle_data["variant_id"], vehicle_data["vehicle_type"], vehicle_data["insurer_code"]),
+            value=vehicle_data["vehicle_age"], predicate=vehicle_predicate(vehicle_data, kilowatt=False))
+
+
+class RateEngine:
+    """
+    In memory replacement for the rate lookups of `Pricing`. The rate tables are read once into a
+    `RateSnapshot` and refreshed in the background, lookups then never leave the process.
+
+    With RATE_SNAPSHOT_PATH set the workers of a node share one snapshot file instead. The worker
+    holding the file lock reads the database and publishes a new file on change, every worker maps
+    the current file read-only, so the rates are held once per node by the page cache.
+    """
+    logger = logging.getLogger("app.services.rate_engine")
+    models = {
+        "od_rate": ODRate,
+        "tp_rate": TPRate,
+        "depreciation": Depreciation,
+        "pa_rate": PARate,
+        "discount": Discount,
+        "voluntary_deductible": VoluntaryDeductible,
+        "addon_price": AddOnPrice,
+        "addon_bundle_price": AddOnBundlePrice,
+    }
+    _snapshot: Optional[Union[RateSnapshot, MappedRateSnapshot]] = None
+    _loader_lock = None
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        return cls._snapshot is not None
+
+    @classmethod
+    def version(cls) -> Optional[str]:
+        return cls._snapshot.version if cls._snapshot else None
+
+    @classmethod
+    def snapshot(cls) -> Optional[Union[RateSnapshot, MappedRateSnapshot]]:
+        return cls._snapshot
+
+    @classmethod
+    async def read_tables(cls) -> Tuple[Dict[str, List], str]:
+        tables = {}
+        digest = hashlib.sha1()
+        for name, model in cls.models.items():
+            result = await sqldb.execute(select(model.__table__).order_by(model.id))
+            tables[name] = result.all()
+            digest.update(repr([tuple(row) for row in tables[name]]).encode())
+        return tables, digest.hexdigest()
+
+    @classmethod
+    async def load(cls, publish: bool = False) -> bool:
+        """
+        Reads every rate table and swaps in a freshly built snapshot. A failed load keeps serving the
+        previous snapshot (or the database when there is none).
+
+        :param publish: with RATE_SNAPSHOT_PATH, publish the rates even when this worker is not the loader
+        """
+        if RATE_SNAPSHOT_PATH:
+            return await cls.load_shared(RATE_SNAPSHOT_PATH, publish=publish)
+        try:
+            tables, version = await cls.read_tables()
+            if cls._snapshot and cls._snapshot.version == version:
+                return True
+            cls._snapshot = RateSnapshot(tables=tables, version=version)
+            cls.logger.info(f"Rate engine loaded version {version} with {cls._snapshot.row_counts}.")
+            return True
+        except Exception as e:
+            cls.logger.exception(f"Exception encounter {e} while loading rate tables in rate engine.")
+            return False
+
+    @classmethod
+    async def load_shared(cls, path: str, publish: bool = False) -> bool:
+        """
+        Publishes a new snapshot file when this worker is the loader (or publish is set) and the rates
+        changed, then maps the current file if it is not mapped yet. Other workers never read the database,
+        the loader role moves to another worker when its process exits and the lock is released.
+        """
+        try:
+            if cls._loader_lock is None:
+                cls._loader_lock = try_lock(path)
+            if cls._loader_lock is not None or publish:
+                await cls.publish(path)
+
+            if cls._snapshot is not None and cls._snapshot.is_current(path):
+                return True
+            if not MappedRateSnapshot.exists(path):
+                cls.logger.warning(f"Rate snapshot {path} is not published yet, rates are read from the database.")
+                return False
+            cls._snapshot = MappedRateSnapshot(path)
+            cls.logger.info(f"Rate engine mapped snapshot version {cls._snapshot.version} with "
+                            f"{cls._snapshot.row_counts}.")
+            return True
+        except Exception as e:
+            cls.logger.exception(f"Exception encounter {e} while loading rate snapshot {path} in rate engine.")
+            return False
+
+    @classmethod
+    async def publish(cls, path: str):
+        """Reads every rate table and renames a new snapshot file over path when the rates changed."""
+        loop = asyncio.get_running_loop()
+        publish_lock = await loop.run_in_executor(None, lock_publish, path)
+        try:
+            tables, version = await cls.read_tables()
+            if MappedRateSnapshot.read_version(path) != version:
+                columns = {name: model.__table__.columns for name, model in cls.models.items()}
+                await loop.run_in_executor(None, write_snapshot, path, tables, columns, version)
+                cls.logger.info(f"Rate engine published snapshot version {version} to {path}.")
+        finally:
+            publish_lock.close()
+
+    @classmethod
+    async def refresh_periodically(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            await cls.load()
+
+    @classmethod
+    def reset(cls):
+        cls._snapshot = None
+
+    @classmethod
+    def get_od_rate(cls, vehicle_data: dict, tenure: int):
+        return cls._snapshot.get_od_rate(vehicle_data, tenure)
+
+    @classmethod
+    def get_tp_rate(cls, vehicle_data: dict, tenure: int):
+        return cls._snapshot.get_tp_rate(vehicle_data, tenure)
+
+    @classmethod
+    def get_depreciation(cls, vehicle_age: int):
+        return cls._snapshot.get_depreciation(vehicle_age)
+
+    @classmethod
+    def get_od_discount(cls, insurer_code: str):
+        return cls._snapshot.get_od_discount(insurer_code)
+
+    @classmethod
+    def get_pa_rate(cls, tenure: int, vehicle_type: int, pa_type: str, insurer_code: str):
+        return cls._snapshot.get_pa_rate(tenure, vehicle_type, pa_type, insurer_code)
+
+    @classmethod
+    def get_voluntary_deductible(cls, vehicle_type: int, deductible: int):
+        return cls._snapshot.get_voluntary_deductible(vehicle_type, deductible)
+
+    @classmethod
+    def get_addon_prices(cls, vehicle_data: dict, addon_id_list: List[int] = None) -> List:
+        return cls._snapshot.get_addon_prices(vehicle_data, addon_id_list)
+
+    @classmethod
+    def get_addon_bundle_prices(cls, vehicle_data: dict) -> List:
+        return cls._snapshot.get_addon_bundle_prices(vehicle_data)
@@ -0,0 +1,348 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+from collections import namedtuple
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, IO, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import Boolean, Float, Integer, String
+
+MAGIC = b"ARYABHATTA-RATES-1\n"
+ALIGNMENT = 64
+
+# exact match columns of every table, rows are stored sorted on the hash of these
+KEY_COLUMNS = {
+    "od_rate": ("od_term", "rto_zone", "vehicle_type"),
+    "tp_rate": ("tp_term", "fuel_type", "vehicle_type"),
+    "depreciation": (),
+    "pa_rate": ("vehicle_type", "cover_code", "tp_tenure", "insurer_code"),
+    "discount": ("insurer_code",),
+    "voluntary_deductible": ("vehicle_type", "deductible"),
+    "addon_price": ("variant_id", "vehicle_type_id", "insurer_code"),
+    "addon_bundle_price": ("variant_id", "vehicle_type_id", "insurer_code"),
+}
+
+
+def key_hash(values: Iterable) -> int:
+    """Hash of an exact match key, numbers hash alike whether they are given as int or float."""
+    normalized = tuple(float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+                       for value in values)
+    return int.from_bytes(hashlib.blake2b(repr(normalized).encode(), digest_size=8).digest(), "little", signed=True)
+
+
+def column_kind(column) -> Optional[str]:
+    """Columns stored in the snapshot, timestamps are not used by the lookups and are left out."""
+    if isinstance(column.type, (Integer, Boolean)):
+        return "int"
+    if isinstance(column.type, Float):
+        return "float"
+    if isinstance(column.type, String):
+        return "str"
+    return None
+
+
+def data_start(header_length: int) -> int:
+    """Column offsets in the header are relative to the aligned start of the data after the header."""
+    prefix_length = len(MAGIC) + 8 + header_length
+    return prefix_length + (-prefix_length % ALIGNMENT)
+
+
+def try_lock(path: str) -> Optional[IO]:
+    """
+    Takes the loader lock of the snapshot at path without waiting. The returned file holds the lock
+    until it is closed or the process exits, None means another process is the loader.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lock_file = open(f"{path}.lock", "a")
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def lock_publish(path: str) -> IO:
+    """
+    Waits for the publish lock of the snapshot at path. A publisher holds it from reading the rates until
+    the file is renamed, so a slower publish never renames older rates over a newer snapshot.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lock_file = open(f"{path}.publish.lock", "a")
+    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+    return lock_file
+
+
+def write_snapshot(path: str, tables: Dict[str, List], columns: Dict[str, Iterable], version: str):
+    """
+    Compiles the rate tables into one column oriented file next to path and renames it over path, so a
+    reader sees either the previous or the new snapshot and never a partly written one.
+
+    :param tables: rows of every table, by table name
+    :param columns: SQLAlchemy columns of every table, by table name
+    :param version: version of the rates the rows were read at
+    """
+    strings: Dict[str, int] = {}
+    header = {"version": version, "built_at": datetime.now().isoformat(), "tables": {}}
+    buffers = []
+    offset = 0
+
+    def add_buffer(array: np.ndarray) -> int:
+        nonlocal offset
+        padding = -offset % ALIGNMENT
+        buffers.append(b"\0" * padding)
+        offset += padding
+        array_offset = offset
+        buffers.append(array.tobytes())
+        offset += array.nbytes
+        return array_offset
+
+    for name, rows in tables.items():
+        key_columns = KEY_COLUMNS[name]
+        hashes = [key_hash(getattr(row, column) for column in key_columns) for row in rows]
+        order = sorted(range(len(rows)), key=lambda position: (hashes[position], rows[position].id))
+        rows = [rows[position] for position in order]
+        table_header = {"rows": len(rows), "key_columns": key_columns, "columns": {}}
+        sorted_hashes = np.array([hashes[position] for position in order], dtype="<i8")
+        table_header["columns"]["_key_hash"] = {"kind": "hash", "dtype": "<i8", "offset": add_buffer(sorted_hashes)}
+
+        for column in columns[name]:
+            kind = column_kind(column)
+            if kind is None:
+                continue
+            values = [getattr(row, column.name) for row in rows]
+            if kind == "str":
+                array = np.array([-1 if value is None else strings.setdefault(value, len(strings))
+                                  for value in values], dtype="<i4")
+            else:
+                array = np.array([np.nan if value is None else value for value in values], dtype="<f8")
+            table_header["columns"][column.name] = {
+                "kind": kind, "dtype": array.dtype.str, "offset": add_buffer(array)}
+        header["tables"][name] = table_header
+
+    header["strings"] = sorted(strings, key=strings.get)
+    encoded_header = json.dumps(header).encode()
+    prefix_length = len(MAGIC) + 8 + len(encoded_header)
+
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as snapshot_file:
+        snapshot_file.write(MAGIC)
+        snapshot_file.write(len(encoded_header).to_bytes(8, "little"))
+        snapshot_file.write(encoded_header)
+        snapshot_file.write(b"\0" * (data_start(len(encoded_header)) - prefix_length))
+        for buffer in buffers:
+            snapshot_file.write(buffer)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary_path, path)
+
+
+class MappedRateTable:
+    """One table of a mapped snapshot, every column is a read-only array over the shared mapping."""
+
+    def __init__(self, name: str, header: dict, mapping: mmap.mmap, start: int, strings: List[str],
+                 string_codes: Dict[str, int]):
+        self.name = name
+        self.size = header["rows"]
+        self.key_columns = header["key_columns"]
+        self.strings = strings
+        self.string_codes = string_codes
+        self.kinds = {column: spec["kind"] for column, spec in header["columns"].items() if column != "_key_hash"}
+        self.arrays = {column: np.frombuffer(mapping, dtype=spec["dtype"], count=self.size,
+                                             offset=start + spec["offset"])
+                       for column, spec in header["columns"].items()}
+        self.row_type = namedtuple(name, list(self.kinds))
+
+    def positions(self, key: tuple) -> np.ndarray:
+        """Positions of the rows whose exact match columns equal key, in storage order."""
+        hashes = self.arrays["_key_hash"]
+        probe = key_hash(key)
+        start, end = np.searchsorted(hashes, probe, "left"), np.searchsorted(hashes, probe, "right")
+        mask = np.ones(end - start, dtype=bool)
+        for column, value in zip(self.key_columns, key):
+            mask &= self.equals(column, value, start, end)
+        return np.arange(start, end)[mask]
+
+    def equals(self, column: str, value, start: int, end: int) -> np.ndarray:
+        values = self.arrays[column][start:end]
+        if self.kinds[column] == "str":
+            return values == (-1 if value is None else self.string_codes.get(value, -2))
+        if value is None:
+            return np.isnan(values)
+        try:
+            return values == float(value)
+        except (TypeError, ValueError):
+            return np.zeros(end - start, dtype=bool)
+
+    def in_range(self, positions: np.ndarray, lower: str, upper: str, value,
+                 lower_inclusive: bool = False) -> np.ndarray:
+        """Same semantics as `rate_engine.in_range`, a NULL bound (nan) never matches."""
+        lower_values, upper_values = self.arrays[lower][positions], self.arrays[upper][positions]
+        above_lower = lower_values <= value if lower_inclusive else lower_values < value
+        return above_lower & (value < upper_values)
+
+    def row(self, position: int):
+        values = []
+        for column, kind in self.kinds.items():
+            value = self.arrays[column].item(position)
+            if kind == "str":
+                values.append(None if value < 0 else self.strings[value])
+            elif value != value:
+                values.append(None)
+            else:
+                values.append(int(value) if kind == "int" else value)
+        return self.row_type(*values)
+
+    def rows(self, positions: np.ndarray, first: bool = False):
+        if not len(positions):
+            return None if first else []
+        ids = self.arrays["id"][positions]
+        if first:
+            return self.row(positions[np.argmin(ids)])
+        return [self.row(position) for position in positions[np.argsort(ids, kind="stable")]]
+
+
+class MappedTables(Mapping):
+    """Rows of a mapped snapshot by table name, decoded on first access for callers which need plain rows."""
+
+    def __init__(self, tables: Dict[str, MappedRateTable]):
+        self._tables = tables
+        self._rows = {}
+
+    def __getitem__(self, name: str) -> List:
+        if name not in self._rows:
+            table = self._tables[name]
+            self._rows[name] = table.rows(np.arange(table.size))
+        return self._rows[name]
+
+    def __iter__(self):
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+
+class MappedRateSnapshot:
+    """
+    Rate snapshot file mapped read-only. It answers the same lookups as `RateSnapshot` with array
+    operations on the rows of one key, which are contiguous in the file.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as snapshot_file:
+            self.identity = self.file_identity(os.fstat(snapshot_file.fileno()))
+            self._mapping = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self.read_header(self._mapping)
+        start = data_start(int.from_bytes(self._mapping[len(MAGIC):len(MAGIC) + 8], "little"))
+        self.version = header["version"]
+        self.built_at = header["built_at"]
+        self.loaded_at = datetime.now()
+        strings = header["strings"]
+        string_codes = {value: code for code, value in enumerate(strings)}
+        self._tables = {name: MappedRateTable(name, table_header, self._mapping, start, strings, string_codes)
+                        for name, table_header in header["tables"].items()}
+        self.row_counts = {name: table.size for name, table in self._tables.items()}
+        self.tables = MappedTables(self._tables)
+
+    @staticmethod
+    def file_identity(stat: os.stat_result) -> tuple:
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def read_header(buffer) -> dict:
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a rate snapshot file.")
+        header_length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], "little")
+        return json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.exists(path)
+
+    @classmethod
+    def read_version(cls, path: str) -> Optional[str]:
+        """Version of the snapshot published at path, None when there is none or it is unreadable."""
+        try:
+            with open(path, "rb") as snapshot_file:
+                prefix = snapshot_file.read(len(MAGIC) + 8)
+                header_length = int.from_bytes(prefix[len(MAGIC):], "little")
+                return cls.read_header(prefix + snapshot_file.read(header_length))["version"]
+        except (OSError, ValueError):
+            return None
+
+    def is_current(self, path: str) -> bool:
+        """False once a newer snapshot was renamed over path."""
+        try:
+            return self.file_identity(os.stat(path)) == self.identity
+        except OSError:
+            return True
+
+    def get_od_rate(self, vehicle_data: dict, tenure: int):
+        table = self._tables["od_rate"]
+        positions = table.positions((tenure, vehicle_data["rto_zone"], vehicle_data["vehicle_type"]))
+        if vehicle_data["vehicle_age"] is not None:
+            positions = positions[table.in_range(
+                positions, "min_vehicle_age", "max_vehicle_age", vehicle_data["vehicle_age"], lower_inclusive=True)]
+        positions = self.vehicle_filter(table, positions, vehicle_data)
+        return table.rows(positions, first=True)
+
+    def get_tp_rate(self, vehicle_data: dict, tenure: int):
+        table = self._tables["tp_rate"]
+        positions = table.positions((tenure, vehicle_data["fuel_type_id"], vehicle_data["vehicle_type"]))
+        positions = self.vehicle_filter(table, positions, vehicle_data)
+        return table.rows(positions, first=True)
+
+    def get_depreciation(self, vehicle_age: int):
+        table = self._tables["depreciation"]
+        positions = table.positions(())
+        if vehicle_age is not None:
+            positions = positions[table.in_range(
+                positions, "min_vehicle_age", "max_vehicle_age", vehicle_age, lower_inclusive=True)]
+        return table.rows(positions, first=True)
+
+    def get_od_discount(self, insurer_code: str):
+        table = self._tables["discount"]
+        return table.rows(table.positions((insurer_code,)), first=True)
+
+    def get_pa_rate(self, tenure: int, vehicle_type: int, pa_type: str, insurer_code: str):
+        table = self._tables["pa_rate"]
+        return table.rows(table.positions((vehicle_type, pa_type, tenure, insurer_code)), first=True)
+
+    def get_voluntary_deductible(self, vehicle_type: int, deductible: int):
+        table = self._tables["voluntary_deductible"]
+        return table.rows(table.positions((vehicle_type, deductible)), first=True)
+
+    def get_addon_prices(self, vehicle_data: dict, addon_id_list: List[int] = None) -> List:
+        table = self._tables["addon_price"]
+        positions = self.addon_positions(table, vehicle_data)
+        if addon_id_list:
+            positions = positions[np.isin(table.arrays["addon_id"][positions], addon_id_list)]
+        return table.rows(positions)
+
+    def get_addon_bundle_prices(self, vehicle_data: dict) -> List:
+        table = self._tables["addon_bundle_price"]
+        return table.rows(self.addon_positions(table, vehicle_data))
+
+    @classmethod
+    def addon_positions(cls, table: MappedRateTable, vehicle_data: dict) -> np.ndarray:
+        positions = table.positions(
+            (vehicle_data["variant_id"], vehicle_data["vehicle_type"], vehicle_data["insurer_code"]))
+        if vehicle_data["vehicle_age"] is not None:
+            positions = positions[table.in_range(
+                positions, "vehicle_min_age", "vehicle_max_age", vehicle_data["vehicle_age"], lower_inclusive=True)]
+        if vehicle_data["cubic_capacity"] != 0:
+            positions = positions[table.in_range(positions, "min_cc", "max_cc", vehicle_data["cubic_capacity"])]
+        return positions
+
+    @classmethod
+    def vehicle_filter(cls, table: MappedRateTable, positions: np.ndarray, vehicle_data: dict) -> np.ndarray:
+        """The cubic capacity and kilowatt filters the rate queries add when the vehicle has them."""
+        if vehicle_data["cubic_capacity"] != 0:
+            positions = positions[table.in_range(positions, "min_cc", "max_cc", vehicle_data["cubic_capacity"])]
+        if vehicle_data["kilowatt_range"] != 0:
+            positions = positions[table.in_range(positions, "min_kw", "max_kw", vehicle_data["kilowatt_range"])]
+        return positions
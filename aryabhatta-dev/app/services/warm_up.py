@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from rb_utils.async_http_client import AsyncHttpClient
+from rb_utils.database import sqldb
+from sqlalchemy import text
+
+from app.calculator.motor_adaptor.addon_premium_calculator import AddonPremiumCalculator
+from app.services.cover_rates import CoverRates
+from app.services.dataverse import Dataverse
+from app.services.db_interactions import Pricing
+from app.services.rate_engine import RateEngine
+from app.settings import COVER_RATE_SNAPSHOT_ENABLED, RATE_ENGINE_ENABLED, WARM_UP_DB_CONNECTIONS, \
+    WARM_UP_HTTP_CONNECTIONS, WARM_UP_RETRY_SECONDS
+
+# one vehicle per shape of the rate queries, the cc and kw range filters are only added for non zero values
+WARM_UP_VEHICLES = [
+    {"rto_zone": 1, "vehicle_type": 1, "vehicle_age": 1, "fuel_type_id": 1, "variant_id": 1, "insurer_code": "",
+     "cubic_capacity": cubic_capacity, "kilowatt_range": kilowatt_range}
+    for cubic_capacity, kilowatt_range in [(1000, 0), (0, 100), (1000, 100), (0, 0)]
+]
+
+
+class WarmUp:
+    """
+    Warms a worker up before it takes traffic: opens the database and dataverse connections, loads the
+    rate and cover rate snapshots, compiles the rate queries into the SQLAlchemy compiled cache and loads
+    the reference data every price request reads. The worker reports ready once it is done, a warm up
+    which can not reach the database is retried every WARM_UP_RETRY_SECONDS.
+    """
+    logger = logging.getLogger("app.services.warm_up")
+    steps: Dict[str, dict] = {}
+    _ready = False
+    _started_at: Optional[float] = None
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        return cls._ready
+
+    @classmethod
+    def mark_ready(cls):
+        cls._ready = True
+
+    @classmethod
+    def status(cls) -> dict:
+        return {"ready": cls._ready, "steps": cls.steps}
+
+    @classmethod
+    async def run_step(cls, name: str, step) -> bool:
+        started = time.perf_counter()
+        try:
+            await step()
+            cls.steps[name] = {"status": "done", "seconds": round(time.perf_counter() - started, 3)}
+            return True
+        except Exception as e:
+            cls.logger.exception(f"Exception encounter {e} while warming up {name}.")
+            cls.steps[name] = {"status": "failed", "seconds": round(time.perf_counter() - started, 3),
+                               "error": str(e)}
+            return False
+
+    @classmethod
+    async def open_database_connections(cls):
+        """Checks out the connections all at once so that the pool keeps that many open."""
+        engine = sqldb.get_engine()
+        pool_size = getattr(engine.pool, "size", lambda: WARM_UP_DB_CONNECTIONS)()
+        count = max(1, min(WARM_UP_DB_CONNECTIONS, pool_size))
+        opened = asyncio.Event()
+        open_count = 0
+
+        async def open_connection():
+            nonlocal open_count
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+                open_count += 1
+                if open_count == count:
+                    opened.set()
+                await opened.wait()
+
+        await asyncio.wait_for(asyncio.gather(*[open_connection() for _ in range(count)]), timeout=30)
+
+    @classmethod
+    async def load_snapshots(cls):
+        if RATE_ENGINE_ENABLED:
+            await RateEngine.load()
+        if COVER_RATE_SNAPSHOT_ENABLED:
+            await CoverRates.load()
+
+    @classmethod
+    async def compile_rate_queries(cls):
+        """Runs every shape of the rate queries once, later requests reuse their compiled form."""
+        for vehicle_data in WARM_UP_VEHICLES:
+            for query in (Pricing.od_rate_query(vehicle_data=vehicle_data, tenure=1),
+                          Pricing.tp_rate_query(vehicle_data=vehicle_data, tenure=1),
+                          Pricing.addon_price_query(vehicle_data=vehicle_data),
+                          Pricing.addon_price_query(vehicle_data=vehicle_data, addon_id_list=[1]),
+                          Pricing.addon_bundle_price_query(vehicle_data=vehicle_data)):
+                result = await sqldb.execute(query)
+                result.all()
+
+    @classmethod
+    async def open_dataverse_connections(cls):
+        url = Dataverse.url("/")
+        await asyncio.gather(*[AsyncHttpClient.get(url=url) for _ in range(WARM_UP_HTTP_CONNECTIONS)])
+
+    @classmethod
+    async def load_reference_data(cls):
+        await AddonPremiumCalculator.get_bundle_addon_ids()
+
+    @classmethod
+    async def run(cls):
+        cls._started_at = time.perf_counter()
+        while True:
+            database_ready = await cls.run_step("database_connections", cls.open_database_connections)
+            if database_ready:
+                await cls.run_step("rate_snapshots", cls.load_snapshots)
+                await cls.run_step("rate_queries", cls.compile_rate_queries)
+                await cls.run_step("dataverse_connections", cls.open_dataverse_connections)
+                await cls.run_step("reference_data", cls.load_reference_data)
+                break
+            await asyncio.sleep(WARM_UP_RETRY_SECONDS)
+        cls.mark_ready()
+        cls.logger.info(f"Warm up finished in {time.perf_counter() - cls._started_at:.3f}s {cls.steps}.")
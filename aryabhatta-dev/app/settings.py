@@ -28,6 +28,78 @@ SERVICE_CREDENTIALS = {
     }
 }
 
+# Prepared statements asyncpg keeps per connection, every shape of the pricing queries is prepared once per
+# connection and reused while it stays in the cache
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(environ.get("DB_PREPARED_STATEMENT_CACHE_SIZE", default=500))
+
 CONNECTION_CONFIG = {
     "connection_string": f"postgresql+asyncpg://{POSTGRES_USERNAME}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DATABASE}"
-}
\ No newline at end of file
+                         f"?prepared_statement_cache_size={DB_PREPARED_STATEMENT_CACHE_SIZE}"
+}
+
+# Rate engine serves the rate table lookups from memory, refreshed every RATE_ENGINE_REFRESH_SECONDS
+RATE_ENGINE_ENABLED = environ.get("RATE_ENGINE_ENABLED", default="true").lower() == "true"
+RATE_ENGINE_REFRESH_SECONDS = int(environ.get("RATE_ENGINE_REFRESH_SECONDS", default=300))
+# Rate snapshot file shared by the workers of a node, e.g. /dev/shm/aryabhatta/rates.snapshot, empty keeps one
+# snapshot per worker
+RATE_SNAPSHOT_PATH = environ.get("RATE_SNAPSHOT_PATH", default="")
+
+# Cover rates are served from an in memory snapshot, refreshed every COVER_RATE_REFRESH_SECONDS
+COVER_RATE_SNAPSHOT_ENABLED = environ.get("COVER_RATE_SNAPSHOT_ENABLED", default="true").lower() == "true"
+COVER_RATE_REFRESH_SECONDS = int(environ.get("COVER_RATE_REFRESH_SECONDS", default=300))
+
+# Identical price requests in flight at the same time are priced once and share the response
+PRICING_SINGLE_FLIGHT_ENABLED = environ.get("PRICING_SINGLE_FLIGHT_ENABLED", default="true").lower() == "true"
+
+# Workers warm up their connections, rate snapshots, compiled rate queries and reference data before /ready reports
+# them ready, a warm up which can not reach the database is retried every WARM_UP_RETRY_SECONDS
+WARM_UP_ENABLED = environ.get("WARM_UP_ENABLED", default="true").lower() == "true"
+WARM_UP_DB_CONNECTIONS = int(environ.get("WARM_UP_DB_CONNECTIONS", default=10))
+WARM_UP_HTTP_CONNECTIONS = int(environ.get("WARM_UP_HTTP_CONNECTIONS", default=10))
+WARM_UP_RETRY_SECONDS = int(environ.get("WARM_UP_RETRY_SECONDS", default=5))
+
+# Maximum number of idv, discount and addon set combinations priced by one premium sweep request
+PRICING_SWEEP_MAX_POINTS = int(environ.get("PRICING_SWEEP_MAX_POINTS", default=5000))
+
+# Bulk rate card loads validate and COPY the file RATE_CARD_CHUNK_SIZE rows at a time and stop after
+# RATE_CARD_MAX_ERRORS invalid rows
+RATE_CARD_CHUNK_SIZE = int(environ.get("RATE_CARD_CHUNK_SIZE", default=10000))
+RATE_CARD_MAX_ERRORS = int(environ.get("RATE_CARD_MAX_ERRORS", default=100))
+
+# Renewal pricing job, price requests priced at the same time and rows written between two checkpoints, and
+# rows priced together by the book premium calculator, 0 to price them one by one through compute_premium
+RENEWAL_PRICING_CONCURRENCY = int(environ.get("RENEWAL_PRICING_CONCURRENCY", default=20))
+RENEWAL_PRICING_CHECKPOINT_ROWS = int(environ.get("RENEWAL_PRICING_CHECKPOINT_ROWS", default=1000))
+RENEWAL_PRICING_BOOK_BATCH_SIZE = int(environ.get("RENEWAL_PRICING_BOOK_BATCH_SIZE", default=0))
+
+# Maximum number of insurers priced at the same time by the batch premium endpoint
+BATCH_PRICING_CONCURRENCY = int(environ.get("BATCH_PRICING_CONCURRENCY", default=15))
+
+# Timeout for each dataverse call made while resolving the vehicle details of a price request
+DATAVERSE_CALL_TIMEOUT_SECONDS = float(environ.get("DATAVERSE_CALL_TIMEOUT_SECONDS", default=5))
+
+# Process local cache for dataverse reference data, ttl in seconds per entity
+DATAVERSE_CACHE_ENABLED = environ.get("DATAVERSE_CACHE_ENABLED", default="true").lower() == "true"
+DATAVERSE_CACHE_MAX_SIZE = int(environ.get("DATAVERSE_CACHE_MAX_SIZE", default=2048))
+DATAVERSE_CACHE_TTL_SECONDS = {
+    "variant": 3600,
+    "sub_variant": 3600,
+    "exshowroom_price": 3600,
+    "rto_zone": 6 * 3600,
+    "vehicle_cover": 6 * 3600,
+    "ncb": 6 * 3600,
+    "pa_cover": 6 * 3600,
+    "voluntary_deductible": 6 * 3600,
+    "bundle_addons": 3600,
+}
+DATAVERSE_CACHE_DEFAULT_TTL_SECONDS = int(environ.get("DATAVERSE_CACHE_DEFAULT_TTL_SECONDS", default=600))
+
+# Computed premiums are cached per pricing inputs and pricing data version. PREMIUM_CACHE_SHARED_URL adds a shared
+# tier, redis://host:port/db for a redis compatible server (needs the redis package) or memory:// for local use
+PREMIUM_CACHE_ENABLED = environ.get("PREMIUM_CACHE_ENABLED", default="true").lower() == "true"
+PREMIUM_CACHE_TTL_SECONDS = int(environ.get("PREMIUM_CACHE_TTL_SECONDS", default=900))
+PREMIUM_CACHE_MAX_SIZE = int(environ.get("PREMIUM_CACHE_MAX_SIZE", default=10000))
+PREMIUM_CACHE_SHARED_URL = environ.get("PREMIUM_CACHE_SHARED_URL", default="")
+
+# Adds a Server-Timing header with the pricing stage, dataverse and database timings of the request
+PRICING_TIMING_HEADER_ENABLED = environ.get("PRICING_TIMING_HEADER_ENABLED", default="false").lower() == "true"
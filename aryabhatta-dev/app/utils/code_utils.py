@@ -1,4 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
+
+import numpy as np
+from pytz import timezone
 
 
 def calculate_vehicle_age(invoice_date: str):
@@ -6,3 +9,23 @@ def calculate_vehicle_age(invoice_date: str):
     invoice_date = datetime.strptime(invoice_date, '%d-%m-%Y')
     age_in_years = int((datetime.now() - invoice_date).days / days_in_year)
     return age_in_years
+
+
+def india_date() -> date:
+    """Today in India, the day break-in is checked on whatever the timezone of the server."""
+    return datetime.now(timezone('Asia/Kolkata')).date()
+
+
+def round_array(values, decimals: int = 2):
+    """
+    Rounds an array the way the builtin `round` rounds each of its floats. numpy rounds the scaled value
+    instead, which lands on the other side of some half-way values, those are rounded one by one.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, decimals)
+    scaled = values * 10 ** decimals
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_half.any():
+        rounded = rounded.copy()
+        rounded[near_half] = [round(value, decimals) for value in values[near_half].tolist()]
+    return rounded
@@ -14,3 +14,16 @@ class InsertRecordException(Exception):
     def __init__(self, name: str, message: str):
         self.name = name
         self.message = message
+
+
+class ServiceCallException(Exception):
+    def __init__(self, name: str, message: str):
+        self.name = name
+        self.message = message
+
+
+class RateCardValidationException(Exception):
+    def __init__(self, name: str, message: str, errors: list = None):
+        self.name = name
+        self.message = message
+        self.errors = errors or []
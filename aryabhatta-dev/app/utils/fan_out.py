@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from app.utils.exceptions import ServiceCallException
+
+
+class FanOut:
+    """
+    Runs a set of dependent async calls concurrently. Every call starts as soon as the calls it depends
+    on have finished, so the total latency is that of the longest dependency chain instead of the sum.
+
+    Each call receives the results resolved so far and runs under its own timeout. When an optional call
+    fails its result is `None` and the calls depending on it are skipped, when a required call fails
+    the remaining calls are cancelled and a `ServiceCallException` is raised.
+    """
+
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self.logger = logging.getLogger(f"app.fan_out.{name}")
+        self._calls: Dict[str, dict] = {}
+        self.latencies: Dict[str, float] = {}
+
+    def add(self, name: str, call: Callable[[dict], Awaitable[Any]], depends_on: Iterable[str] = (),
+            required: bool = True, timeout: float = None) -> "FanOut":
+        depends_on = tuple(depends_on)
+        for dependency in depends_on:
+            if dependency not in self._calls:
+                raise ValueError(f"Call {name} depends on {dependency} which is not added before it.")
+        self._calls[name] = {"call": call, "depends_on": depends_on, "required": required,
+                             "timeout": timeout or self.timeout}
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        for name, spec in self._calls.items():
+            tasks[name] = asyncio.ensure_future(self._run_call(name, spec, tasks, results))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except ServiceCallException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        finally:
+            self.logger.info(f"{self.name} call latencies in ms: {self.latencies}")
+        return results
+
+    async def _run_call(self, name: str, spec: dict, tasks: Dict[str, asyncio.Task], results: Dict[str, Any]):
+        for dependency in spec["depends_on"]:
+            await tasks[dependency]
+            if results.get(dependency) is None:
+                results[name] = None
+                error_message = f"Skipping {self.name} call {name} as {dependency} is not available."
+                if spec["required"]:
+                    raise ServiceCallException(self.logger.name, error_message)
+                self.logger.warning(error_message)
+                return
+
+        start = time.perf_counter()
+        try:
+            results[name] = await asyncio.wait_for(spec["call"](results), timeout=spec["timeout"])
+        except Exception as e:
+            results[name] = None
+            error_message = f"Exception encounter {e!r} in {self.name} call {name}."
+            if spec["required"]:
+                self.logger.exception(error_message)
+                raise ServiceCallException(self.logger.name, error_message)
+            self.logger.warning(error_message)
+        finally:
+            self.latencies[name] = round((time.perf_counter() - start) * 1000, 2)
@@ -0,0 +1,23 @@
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def model_fields(value):
+    """orjson default, a response model is written as its field values in field order."""
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    raise TypeError(f"Type {type(value).__name__} is not JSON serializable.")
+
+
+class PricingJSONResponse(ORJSONResponse):
+    """
+    Writes the pricing responses with orjson straight from the response models. An endpoint returning it
+    skips the validation of its `response_model` and the `jsonable_encoder` pass FastAPI runs on a returned
+    model, the `response_model` is left on the route for the schema only. Numpy scalars of the vectorised
+    calculations are written as numbers.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=model_fields,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into a single execution of the loader, callers arriving
+    while it is in flight await its result instead of starting their own. Nothing is kept once the call
+    finishes. The call runs in its own task, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    async def run(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(loader())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> dict:
+        calls = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "coalesced_ratio": round(self.coalesced / calls, 4) if calls else 0,
+        }
+
+    def exposition(self) -> List[str]:
+        return [
+            "# HELP pricing_single_flight_calls_total Calls by whether they executed or joined one in flight.",
+            "# TYPE pricing_single_flight_calls_total counter",
+            f'pricing_single_flight_calls_total{{name="{self.name}",outcome="executed"}} {self.executions}',
+            f'pricing_single_flight_calls_total{{name="{self.name}",outcome="coalesced"}} {self.coalesced}',
+            "# HELP pricing_single_flight_in_flight Calls currently in flight.",
+            "# TYPE pricing_single_flight_in_flight gauge",
+            f'pricing_single_flight_in_flight{{name="{self.name}"}} {len(self._in_flight)}',
+        ]
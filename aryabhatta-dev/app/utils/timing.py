@@ -0,0 +1,131 @@
+import bisect
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Prometheus style histogram kept per process, rendered in the text exposition format."""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def observe(self, seconds: float, *label_values: str):
+        counts = self._counts.get(label_values)
+        if counts is None:
+            counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+        counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self._sums[label_values] += seconds
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, counts in sorted(self._counts.items()):
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, label_values))
+            cumulative = 0
+            for bucket, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                upper_bound = "+Inf" if bucket == float("inf") else repr(bucket)
+                lines.append(f'{self.name}_bucket{{{labels},le="{upper_bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {self._sums[label_values]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Timing:
+    """
+    Timing spans of the pricing pipeline. Every pipeline stage and every external call, dataverse HTTP
+    calls and database queries, is observed into a histogram and appended to the spans of the request
+    being served, which can be returned in a `Server-Timing` header. Histograms are per worker process.
+    """
+    stage_seconds = Histogram("pricing_stage_duration_seconds", "Duration of the pricing pipeline stages.",
+                              ("stage",))
+    external_call_seconds = Histogram("pricing_external_call_duration_seconds",
+                                      "Duration of the calls made by the pricing service.", ("service", "target"))
+    _spans: ContextVar[Optional[list]] = ContextVar("pricing_timing_spans", default=None)
+    _table_pattern = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+
+    @classmethod
+    def start_request(cls) -> list:
+        """Starts collecting the spans of the current request, tasks created by it share the list."""
+        spans = []
+        cls._spans.set(spans)
+        return spans
+
+    @classmethod
+    def record(cls, kind: str, name: str, seconds: float):
+        spans = cls._spans.get()
+        if spans is not None:
+            spans.append((f"{kind}.{name}", seconds))
+
+    @classmethod
+    @contextmanager
+    def stage(cls, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            cls.stage_seconds.observe(seconds, name)
+            cls.record("stage", name, seconds)
+
+    @classmethod
+    @contextmanager
+    def external_call(cls, service: str, target: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            cls.external_call_seconds.observe(seconds, service, target)
+            cls.record(service, target, seconds)
+
+    @classmethod
+    def instrument_engine(cls, engine):
+        """Times every statement sent through engine, labelled by the first table it reads or writes."""
+        sync_engine = getattr(engine, "sync_engine", engine)
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("pricing_query_start", []).append(time.perf_counter())
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            seconds = time.perf_counter() - conn.info["pricing_query_start"].pop()
+            table = cls._table_pattern.search(statement)
+            target = table.group(1) if table else statement.split(None, 1)[0].lower()
+            cls.external_call_seconds.observe(seconds, "db", target)
+            cls.record("db", target, seconds)
+
+        def handle_error(exception_context):
+            query_start = exception_context.connection.info.get("pricing_query_start") \
+                if exception_context.connection is not None else None
+            if query_start:
+                query_start.pop()
+
+        event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(sync_engine, "handle_error", handle_error)
+
+    @classmethod
+    def server_timing(cls, spans: list) -> str:
+        """Renders spans as a `Server-Timing` header value, repeated spans are summed."""
+        durations: Dict[str, List[float]] = defaultdict(list)
+        for name, seconds in spans:
+            durations[name].append(seconds)
+        return ", ".join(f'{name};dur={round(sum(values) * 1000, 2)};desc="{len(values)}x"'
+                         for name, values in durations.items())
+
+    @classmethod
+    def exposition(cls) -> str:
+        return "\n".join(cls.stage_seconds.exposition() + cls.external_call_seconds.exposition()) + "\n"
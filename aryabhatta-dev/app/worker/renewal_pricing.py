@@ -0,0 +1,260 @@
+"""
+Re-quotes expiring policies from a CSV or JSONL export of price requests, one request per row with the
+fields of `PriceRequest` (list fields JSON encoded in CSV cells). Each row is priced by the pricing
+pipeline and written to the output as one JSON line, in input order.
+
+    python -m app.worker.renewal_pricing renewals.jsonl quotes.jsonl
+    python -m app.worker.renewal_pricing renewals.csv quotes.jsonl --concurrency 40 --resume
+
+Progress is checkpointed to <output>.checkpoint, --resume continues a crashed or interrupted run from its
+last checkpoint. With --book-batch-size the rows are priced that many at a time by the vectorized
+`BookPremiumCalculator` instead of one by one, to the same output.
+
+    python -m app.worker.renewal_pricing renewals.jsonl quotes.jsonl --book-batch-size 500
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import logging.config
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from rb_utils.database import initiate_database, sqldb
+
+from app.calculator.motor_adaptor import MotorAdaptor
+from app.schema.pricing import PriceRequest
+from app.services.cover_rates import CoverRates
+from app.services.rate_engine import RateEngine
+from app.settings import CONNECTION_CONFIG, COVER_RATE_SNAPSHOT_ENABLED, LOGGER_CONFIG_PATH, RATE_ENGINE_ENABLED, \
+    RENEWAL_PRICING_BOOK_BATCH_SIZE, RENEWAL_PRICING_CHECKPOINT_ROWS, RENEWAL_PRICING_CONCURRENCY
+
+INPUT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class RenewalPricingJob:
+    """
+    Streams the input through `MotorAdaptor.compute_premium` with at most `concurrency` requests priced at
+    once. Rows are read only while fewer than `window` rows are waiting to be written, so memory stays flat
+    whatever the size of the file, and results are written as soon as every row before them is written.
+    Writing in input order makes a checkpoint the number of rows done and the output size at that point.
+
+    With `book_batch_size` the rows are read in batches of that size instead, each priced at once by
+    `MotorAdaptor.compute_book_premium`, and at most two batches are in flight.
+    """
+    logger = logging.getLogger("app.worker.renewal_pricing")
+
+    def __init__(self, input_path: str, output_path: str, concurrency: int = RENEWAL_PRICING_CONCURRENCY,
+                 checkpoint_rows: int = RENEWAL_PRICING_CHECKPOINT_ROWS,
+                 book_batch_size: int = RENEWAL_PRICING_BOOK_BATCH_SIZE):
+        suffix = os.path.splitext(input_path)[1].lower()
+        if suffix not in INPUT_FORMATS:
+            raise ValueError(f"Renewal input {input_path} is not a {', '.join(INPUT_FORMATS)} file.")
+        self.input_format = INPUT_FORMATS[suffix]
+        self.input_path = os.path.abspath(input_path)
+        self.output_path = output_path
+        self.checkpoint_path = f"{output_path}.checkpoint"
+        self.concurrency = concurrency
+        self.book_batch_size = book_batch_size
+        # in flight rows, or batches of rows for the book premium calculator
+        self.window = 2 if book_batch_size else concurrency * 4
+        self.checkpoint_rows = checkpoint_rows
+        self.limit = asyncio.Semaphore(concurrency)
+        self.rows_done = 0
+        self.statuses = {"priced": 0, "not_priced": 0, "invalid": 0, "failed": 0}
+        self.completed = False
+
+    def read_rows(self, skip: int) -> Iterator[Tuple[int, Union[str, dict]]]:
+        """
+        (row number from 1, row) of the input rows after the first `skip`, a row is the line of a JSONL input and
+        the cells of a CSV one, parsed by `parse_row` when it is priced.
+        """
+        with open(self.input_path, newline="", encoding="utf-8-sig") as input_file:
+            if self.input_format == "csv":
+                rows = csv.DictReader(input_file)
+            else:
+                rows = (line for line in input_file if line.strip())
+            for number, row in enumerate(rows, start=1):
+                if number > skip:
+                    yield number, row
+
+    def parse_row(self, row: Union[str, dict]) -> dict:
+        """The fields of a row, raises ValueError when the line or a list cell is not JSON."""
+        if self.input_format == "csv":
+            return {name: json.loads(value) if value[:1] in "[{" else value
+                    for name, value in row.items() if value not in ("", None)}
+        return json.loads(row)
+
+    @staticmethod
+    def new_result(number: int, row: dict) -> dict:
+        ids = row if isinstance(row, dict) else {}
+        return {"row": number, "quote_request_id": ids.get("quote_request_id"), "quote_id": ids.get("quote_id"),
+                "insurer_code": ids.get("insurer_code"), "status": "priced", "premium": None, "error": None}
+
+    @staticmethod
+    def set_premium(result: dict, premium):
+        if isinstance(premium, Exception):
+            result.update(status="failed", error=str(premium))
+        elif premium is None:
+            result["status"] = "not_priced"
+        else:
+            result["premium"] = premium.dict()
+
+    def price_request(self, number: int, row: Union[str, dict]) -> Tuple[dict, Optional[dict]]:
+        """The result of a row and its price request, no price request when the row is invalid."""
+        try:
+            row = self.parse_row(row)
+        except ValueError as e:
+            result = self.new_result(number, {})
+            result.update(status="invalid", error=f"Row {number} is not valid JSON, {e}")
+            return result, None
+        result = self.new_result(number, row)
+        try:
+            return result, PriceRequest(**row).dict()
+        except (TypeError, ValidationError) as e:
+            result.update(status="invalid", error=str(e))
+            return result, None
+
+    async def price(self, number: int, row: Union[str, dict]) -> dict:
+        result, price_request = self.price_request(number, row)
+        if price_request is None:
+            return result
+        async with self.limit:
+            try:
+                premium = await MotorAdaptor.compute_premium(vehicle_data=price_request)
+            except Exception as e:
+                self.logger.exception(f"Exception encounter {e} while pricing renewal row {number}.")
+                premium = e
+        self.set_premium(result, premium)
+        return result
+
+    async def price_book(self, rows: List[Tuple[int, Union[str, dict]]]) -> List[dict]:
+        results, price_requests = [], []
+        for number, row in rows:
+            result, price_request = self.price_request(number, row)
+            if price_request is not None:
+                price_requests.append((result, price_request))
+            results.append(result)
+        if price_requests:
+            try:
+                premiums = await MotorAdaptor.compute_book_premium([request for _, request in price_requests])
+            except Exception as e:
+                self.logger.exception(f"Exception encounter {e} while pricing renewal rows {rows[0][0]} to "
+                                      f"{rows[-1][0]}.")
+                premiums = [e] * len(price_requests)
+            for (result, _), premium in zip(price_requests, premiums):
+                self.set_premium(result, premium)
+        return results
+
+    async def price_rows(self, rows: List[Tuple[int, Union[str, dict]]]) -> List[dict]:
+        if self.book_batch_size:
+            return await self.price_book(rows)
+        return [await self.price(*rows[0])]
+
+    def restore(self, resume: bool) -> Tuple[int, int]:
+        """Rows already done and the output size they were written at, (0, 0) for a fresh run."""
+        if not (resume and os.path.exists(self.checkpoint_path)):
+            return 0, 0
+        with open(self.checkpoint_path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint["input_path"] != self.input_path:
+            raise ValueError(f"Checkpoint {self.checkpoint_path} is of input {checkpoint['input_path']}.")
+        self.rows_done, self.statuses, self.completed = \
+            checkpoint["rows_done"], checkpoint["statuses"], checkpoint["completed"]
+        return checkpoint["rows_done"], checkpoint["output_bytes"]
+
+    def checkpoint(self, output):
+        output.flush()
+        os.fsync(output.fileno())
+        checkpoint = {"input_path": self.input_path, "rows_done": self.rows_done, "output_bytes": output.tell(),
+                      "statuses": self.statuses, "completed": self.completed,
+                      "updated_at": datetime.now().isoformat()}
+        with open(f"{self.checkpoint_path}.tmp", "w") as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(f"{self.checkpoint_path}.tmp", self.checkpoint_path)
+
+    def write(self, output, result: dict, started: float, resumed_rows: int):
+        output.write((json.dumps(result, default=str) + "\n").encode())
+        self.rows_done += 1
+        self.statuses[result["status"]] += 1
+        if self.rows_done % self.checkpoint_rows == 0:
+            self.checkpoint(output)
+            elapsed = time.perf_counter() - started
+            self.logger.info(f"{self.rows_done} rows done, {(self.rows_done - resumed_rows) / elapsed:.1f} "
+                             f"rows/sec, {self.statuses}")
+
+    async def run(self, resume: bool = False) -> dict:
+        resumed_rows, output_bytes = self.restore(resume)
+        started = time.perf_counter()
+        if not self.completed:
+            with open(self.output_path, "r+b" if output_bytes else "wb") as output:
+                output.truncate(output_bytes)
+                output.seek(output_bytes)
+                pending = deque()
+                rows = self.read_rows(skip=resumed_rows)
+                try:
+                    for batch in iter(lambda: list(itertools.islice(rows, self.book_batch_size or 1)), []):
+                        pending.append(asyncio.ensure_future(self.price_rows(batch)))
+                        while len(pending) >= self.window or (pending and pending[0].done()):
+                            for result in await pending.popleft():
+                                self.write(output, result, started, resumed_rows)
+                    while pending:
+                        for result in await pending.popleft():
+                            self.write(output, result, started, resumed_rows)
+                    self.completed = True
+                finally:
+                    for task in pending:
+                        task.cancel()
+                    self.checkpoint(output)
+
+        elapsed = time.perf_counter() - started
+        return {
+            "input_path": self.input_path,
+            "output_path": self.output_path,
+            "rows_done": self.rows_done,
+            "resumed_from_row": resumed_rows,
+            "statuses": self.statuses,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round((self.rows_done - resumed_rows) / elapsed, 1) if elapsed else 0,
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-quote expiring policies from a CSV or JSONL export.")
+    parser.add_argument("input_path", help="price requests, .csv or .jsonl")
+    parser.add_argument("output_path", help="JSONL file the premiums are written to")
+    parser.add_argument("--concurrency", type=int, default=RENEWAL_PRICING_CONCURRENCY,
+                        help="price requests priced at the same time")
+    parser.add_argument("--checkpoint-rows", type=int, default=RENEWAL_PRICING_CHECKPOINT_ROWS,
+                        help="rows written between two checkpoints")
+    parser.add_argument("--book-batch-size", type=int, default=RENEWAL_PRICING_BOOK_BATCH_SIZE,
+                        help="rows priced at once by the book premium calculator, 0 to price them one by one")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint of the output")
+    return parser.parse_args()
+
+
+async def main(args) -> int:
+    initiate_database(database_type="sql", connection_config=CONNECTION_CONFIG)
+    try:
+        if RATE_ENGINE_ENABLED:
+            await RateEngine.load()
+        if COVER_RATE_SNAPSHOT_ENABLED:
+            await CoverRates.load()
+        job = RenewalPricingJob(args.input_path, args.output_path, concurrency=args.concurrency,
+                                checkpoint_rows=args.checkpoint_rows, book_batch_size=args.book_batch_size)
+        print(json.dumps(await job.run(resume=args.resume), indent=2))
+    finally:
+        await sqldb.get_engine().dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.config.fileConfig(LOGGER_CONFIG_PATH, disable_existing_loggers=False)
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,248 @@
+import asyncio
+import itertools
+import random
+from collections import Counter, defaultdict
+
+from fastapi import FastAPI, Request
+from rb_utils.database import sqldb
+from rb_utils.database.sql.sql_base import Base
+from sqlalchemy import event, insert
+
+from app.models.pricing import AddOnBundlePrice, AddOnPrice, CoverRate, Depreciation, Discount, ODRate, PARate, \
+    TPRate, VoluntaryDeductible
+
+INSURERS = ["ICICI", "HDFC", "BAJAJ", "TATA", "RELIANCE", "SBI", "IFFCO", "KOTAK", "DIGIT", "ACKO", "LIBERTY",
+            "CHOLA", "ROYAL", "FUTURE", "MAGMA"]
+VARIANTS = range(1, 201)
+ADDONS = range(1, 13)
+BUNDLES = {1: [1, 2, 3], 2: [1, 2, 3, 4, 5], 3: [2, 6, 7], 4: [1, 8, 9, 10], 5: [11, 12], 6: [3, 4, 11],
+           7: [5, 6, 7, 8], 8: [9, 10, 12]}
+RTO_ZONES = [1, 2]
+VEHICLE_TYPES = [1, 2]
+FUEL_TYPES = {1: "petrol", 2: "diesel", 3: "cng"}
+# every tenth variant is an EV, rated on kW bands instead of cc bands, with a fractional kW that truncated to
+# an int falls in another band or none
+ELECTRIC_FUEL_TYPE = (4, "electric")
+KW_BANDS = [(0, 30), (30, 60), (60, 9999)]
+ELECTRIC_KILOWATTS = [30.5, 45.2, 60.4, 22.8]
+AGE_BANDS = [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 7), (7, 10), (10, 100)]
+CC_BANDS = [(0, 1000), (1000, 1500), (1500, 9999)]
+COVER_RATES = [("electrical_accessories", 4, 0), ("external_bi_fuel_od", 4, 0), ("od_geo_extension", 0, 400),
+               ("internal_bi_fuel_od", 5, 0), ("anti_theft", 2.5, 500), ("aai_membership", 5, 200),
+               ("handicapped", 50, 0), ("bi_fuel_tp", 0, 60), ("tp_geo_extension", 0, 100),
+               ("ll_paid_driver", 0, 50), ("ll_employees", 0, 50)]
+
+
+def rate_rows(seed: int = 7) -> list:
+    """Rate cards shaped like production ones, one addon price card per insurer and variant, as (model, values)."""
+    rnd = random.Random(seed)
+    rows = []
+    for term, zone, vehicle_type, (min_age, max_age), (min_cc, max_cc) in itertools.product(
+            [1, 3, 5], RTO_ZONES, VEHICLE_TYPES, AGE_BANDS, CC_BANDS):
+        rows.append((ODRate, dict(od_term=term, rto_zone=zone, vehicle_type=vehicle_type, min_vehicle_age=min_age,
+                                  max_vehicle_age=max_age, min_cc=min_cc, max_cc=max_cc, min_kw=None, max_kw=None,
+                                  rate_percent=round(rnd.uniform(1.5, 3.5), 3))))
+    for term, zone, vehicle_type, (min_age, max_age), (min_kw, max_kw) in itertools.product(
+            [1, 3, 5], RTO_ZONES, VEHICLE_TYPES, AGE_BANDS, KW_BANDS):
+        rows.append((ODRate, dict(od_term=term, rto_zone=zone, vehicle_type=vehicle_type, min_vehicle_age=min_age,
+                                  max_vehicle_age=max_age, min_cc=None, max_cc=None, min_kw=min_kw, max_kw=max_kw,
+                                  rate_percent=round(rnd.uniform(1.5, 3.5), 3))))
+    for term, fuel_type, vehicle_type, (min_cc, max_cc) in itertools.product(
+            [1, 3, 5], FUEL_TYPES, VEHICLE_TYPES, CC_BANDS):
+        rows.append((TPRate, dict(tp_term=term, fuel_type=fuel_type, vehicle_type=vehicle_type, min_cc=min_cc,
+                                  max_cc=max_cc, min_kw=None, max_kw=None, rate=rnd.choice([2094, 3416, 7897]) * term)))
+    for term, vehicle_type, (min_kw, max_kw) in itertools.product([1, 3, 5], VEHICLE_TYPES, KW_BANDS):
+        rows.append((TPRate, dict(tp_term=term, fuel_type=ELECTRIC_FUEL_TYPE[0], vehicle_type=vehicle_type,
+                                  min_cc=None, max_cc=None, min_kw=min_kw, max_kw=max_kw,
+                                  rate=rnd.choice([1780, 2904, 6712]) * term)))
+    for min_age, max_age in AGE_BANDS:
+        rows.append((Depreciation, dict(min_vehicle_age=min_age, max_vehicle_age=max_age,
+                                        depreciation_rate=min(5 + 10 * min_age, 50))))
+    for vehicle_type, cover_code, tenure, insurer_code in itertools.product(
+            VEHICLE_TYPES, ["paid_driver", "unnamed_passenger", "cpa_cover"], [1, 3, 5], INSURERS):
+        rows.append((PARate, dict(vehicle_type=vehicle_type, cover_code=cover_code, tp_tenure=tenure,
+                                  insurer_code=insurer_code, per_10k_rate=rnd.choice([0.5, 0.7, 1.0]))))
+    for insurer_code in INSURERS:
+        rows.append((Discount, dict(insurer_code=insurer_code, discount_precent=rnd.choice([50.0, 60.0, 70.0]))))
+    for vehicle_type, (deductible, percent, max_discount) in itertools.product(
+            VEHICLE_TYPES, [(2500, 20, 750), (5000, 25, 1500), (7500, 30, 2000)]):
+        rows.append((VoluntaryDeductible, dict(vehicle_type=vehicle_type, deductible=deductible,
+                                               discount_percent=percent, max_discount=max_discount)))
+    for code, cover_percent, max_amount in COVER_RATES:
+        rows.append((CoverRate, dict(name=code, code=code, cover_type="od", cover_percent=cover_percent,
+                                     max_amount=max_amount)))
+    for insurer_code, variant_id in itertools.product(INSURERS, VARIANTS):
+        card = dict(insurer_code=insurer_code, variant_id=variant_id, vehicle_type_id=VEHICLE_TYPES[variant_id % 2],
+                    vehicle_min_age=0, vehicle_max_age=100, min_cc=0, max_cc=9999)
+        for addon_id in ADDONS:
+            rows.append((AddOnPrice, dict(card, addon_id=addon_id, addon_percent=round(rnd.uniform(0.05, 0.4), 3))))
+        for bundle_id in BUNDLES:
+            bundle_premium = None if bundle_id % 2 else rnd.randint(500, 3000)
+            rows.append((AddOnBundlePrice, dict(card, addon_bundle_id=bundle_id, bundle_premium=bundle_premium)))
+    return rows
+
+
+async def create_pricing_tables():
+    engine = sqldb.get_engine()
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+        rows = defaultdict(list)
+        for model, values in rate_rows():
+            rows[model].append(values)
+        for model, values in rows.items():
+            await connection.execute(insert(model.__table__), values)
+
+
+class CallCounter:
+    """Counts the SQL statements sent to the database engine and the HTTP calls served by the stub dataverse."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.http_calls = Counter()
+
+    def install(self):
+        engine = sqldb.get_engine()
+        event.listen(getattr(engine, "sync_engine", engine), "before_cursor_execute", self.count_query)
+
+    def count_query(self, *args, **kwargs):
+        self.db_queries += 1
+
+    def reset(self):
+        self.db_queries = 0
+        self.http_calls.clear()
+
+
+def variant_details(variant_id: int) -> dict:
+    fuel_type_id = variant_id % len(FUEL_TYPES) + 1
+    details = {
+        "id": variant_id,
+        "model_id": variant_id // 10,
+        "vehicle_class_id": 1,
+        "vehicle_type_id": VEHICLE_TYPES[variant_id % 2],
+        "cubic_capacity": [998, 1197, 1498, 1995][variant_id % 4],
+        "seating_capacity": 5,
+        "kilowatt_range": 0,
+        "fuel_type_id": fuel_type_id,
+        "fuel_type_code": FUEL_TYPES[fuel_type_id],
+    }
+    if variant_id % 10 == 0:
+        details.update(cubic_capacity=0, kilowatt_range=ELECTRIC_KILOWATTS[variant_id // 10 % len(ELECTRIC_KILOWATTS)],
+                       fuel_type_id=ELECTRIC_FUEL_TYPE[0], fuel_type_code=ELECTRIC_FUEL_TYPE[1])
+    return details
+
+
+def dataverse_stub(counter: CallCounter, latency_ms: float = 0) -> FastAPI:
+    """In process stand-in for the dataverse endpoints the pricing pipeline calls."""
+    stub = FastAPI()
+
+    @stub.middleware("http")
+    async def count_calls(request: Request, call_next):
+        counter.http_calls[request.url.path.split("/")[3]] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return await call_next(request)
+
+    @stub.get("/api/v1/vehicle_cover_by_id/")
+    async def vehicle_cover_by_id(vehicle_cover_id: int):
+        return {"id": vehicle_cover_id, "od_tenure": 1 if vehicle_cover_id != 3 else 0,
+                "tp_tenure": {1: 1, 2: 3, 3: 1}.get(vehicle_cover_id, 1)}
+
+    @stub.get("/api/v1/get_variant_by_id/{variant_id}")
+    async def get_variant_by_id(variant_id: int):
+        return variant_details(variant_id)
+
+    @stub.get("/api/v1/sub_variant/")
+    async def sub_variant(variant_id: int):
+        return [{"id": variant_id * 10, "variant_id": variant_id}]
+
+    @stub.get("/api/v1/exshowroom_price/")
+    async def exshowroom_price(subvariant_id: int):
+        return [{"id": subvariant_id, "exShowRoomPrice": 500000 + subvariant_id * 1000}]
+
+    @stub.get("/api/v1/policy_summary/")
+    async def policy_summary(request: Request):
+        params = request.query_params
+        response = {}
+        if "rto_location_id" in params:
+            response["rto_location"] = {"id": int(params["rto_location_id"]),
+                                        "rto_zone_id": RTO_ZONES[int(params["rto_location_id"]) % 2]}
+        if "last_year_ncb_id" in params:
+            response["last_year_ncb"] = {"value": "20%", "new_slab_value": 25}
+        if "ncb_carry_forward_id" in params:
+            response["ncb_carry_forward"] = {"value": 20}
+        if "vehicle_cover_id" in params:
+            response["vehicle_cover"] = await vehicle_cover_by_id(int(params["vehicle_cover_id"]))
+        return response
+
+    @stub.get("/api/v1/pa_cover/")
+    async def pa_cover(id: int):
+        return [{"id": id, "value": 100000 * id}]
+
+    @stub.get("/api/v1/voluntary_deductible/")
+    async def voluntary_deductible(id: int):
+        return [{"id": id, "value": [2500, 5000, 7500][id % 3]}]
+
+    @stub.get("/api/v1/bundle_addons/")
+    async def bundle_addons(addon_bundle_id: int = None):
+        bundles = {bundle_id: addons for bundle_id, addons in BUNDLES.items()
+                   if addon_bundle_id is None or bundle_id == addon_bundle_id}
+        return {"bundle_list": [{"id": bundle_id, "addons_list": [{"id": addon_id} for addon_id in addons]}
+                                for bundle_id, addons in bundles.items()]}
+
+    return stub
+
+
+def price_request(seed: int, insurer_code: str = None) -> dict:
+    """A `PriceRequest` payload, varied by seed so caches only help where production traffic would repeat."""
+    rnd = random.Random(seed)
+    return {
+        "bi_fuel_kit_idv": rnd.choice([None, None, 20000]),
+        "cpa_tenure_id": 1,
+        "cpa_waiver_reason_id": None,
+        "dealer_code": "D001",
+        "discount_percent": None,
+        "electrical_accessories_idv": rnd.choice([None, 10000]),
+        "fuel_type_id": 1,
+        "geo_extension_ids": rnd.choice([None, [1]]),
+        "is_cpa": rnd.random() < 0.5,
+        "idv": rnd.randint(300000, 1500000),
+        "insurer_code": insurer_code or rnd.choice(INSURERS),
+        "insurer_logo": None,
+        "is_aai_member": rnd.random() < 0.2,
+        "is_antitheft": rnd.random() < 0.3,
+        "is_handicapped": False,
+        "is_endorsement": False,
+        "legal_liability_paid_driver": rnd.random() < 0.3,
+        "legal_liability_employees_id": None,
+        "ncb_carry_forward_id": rnd.choice([None, 2]),
+        "non_electrical_accessories_idv": rnd.choice([None, 5000]),
+        "pa_paid_driver_id": rnd.choice([None, 1]),
+        "pa_unnamed_passenger_id": rnd.choice([None, 1]),
+        "policy_end_date": "31-12-2026",
+        "policy_start_date": "01-01-2026",
+        "quote_id": f"quote-{seed}",
+        "registration_date": "01-01-2022",
+        "rto_id": rnd.randint(1, 1000),
+        "last_year_ncb_id": None,
+        "selected_addon_bundles": None,
+        "selected_addons": None,
+        "total_idv": 0,
+        "quote_request_id": f"request-{seed}",
+        "variant_id": rnd.choice(VARIANTS),
+        "vehicle_age": rnd.randint(0, 12),
+        "vehicle_cover_id": rnd.choice([1, 1, 2, 3]),
+        "vin_number": None,
+        "voluntary_deductible_id": rnd.choice([None, None, 1]),
+        "prev_policy_type": 1,
+        "prev_policy_number": None,
+        "prev_vehicle_cover_id": None,
+        "prev_insurance_company": None,
+        "prev_od_policy_exp_date": "01-01-2026",
+        "prev_tp_policy_exp_date": "01-01-2026",
+        "is_transfer_case": False,
+        "is_claim_case": False,
+        "ncb_type": None,
+        "addons_prev_policy_id": None,
+        "policy_type_id": 1,
+    }
@@ -0,0 +1,143 @@
+"""
+Benchmarks building and serializing a price comparison, the `PriceResponse` of every insurer of a batch
+price request, on the validated path FastAPI takes for a returned model (models built with validation,
+the response model validated again, `jsonable_encoder` and `json.dumps`) against `from_computed` and
+`PricingJSONResponse`. Both paths must write the same bytes, the benchmark exits with status 1 otherwise.
+
+    python -m benchmarks.serialization_benchmark
+    python -m benchmarks.serialization_benchmark --insurers 15 --addons 12 --bundles 8 --repeat 2000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.schema.pricing import AddonBundleResponse, AddonResponse, ODPremium, PriceResponse, TPPremium
+from app.utils.responses import PricingJSONResponse
+from benchmarks.fixtures import INSURERS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the serialization of a price comparison.")
+    parser.add_argument("--insurers", type=int, default=15, help="priced insurers in the comparison")
+    parser.add_argument("--addons", type=int, default=12, help="addons priced per insurer")
+    parser.add_argument("--bundles", type=int, default=8, help="addon bundles priced per insurer")
+    parser.add_argument("--repeat", type=int, default=1000, help="comparisons built and serialized per path")
+    return parser.parse_args()
+
+
+def computed_values(model, rnd: random.Random) -> dict:
+    """Values of a premium breakup as the calculators compute them, floats left as ints where they are."""
+    values = {}
+    for name, field in model.__fields__.items():
+        if field.type_ is float:
+            values[name] = rnd.choice([0, rnd.randint(100, 50000), round(rnd.uniform(100, 50000), 2)])
+        elif field.type_ is int:
+            values[name] = rnd.randint(0, 5)
+        elif field.type_ is bool:
+            values[name] = rnd.random() < 0.5
+        else:
+            values[name] = "2023-01-01"
+    return values
+
+
+def comparison_values(args, seed: int = 7) -> List[dict]:
+    """Keyword arguments of `PriceResponse` for every insurer of a comparison, nested breakups as dicts."""
+    rnd = random.Random(seed)
+    comparison = []
+    for index in range(args.insurers):
+        net_premium = round(rnd.uniform(5000, 40000), 2)
+        comparison.append({
+            "quote_request_id": "request-1",
+            "quote_id": "quote-1",
+            "insurer_code": INSURERS[index % len(INSURERS)],
+            "insurer_logo": None,
+            "total_premium": round(net_premium * 1.18, 2),
+            "net_premium": net_premium,
+            "od_premium": computed_values(ODPremium, rnd),
+            "tp_premium": computed_values(TPPremium, rnd),
+            "total_tax": net_premium * 0.18,
+            "idv": rnd.randint(300000, 900000),
+            "total_idv": rnd.randint(300000, 900000),
+            "is_breakin": False,
+            "left_days": 0,
+            "addons": [{"id": addon_id, "premium": round(rnd.uniform(100, 3000), 2)}
+                       for addon_id in range(1, args.addons + 1)],
+            "addon_bundles": [{"id": bundle_id, "premium": rnd.choice([0, round(rnd.uniform(500, 6000), 2)])}
+                              for bundle_id in range(1, args.bundles + 1)],
+        })
+    return comparison
+
+
+def validated_comparison(comparison: List[dict]) -> List[PriceResponse]:
+    return [PriceResponse(**dict(
+        values,
+        od_premium=ODPremium(**values["od_premium"]),
+        tp_premium=TPPremium(**values["tp_premium"]),
+        addons=[AddonResponse(**addon) for addon in values["addons"]],
+        addon_bundles=[AddonBundleResponse(**bundle) for bundle in values["addon_bundles"]]))
+        for values in comparison]
+
+
+def computed_comparison(comparison: List[dict]) -> List[PriceResponse]:
+    return [PriceResponse.from_computed(**dict(
+        values,
+        od_premium=ODPremium.from_computed(**values["od_premium"]),
+        tp_premium=TPPremium.from_computed(**values["tp_premium"]),
+        addons=[AddonResponse.from_computed(**addon) for addon in values["addons"]],
+        addon_bundles=[AddonBundleResponse.from_computed(**bundle) for bundle in values["addon_bundles"]]))
+        for values in comparison]
+
+
+async def validated_body(response_field, responses: List[PriceResponse]) -> bytes:
+    content = await serialize_response(field=response_field, response_content=responses)
+    return JSONResponse(content).body
+
+
+async def computed_body(response_field, responses: List[PriceResponse]) -> bytes:
+    return PricingJSONResponse(responses).body
+
+
+async def time_path(build, render, response_field, comparison: List[dict], repeat: int) -> dict:
+    build_times, render_times = [], []
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        responses = build(comparison)
+        built = time.perf_counter()
+        body = await render(response_field, responses)
+        build_times.append(built - started)
+        render_times.append(time.perf_counter() - built)
+    build_us, render_us = statistics.median(build_times) * 1e6, statistics.median(render_times) * 1e6
+    return {"build_us": round(build_us, 1), "render_us": round(render_us, 1),
+            "total_us": round(build_us + render_us, 1), "bytes": len(body), "body": body}
+
+
+async def main(args) -> int:
+    comparison = comparison_values(args)
+    response_field = create_response_field(name="Response_calculate_batch_premium", type_=List[PriceResponse])
+    results = {
+        "validated": await time_path(validated_comparison, validated_body, response_field, comparison, args.repeat),
+        "computed": await time_path(computed_comparison, computed_body, response_field, comparison, args.repeat),
+    }
+    print(f"{args.insurers} insurers, {args.addons} addons, {args.bundles} bundles, median of {args.repeat} runs")
+    columns = ("path", "build_us", "render_us", "total_us", "bytes")
+    print("  ".join(columns))
+    for path, result in results.items():
+        print("  ".join(f"{dict(result, path=path)[column]:>{len(column)}}" for column in columns))
+    print(f"speedup: {results['validated']['total_us'] / results['computed']['total_us']:.1f}x")
+    if results["validated"]["body"] != results["computed"]["body"]:
+        print("the computed path wrote a different response than the validated path")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
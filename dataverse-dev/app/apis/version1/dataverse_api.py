@@ -17,7 +17,7 @@ from app.models.personal_details import Relation, Salutation, Designation
 from app.models.policy_details import PolicyType, PolicyTypeVehicleCoverMapping, ProposerType, TransactionType, \
     AgreementType, VB64Type, VehicleCover
 from app.models.vehicle_details import VehicleType, FuelType, VehicleModel, Variant, ClaimYear, ClaimCount, \
-    PreviousPolicyType, NcbType, VehicleClass
+    PreviousPolicyType, NcbType, VehicleClass, SubVariant
 from app.schemas.addons_details import BundleResponse, AddonUinResponse
 from app.schemas.coverage_details import CPATenureResponse, CPAWavierResponse, GeoExtensionResponse, PaCoverResponse, \
     VoluntaryDeductibleResponse, NoClaimBonusResponse, AAIMembershipResponse, AccountTypeResponse, UserRoleResponse, \
@@ -39,18 +39,21 @@ from app.services.admin_details import AdminRepository
 from app.services.location import LocationRepository
 from app.services.policy_details import PolicyDetailRepository
 from app.services.vehicle import VehicleRepository
+from app.utils.master_data_cache import MasterDataCache
 
 router = APIRouter()
 search_router = APIRouter()
 
 
 @router.get("/policy_type/", response_model=List[PolicyTypeResponse])
+@MasterDataCache.cached("policy_type", PolicyType)
 async def get_policy_type():
     policy_type = await PolicyType.fetch_all(is_active=True)
     return [PolicyTypeResponse(id=policy.id, name=policy.name) for policy in policy_type]
 
 
 @router.get("/proposer_type/", response_model=List[ProposerTypeResponse])
+@MasterDataCache.cached("proposer_type", ProposerType)
 async def get_proposer_type():
     proposer_type = await ProposerType.fetch_all(is_active=True)
     return [ProposerTypeResponse(id=proposer.id, name=proposer.name) for proposer in proposer_type]
@@ -62,6 +65,7 @@ async def get_vehicle_cover(vehicle_cover_request: VehicleCoverRequest = Depends
 
 
 @router.get("/vehicle_type/", response_model=List[VehicleTypeResponse])
+@MasterDataCache.cached("vehicle_type", Oem, VehicleType)
 async def get_vehicle_type(oem_code: str, vehicle_class_id: int):
     oem_obj = await Oem.fetch_by_code(code=oem_code)
     vehicle_type = await sqldb.execute(select(VehicleType).where(VehicleType.oem_id == oem_obj.id,
@@ -77,6 +81,7 @@ async def get_vehicle_cover(vehicle_cover_id: int, insurer_code: str = None):
 
 
 @router.get("/cpa_tenure/", response_model=CPATenureResponse)
+@MasterDataCache.cached("cpa_tenure", PolicyTypeVehicleCoverMapping, VehicleCover)
 async def get_cpa_tenure(vehicle_cover_id: int):
     policy_type_vehicle_cover = await PolicyTypeVehicleCoverMapping.fetch(key=vehicle_cover_id)
     response = await VehicleCover.fetch(key=policy_type_vehicle_cover.vehicle_cover_id)
@@ -85,6 +90,7 @@ async def get_cpa_tenure(vehicle_cover_id: int):
 
 
 @router.get("/{oem_code}/get_models/", response_model=List[VehicleModelResponse])
+@MasterDataCache.cached("oem_models", Oem, VehicleModel)
 async def get_models(oem_code: str, vehicle_type_id: int, vehicle_class_id: int):
     oem_obj = await Oem.fetch_by_code(code=oem_code)
     vehicle_model = await sqldb.execute(select(VehicleModel).where(VehicleModel.oem_id == oem_obj.id,
@@ -95,6 +101,7 @@ async def get_models(oem_code: str, vehicle_type_id: int, vehicle_class_id: int)
 
 
 @router.get("/{oem_code}/{model_id}/get_variants/")
+@MasterDataCache.cached("oem_model_variants", Oem, Variant)
 async def get_vehicle_variant(model_id: int, oem_code: str = None):
     oem_obj = await Oem.fetch_by_code(code=oem_code)
     model_variants = await VehicleRepository.get_vehicle_variant(oem_id=oem_obj.id, model_id=model_id)
@@ -109,12 +116,14 @@ async def get_exshowroom_price(subvariant_id: int):
 
 
 @router.get("/fuel_type/", response_model=List[FuelTypeResponse])
+@MasterDataCache.cached("fuel_type", FuelType)
 async def get_fuel_type():
     fuel_type = await FuelType.fetch_all(is_active=True)
     return [FuelTypeResponse(id=fuel.id, name=fuel.name) for fuel in fuel_type]
 
 
 @router.get("/city/", response_model=List[CityResponse])
+@MasterDataCache.cached("city", City)
 async def get_cities(state_id: int = None):
     city = select(City).where(City.is_active.is_(True))
     if state_id:
@@ -125,6 +134,7 @@ async def get_cities(state_id: int = None):
 
 
 @router.get("/states/")
+@MasterDataCache.cached("states", State)
 async def get_states(state_id: int = None, state_code: str = None) -> Union[List[StateResponse], Dict]:
     if state_id:
         state_obj = await State.fetch(key=state_id)
@@ -137,18 +147,21 @@ async def get_states(state_id: int = None, state_code: str = None) -> Union[List
 
 
 @router.get("/region/", response_model=List[RegionResponse])
+@MasterDataCache.cached("region", Region)
 async def get_region():
     region_list = await Region.fetch_all(is_active=True)
     return [RegionResponse(id=region.id, name=region.name) for region in region_list]
 
 
 @router.get("/get_models/", response_model=List[ModelResponse])
+@MasterDataCache.cached("models", VehicleModel)
 async def get_models():
     model_list = await VehicleModel.fetch_all(is_active=True)
     return [ModelResponse(id=model.id, name=model.name) for model in model_list]
 
 
 @router.get("/get_variants/", response_model=List[VariantResponse])
+@MasterDataCache.cached("variants", Variant)
 async def get_variants(model_id: int = None):
     variant = select(Variant).where(Variant.is_active.is_(True))
     if model_id:
@@ -159,12 +172,14 @@ async def get_variants(model_id: int = None):
 
 
 @router.get("/rto_zone/", response_model=List[RtoZoneResponse])
+@MasterDataCache.cached("rto_zone", RtoZone)
 async def get_rto_zone():
     rto_zone = await RtoZone.fetch_all(is_active=True)
     return [RtoZoneResponse(id=state.id, zone_name=state.zone_name) for state in rto_zone]
 
 
 @router.get("/rto_location/", response_model=List[RtoResponse])
+@MasterDataCache.cached("rto_location", Rto)
 async def get_rto_location(state_id: int = None):
     rto = select(Rto).where(Rto.is_active.is_(True))
     if state_id:
@@ -176,6 +191,7 @@ async def get_rto_location(state_id: int = None):
 
 
 @router.get("/pincode/", response_model=List[PincodeResponse])
+@MasterDataCache.cached("pincode", Pincode)
 async def get_pincode(city_id: int = None):
     pincode = select(Pincode).where(Pincode.is_active.is_(True))
     if city_id:
@@ -207,12 +223,14 @@ async def get_city_data(city_name: str = Query(min_length=3, max_length=10)) ->
 
 
 @router.get("/geographical_extension/", response_model=List[GeoExtensionResponse])
+@MasterDataCache.cached("geographical_extension", GeoExtension)
 async def get_geographical_extension():
     geo_extension = await GeoExtension.fetch_all(is_active=True)
     return [GeoExtensionResponse(id=item.id, name=item.name) for item in geo_extension]
 
 
 @router.get("/voluntary_deductible/", response_model=List[VoluntaryDeductibleResponse])
+@MasterDataCache.cached("voluntary_deductible", VoluntaryDeductible)
 async def get_voluntary_deductible(id: int = None, vehicle_class_id: int = None, vehicle_type_id: int = None):
     if id:
         voluntary_deductible = await VoluntaryDeductible.fetch(key=id)
@@ -230,6 +248,7 @@ async def get_voluntary_deductible(id: int = None, vehicle_class_id: int = None,
 
 
 @router.get("/sub_variant/", response_model=List[SubVariantResponse])
+@MasterDataCache.cached("sub_variant", SubVariant)
 async def get_color_tone(variant_id: int):
     color_and_tone = await VehicleRepository.get_color_tone(variant_id)
     return [SubVariantResponse(id=item.id, tone=item.tone, color=item.color, variant_id=variant_id) for item in
@@ -237,6 +256,7 @@ async def get_color_tone(variant_id: int):
 
 
 @router.get("/no_claim_bonus/", response_model=List[NoClaimBonusResponse])
+@MasterDataCache.cached("no_claim_bonus", ncb)
 async def get_ncb_carry_forward(id: int = None, policy_type_id: int = None, ncb_type_id: int = None):
     """
     The get_ncb_carry_forward function is used to get the NCB carry forward details.
@@ -264,6 +284,7 @@ async def get_ncb_carry_forward(id: int = None, policy_type_id: int = None, ncb_
 
 
 @router.get("/pa_cover/", response_model=List[PaCoverResponse])
+@MasterDataCache.cached("pa_cover", PaCover)
 async def get_pa_cover(id: int = None, vehicle_type_id: int = None, vehicle_class_id: int = None):
     if id:
         pa_cover = await PaCover.fetch(key=id)
@@ -276,24 +297,28 @@ async def get_pa_cover(id: int = None, vehicle_type_id: int = None, vehicle_clas
 
 
 @router.get("/financier/", response_model=List[FinancierResponse])
+@MasterDataCache.cached("financier", Financier)
 async def get_financier():
     financier = await Financier.fetch_all(is_active=True)
     return [FinancierResponse(id=item.id, name=item.name) for item in financier]
 
 
 @router.get("/bank/", response_model=List[BankResponse])
+@MasterDataCache.cached("bank", Bank)
 async def get_bank():
     bank = await Bank.fetch_all(is_active=True)
     return [BankResponse(id=item.id, name=item.name) for item in bank]
 
 
 @router.get("/addons/")
+@MasterDataCache.cached("addons", Addon)
 async def get_addons() -> Dict[Any, Any]:
     addons = await Addon.fetch_all(is_active=True)
     return {item.id: item.name for item in addons}
 
 
 @router.get("/insurer_list/", response_model=List[InsurerResponse])
+@MasterDataCache.cached("insurer_list", Insurer)
 async def get_insurer():
     insurer = await Insurer.fetch_all(is_active=True)
     return [InsurerResponse(id=item.id, name=item.name, code=item.code, insurer_logo=item.insurer_logo,
@@ -303,6 +328,7 @@ async def get_insurer():
 
 
 @router.get("/all_insurer_list/", response_model=List[InsurerResponse])
+@MasterDataCache.cached("all_insurer_list", Insurer)
 async def get_insurer():
     insurer = await Insurer.fetch_all()
     return [InsurerResponse(id=item.id, name=item.name, code=item.code, insurer_logo=item.insurer_logo,
@@ -319,6 +345,7 @@ async def get_insurer_bundles(insurer_id: int):
 
 
 @router.get("/salutation_list/", response_model=List[SalutationResponse])
+@MasterDataCache.cached("salutation_list", Salutation)
 async def get_salutation():
     salutation = await Salutation.fetch_all(is_active=True)
     return [SalutationResponse(id=item.id, name=item.name, salutation_type=item.salutation_type) for item in
@@ -326,12 +353,14 @@ async def get_salutation():
 
 
 @router.get("/cpa_wavier_reason/", response_model=List[CPAWavierResponse])
+@MasterDataCache.cached("cpa_wavier_reason", CPAWavierReason)
 async def get_cpa_wavier_reason():
     cpa_wavier_reason = await CPAWavierReason.fetch_all(is_active=True)
     return [CPAWavierResponse(id=item.id, text=item.name) for item in cpa_wavier_reason]
 
 
 @router.get("/imt_numbers/")
+@MasterDataCache.cached("imt_numbers", IMTMapping)
 async def get_imt_numbers() -> Dict[Any, Any]:
     imt_number = await IMTMapping.fetch_all(is_active=True)
     response = {}
@@ -341,30 +370,35 @@ async def get_imt_numbers() -> Dict[Any, Any]:
 
 
 @router.get("/aai_membership/", response_model=List[AAIMembershipResponse])
+@MasterDataCache.cached("aai_membership", AAIMembership)
 async def get_aai_membership():
     aai_membership = await AAIMembership.fetch_all(is_active=True)
     return [AAIMembershipResponse(id=value.id, name=value.name) for value in aai_membership]
 
 
 @router.get("/account_type/", response_model=List[AccountTypeResponse])
+@MasterDataCache.cached("account_type", AccountType)
 async def get_account_type():
     account_type = await AccountType.fetch_all(is_active=True)
     return [AccountTypeResponse(id=value.id, name=value.name) for value in account_type]
 
 
 @router.get("/user_role/", response_model=List[UserRoleResponse])
+@MasterDataCache.cached("user_role", UserRole)
 async def get_user_role():
     user_role = await UserRole.fetch_all(is_active=True)
     return [UserRoleResponse(id=value.id, name=value.name) for value in user_role]
 
 
 @router.get("/designation/", response_model=List[DesignationResponse])
+@MasterDataCache.cached("designation", Designation)
 async def get_designation():
     designation = await Designation.fetch_all(is_active=True)
     return [DesignationResponse(id=value.id, name=value.name) for value in designation]
 
 
 @router.get("/get_variant_by_id/{variant_id}", response_model=VariantByIdResponse)
+@MasterDataCache.cached("variant_by_id", Variant, FuelType, VehicleModel)
 async def get_variant_by_id(variant_id: int):
     variant_details = await Variant.fetch(key=variant_id)
     fuel_type_code = await FuelType.fetch(key=variant_details.fuel_type_id)
@@ -404,6 +438,7 @@ async def get_sales_manager(request: Request):
 
 
 @router.get("/local_office_code/", response_model=List[ICLocalOfficeResponse])
+@MasterDataCache.cached("local_office_code", InsurerLocalOffice)
 async def local_office_code():
     ic_local_offices = await InsurerLocalOffice.fetch_all(is_active=True)
     return [ICLocalOfficeResponse(**ic_local_office.__dict__)
@@ -411,6 +446,7 @@ async def local_office_code():
 
 
 @router.get("/relation/", response_model=List[RelationResponse])
+@MasterDataCache.cached("relation", Relation)
 async def get_relation():
     relation = await Relation.fetch_all(is_active=True)
     return [RelationResponse(id=item.id, name=item.name) for item in relation]
@@ -440,18 +476,21 @@ async def get_bundles_addons(addon_bundle_id: int = None):
 
 
 @router.get("/previous_policy_type/", response_model=List[PreviousPolicyTypeResponse])
+@MasterDataCache.cached("previous_policy_type", PreviousPolicyType)
 async def get_prev_policy_type():
     prev_policy_type = await PreviousPolicyType.fetch_all(is_active=True)
     return [PreviousPolicyTypeResponse(id=prev_policy.id, name=prev_policy.name) for prev_policy in prev_policy_type]
 
 
 @router.get("/ncb_type/", response_model=List[NcbTypeResponse])
+@MasterDataCache.cached("ncb_type", NcbType)
 async def ncb_type():
     ncb_type_list = await NcbType.fetch_all(is_active=True)
     return [NcbTypeResponse(id=ncb_type_obj.id, name=ncb_type_obj.name) for ncb_type_obj in ncb_type_list]
 
 
 @router.get("/claim_year/", response_model=List[ClaimYearResponse])
+@MasterDataCache.cached("claim_year", PolicyTypeVehicleCoverMapping, VehicleCover, ClaimYear)
 async def claim_year(vehicle_cover_id: int):
     policy_type_vehicle_cover = await PolicyTypeVehicleCoverMapping.fetch(key=vehicle_cover_id)
     vehicle_cover_list = await VehicleCover.fetch(key=policy_type_vehicle_cover.vehicle_cover_id)
@@ -467,6 +506,7 @@ async def claim_year(vehicle_cover_id: int):
 
 
 @router.get("/claim_count/", response_model=List[ClaimCountResponse])
+@MasterDataCache.cached("claim_count", ClaimCount)
 async def claim_count():
     claim_count_objs = await ClaimCount.fetch_all(is_active=True)
     return [ClaimCountResponse(id=claim.id, count=claim.count) for claim in claim_count_objs]
@@ -483,6 +523,7 @@ async def vehicle_cover(previous_vehicle_cover: int, od_expiry_date: str = None,
 
 
 @router.get("/transaction_type/", response_model=List[TransactionTypeResponse])
+@MasterDataCache.cached("transaction_type", TransactionType)
 async def get_transaction_type():
     transaction_type = await TransactionType.fetch_all(is_active=True)
     return [TransactionTypeResponse(
@@ -490,17 +531,37 @@ async def get_transaction_type():
 
 
 @router.get("/agreement_type/", response_model=List[AgreementTypeResponse])
+@MasterDataCache.cached("agreement_type", AgreementType)
 async def get_agreement_type():
     agreement_type = await AgreementType.fetch_all(is_active=True)
     return [AgreementTypeResponse(id=agreement.id, name=agreement.name) for agreement in agreement_type]
 
 
 @router.get("/vb64_type/", response_model=List[VB64TypeResponse])
+@MasterDataCache.cached("vb64_type", VB64Type)
 async def get_vb64_type():
     vb64_types = await VB64Type.fetch_all(is_active=True)
     return [VB64TypeResponse(id=vb64_type.id, name=vb64_type.name) for vb64_type in vb64_types]
 
 
+async def get_policy_summary_location(user_details: str, insurer_code: str) -> dict:
+    user_details = await AddonDetailRepository.get_user_details(user_id=user_details)
+    dealer_query = select(Dealer).where(Dealer.dealer_code == user_details["user_details"]["dealer_code"])
+    dealer_query = await sqldb.execute(dealer_query)
+    dealer_query = dealer_query.scalars().first()
+    dealer_state = await State.fetch(key=dealer_query.state_id)
+    dealer_city = await City.fetch(key=dealer_query.city_id)
+    dealer_query = dealer_query.__dict__
+    dealer_query["dealer_state"] = dealer_state.name
+    dealer_query["dealer_city"] = dealer_city.name
+
+    service_address = await AddonDetailRepository.get_service_address(
+        user_details=user_details,
+        insurer_code=insurer_code
+    )
+    return {"dealer_details": dealer_query, "ic_location_detail": service_address}
+
+
 @router.get("/policy_summary/")
 async def get_policy_summary_detail(policy_summary_request: PolicySummaryRequest = Depends()):
     policy_summary_request = policy_summary_request.dict()
@@ -509,21 +570,9 @@ async def get_policy_summary_detail(policy_summary_request: PolicySummaryRequest
     service_address = {}
     policy_summary_response = {}
     if policy_summary_request.get("insurer_code") and user_details:
-        user_details = await AddonDetailRepository.get_user_details(user_id=user_details)
-        dealer_query = select(Dealer).where(Dealer.dealer_code == user_details["user_details"]["dealer_code"])
-        dealer_query = await sqldb.execute(dealer_query)
-        dealer_query = dealer_query.scalars().first()
-        dealer_state = await State.fetch(key=dealer_query.state_id)
-        dealer_city = await City.fetch(key=dealer_query.city_id)
-        dealer_query = dealer_query.__dict__
-        dealer_query["dealer_state"] = dealer_state.name
-        dealer_query["dealer_city"] = dealer_city.name
-
-        service_address = await AddonDetailRepository.get_service_address(
-            user_details=user_details,
-            insurer_code=policy_summary_request["insurer_code"]
-        )
-        policy_summary_response.update({"dealer_details": dealer_query, "ic_location_detail": service_address})
+        policy_summary_response.update(await get_policy_summary_location(
+            user_details, policy_summary_request["insurer_code"]))
+        service_address = policy_summary_response["ic_location_detail"]
 
     policy_summary_detail = await AddonDetailRepository.get_policy_details(summary_dict, service_address.get(
         "servicing_office_address"), service_address.get("gstin_number"))
@@ -531,7 +580,43 @@ async def get_policy_summary_detail(policy_summary_request: PolicySummaryRequest
     return policy_summary_response
 
 
+@router.post("/policy_summary/batch/")
+async def get_policy_summary_details(policy_summary_requests: List[PolicySummaryRequest]):
+    """
+    The `/policy_summary/` response of every request, in request order, for report builders summarising many
+    records at once. Every table is read with a single query for the whole batch and the dealer and IC location
+    of a user and insurer are looked up once.
+    """
+    policy_summary_requests = [policy_summary_request.dict() for policy_summary_request in policy_summary_requests]
+    users_details = [policy_summary_request.pop("user_details", None)
+                     for policy_summary_request in policy_summary_requests]
+    summary_dicts = await AddonDetailRepository.policy_summaries(policy_summary_requests)
+    # every location is looked up before any response is built, so no lookup runs between building them
+    location_keys = [(user_details, policy_summary_request["insurer_code"])
+                     if policy_summary_request.get("insurer_code") and user_details else None
+                     for policy_summary_request, user_details in zip(policy_summary_requests, users_details)]
+    locations = {}
+    for location_key in location_keys:
+        if location_key is not None and location_key not in locations:
+            locations[location_key] = await get_policy_summary_location(*location_key)
+
+    policy_summary_responses = []
+    for location_key, summary_dict in zip(location_keys, summary_dicts):
+        service_address = {}
+        policy_summary_response = {}
+        if location_key is not None:
+            policy_summary_response.update(locations[location_key])
+            service_address = policy_summary_response["ic_location_detail"]
+
+        policy_summary_detail = await AddonDetailRepository.get_policy_details(summary_dict, service_address.get(
+            "servicing_office_address"), service_address.get("gstin_number"))
+        policy_summary_response.update(policy_summary_detail)
+        policy_summary_responses.append(policy_summary_response)
+    return policy_summary_responses
+
+
 @router.get("/get_vehicle_class/", response_model=List[VehicleClassResponse])
+@MasterDataCache.cached("vehicle_class", Oem, VehicleClass)
 async def get_vehicle_class(oem_code: str, vehicle_class_id: int = None):
     oem_obj = await Oem.fetch_by_code(code=oem_code)
     vehicle_class_obj = select(VehicleClass).where(VehicleClass.oem_id == oem_obj.id,
@@ -545,6 +630,7 @@ async def get_vehicle_class(oem_code: str, vehicle_class_id: int = None):
 
 
 @router.get("/get_addons_uin/", response_model=List[AddonUinResponse])
+@MasterDataCache.cached("addons_uin", Addon)
 async def get_addons_uin(insurer_code: str = None):
     addon_obj = select(Addon).where(Addon.is_active.is_(True))
     if insurer_code:
@@ -556,6 +642,7 @@ async def get_addons_uin(insurer_code: str = None):
 
 
 @router.get("/get_dealer_list/", response_model=List[DealerListResponse])
+@MasterDataCache.cached("dealer_list", Dealer)
 async def get_dealer_list(dealer_code: str = None):
     """
     The get_dealer_list function returns a list of dealers.
@@ -674,6 +761,11 @@ async def get_feed_file_insurers() -> List[str]:
         raise FetchDataException(message=f"Error occurred while fetching record, exception encounter {e}.")
 
 
+@router.get("/master_data_cache/")
+async def get_master_data_cache_stats():
+    return MasterDataCache.stats()
+
+
 @router.get("/get_insurer_local_office/")
 async def get_insurer_local_office(dealer_id: int, insurer_id: int):
     ic_dealer_mapping_id = (await sqldb.execute(
@@ -1,8 +1,9 @@
 import logging
+from collections import defaultdict
 from typing import Dict
 
 import http3
-from fastapi import APIRouter, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException
 from fastapi_pagination import paginate, Page
 from rb_utils.database import sqldb
 from sqlalchemy.future import select
@@ -18,12 +19,15 @@ from app.services.admin_details import AdminRepository
 from app.services.vehicle import VehicleRepository
 from app.settings import USER_PASSWORD, AUTH_REGISTER_URL, USER_DETAILS_URL
 from app.utils.service import call_auth_api
+from app.utils.master_data_cache import MasterDataCache
+from app.utils.pagination import KeysetPage, KeysetParams, keyset_paginate
 
 logger = logging.getLogger('api')
 router = APIRouter()
 
 
 @router.post("/add_city/")
+@MasterDataCache.invalidates(City)
 async def add_city(city_request: AddCityRequest) -> AddResponse:
     logger.info(f"create object request for class: City | arguments: {city_request}")
     new_dict = {
@@ -41,6 +45,7 @@ async def add_city(city_request: AddCityRequest) -> AddResponse:
 
 
 @router.post("/add_state/")
+@MasterDataCache.invalidates(State)
 async def add_state(state_request: AddStateRequest) -> AddResponse:
     logger.info(f"create object request for class: State | arguments: {state_request}")
     country_query = select(Country.id).where(Country.name == "India")
@@ -63,6 +68,7 @@ async def add_state(state_request: AddStateRequest) -> AddResponse:
 
 
 @router.post("/add_pincode/")
+@MasterDataCache.invalidates(Pincode)
 async def add_pincode(pincode_request: AddPincodeRequest) -> AddResponse:
     logger.info(f"create object request for class: Pincode | arguments: {pincode_request}")
     new_dict = {
@@ -81,6 +87,7 @@ async def add_pincode(pincode_request: AddPincodeRequest) -> AddResponse:
 
 
 @router.post("/add_model/")
+@MasterDataCache.invalidates(VehicleModel)
 async def add_model(model_request: AddModelRequest) -> AddResponse:
     logger.info(f"create object request for class: VehicleModel | arguments: {model_request}")
     oem_query = select(Oem.id).where(Oem.code == "RB")
@@ -102,6 +109,7 @@ async def add_model(model_request: AddModelRequest) -> AddResponse:
 
 
 @router.post("/add_variant/")
+@MasterDataCache.invalidates(Variant, SubVariant)
 async def add_variant(variant_request: AddVariantRequest) -> AddResponse:
     logger.info(f"create object request for class: Variant | arguments: {variant_request}")
     request = variant_request.dict()
@@ -132,6 +140,7 @@ async def add_variant(variant_request: AddVariantRequest) -> AddResponse:
 
 
 @router.post("/add_variant_price/")
+@MasterDataCache.invalidates(ExShowRoomPrice)
 async def add_variant_price(variant_price_request: ExShowroomPriceRequest) -> AddResponse:
     logger.info(f"create object request for class: ExShowroomPrice | arguments: {variant_price_request}")
     request = variant_price_request
@@ -152,6 +161,7 @@ async def add_variant_price(variant_price_request: ExShowroomPriceRequest) -> Ad
 
 
 @router.post("/add_rto/")
+@MasterDataCache.invalidates(Rto)
 async def add_rto(rto_request: RtoRequest) -> AddResponse:
     logger.info(f"create object request for class: Rto | arguments: {rto_request}")
     new_dict = {
@@ -170,6 +180,7 @@ async def add_rto(rto_request: RtoRequest) -> AddResponse:
 
 
 @router.post("/add_rto_zone/")
+@MasterDataCache.invalidates(RtoZone)
 async def add_rto_zone(rto_request: RtoZoneRequest) -> AddResponse:
     logger.info(f"create object request for class: Zone | arguments: {rto_request}")
     new_dict = {
@@ -186,6 +197,7 @@ async def add_rto_zone(rto_request: RtoZoneRequest) -> AddResponse:
 
 
 @router.post("/add_region/")
+@MasterDataCache.invalidates(Region)
 async def add_region(region_request: RegionRequest) -> AddResponse:
     logger.info(f"create object request for class: Region | arguments: {region_request}")
     new_dict = {
@@ -203,6 +215,7 @@ async def add_region(region_request: RegionRequest) -> AddResponse:
 
 
 @router.post("/add_city_cluster/")
+@MasterDataCache.invalidates(CityCluster, CityClusterCityMapping)
 async def add_city_cluster(city_cluster_request: CityClusterRequest) -> AddResponse:
     logger.info(f"create object request for class: City Cluster | arguments: {city_cluster_request}")
     request = city_cluster_request.dict()
@@ -230,6 +243,7 @@ async def add_city_cluster(city_cluster_request: CityClusterRequest) -> AddRespo
 
 
 @router.post("/add_rto_cluster/")
+@MasterDataCache.invalidates(RtoCluster, RtoClusterRtoMapping)
 async def add_rto_cluster(rto_cluster_request: RtoClusterRequest) -> AddResponse:
     logger.info(f"create object request for class: Rto Cluster | arguments: {rto_cluster_request}")
     request = rto_cluster_request.dict()
@@ -256,6 +270,7 @@ async def add_rto_cluster(rto_cluster_request: RtoClusterRequest) -> AddResponse
 
 
 @router.post("/add_bank/")
+@MasterDataCache.invalidates(Bank)
 async def add_bank(bank_request: BankRequest) -> AddResponse:
     logger.info(f"create object request for class: Bank | arguments: {bank_request}")
     new_dict = {
@@ -272,6 +287,7 @@ async def add_bank(bank_request: BankRequest) -> AddResponse:
 
 
 @router.post("/add_financier/")
+@MasterDataCache.invalidates(Financier)
 async def add_financier(financier_request: FinancierRequest) -> AddResponse:
     logger.info(f"create object request for class: Financier | arguments: {financier_request}")
     new_dict = {
@@ -288,6 +304,7 @@ async def add_financier(financier_request: FinancierRequest) -> AddResponse:
 
 
 @router.post("/add_insurer/")
+@MasterDataCache.invalidates(Insurer)
 async def add_insurer(ic_request: IcUserInfoRequest) -> Dict[str, str]:
     logger.info(f"create object request for class: Insurer | arguments: {ic_request}")
     insurer_request = ic_request.ic_request.dict()
@@ -315,6 +332,7 @@ async def add_insurer(ic_request: IcUserInfoRequest) -> Dict[str, str]:
 
 
 @router.post("/add_insurer_local_office/")
+@MasterDataCache.invalidates(InsurerLocalOffice)
 async def add_insurer_local_office(ic_local_office_request: InsurerLocalOfficeRequest) -> AddResponse:
     logger.info(f"create object request for class: Insurer Local Office | arguments: {ic_local_office_request}")
     request = ic_local_office_request.dict()
@@ -329,6 +347,7 @@ async def add_insurer_local_office(ic_local_office_request: InsurerLocalOfficeRe
 
 
 @router.post("/add_ic_dealer_mapping/")
+@MasterDataCache.invalidates(ICDealerMapping)
 async def add_ic_dealer_mapping(ic_dealer_mapping_request: ICDealerMappingRequest) -> AddResponse:
     logger.info(f"create object request for class: insurer dealer mapping | arguments: {ic_dealer_mapping_request}")
     request = ic_dealer_mapping_request.dict()
@@ -345,276 +364,284 @@ async def add_ic_dealer_mapping(ic_dealer_mapping_request: ICDealerMappingReques
         raise HTTPException(status_code=400, detail="Not able to create records")
 
 
-@router.get("/ic_dealer_mapping_table/", response_model=Page[ICDealerMappingResponse])
-async def ic_dealer_mapping_show_table():
+@router.get("/ic_dealer_mapping_table/", response_model=KeysetPage[ICDealerMappingResponse])
+async def ic_dealer_mapping_show_table(insurer_id: int = None, params: KeysetParams = Depends()):
     logger.info(f"get all request for class: InsurerDealerMapping")
-    query = await ICDealerMapping.fetch_all()
-    response = []
-    try:
-        for data in query:
-            if data.insurer_id:
-                insurer_obj = await Insurer.fetch(key=data.insurer_id)
-                data.__dict__["insurer_name"] = insurer_obj.name
-            if data.local_office_code:
-                ic_local_office_obj = await InsurerLocalOffice.fetch(key=data.local_office_code)
-                data.__dict__["local_office_code_name"] = ic_local_office_obj.local_office_code
-            response.append(ICDealerMappingResponse(**data.__dict__))
-        return paginate(response)
+    # the dealer and local office details of a mapping are on the dealer and local office it maps
+    query = select(ICDealerMapping, Insurer.name, Dealer, InsurerLocalOffice).join(
+        Insurer, Insurer.id == ICDealerMapping.insurer_id).join(Dealer, Dealer.id == ICDealerMapping.dealer_id).join(
+        InsurerLocalOffice, InsurerLocalOffice.id == ICDealerMapping.local_office_id)
+    if insurer_id:
+        query = query.where(ICDealerMapping.insurer_id == insurer_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=ICDealerMapping.id,
+        sortable={"dealer_name": Dealer.dealer_name, "insurer_name": Insurer.name}, search=Dealer.dealer_name,
+        active=ICDealerMapping.is_active)
+    try:
+        response = [ICDealerMappingResponse(**data.__dict__, insurer_name=insurer_name, dealer_name=dealer.dealer_name,
+                                            dealer_code=dealer.dealer_code, dealer_state=dealer.state_id,
+                                            dealer_city=dealer.city_id, local_office_state=local_office.state_id,
+                                            local_office_code=local_office.id,
+                                            local_office_code_name=local_office.local_office_code)
+                    for data, insurer_name, dealer, local_office in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: InsurerDealerMapping | exception encounter {e}.")
         raise HTTPException(status_code=400, detail="Error while fetching all records")
 
 
-@router.get("/state_table/", response_model=Page[StateTableResponse])
-async def state_show_table():
+@router.get("/state_table/", response_model=KeysetPage[StateTableResponse])
+async def state_show_table(region_id: int = None, params: KeysetParams = Depends()):
     logger.info(f"get all request for class: state")
-    query = await State.fetch_all()
-    response = []
+    query = select(State, Region.name).outerjoin(Region, Region.id == State.region)
+    if region_id:
+        query = query.where(State.region == region_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=State.id, sortable={"name": State.name, "code": State.code}, search=State.name,
+        active=State.is_active)
     try:
-        for data in query:
-            if data.region:
-                region_obj = await Region.fetch(key=data.region)
-                data.__dict__["region_name"] = region_obj.name
-            response.append(StateTableResponse(**data.__dict__))
-        return paginate(response)
+        response = [StateTableResponse(**data.__dict__, region_name=region_name) for data, region_name in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: State | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/city_table/", response_model=Page[CityTableResponse])
-async def city_show_table():
+@router.get("/city_table/", response_model=KeysetPage[CityTableResponse])
+async def city_show_table(state_id: int = None, params: KeysetParams = Depends()):
     logger.info(f"get all request for class: city")
-    query = await City.fetch_all()
-    response = []
+    query = select(City, State.name).outerjoin(State, State.id == City.state_id)
+    if state_id:
+        query = query.where(City.state_id == state_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=City.id, sortable={"name": City.name, "code": City.code, "state_name": State.name},
+        search=City.name, active=City.is_active)
     try:
-        for data in query:
-            if data.state_id:
-                state_obj = await State.fetch(key=data.state_id)
-                data.__dict__['state_name'] = state_obj.name
-            response.append(CityTableResponse(**data.__dict__))
-        return paginate(response)
+        response = [CityTableResponse(**data.__dict__, state_name=state_name) for data, state_name in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: city | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/pincode_table/", response_model=Page[PincodeTableResponse])
-async def pincode_show_table():
+@router.get("/pincode_table/", response_model=KeysetPage[PincodeTableResponse])
+async def pincode_show_table(state_id: int = None, city_id: int = None, params: KeysetParams = Depends()):
     logger.info(f"get all request for class: pincode")
-    query = await Pincode.fetch_all()
-    response = []
-    try:
-        for data in query:
-            if data.state_id:
-                state_obj = await State.fetch(key=data.state_id)
-                data.__dict__['state_name'] = state_obj.name
-            if data.city_id:
-                city_obj = await City.fetch(key=data.city_id)
-                data.__dict__['city_name'] = city_obj.name
-            response.append(PincodeTableResponse(**data.__dict__))
-        return paginate(response)
+    query = select(Pincode, State.name, City.name).outerjoin(State, State.id == Pincode.state_id).outerjoin(
+        City, City.id == Pincode.city_id)
+    if state_id:
+        query = query.where(Pincode.state_id == state_id)
+    if city_id:
+        query = query.where(Pincode.city_id == city_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=Pincode.id, sortable={"name": Pincode.name}, search=Pincode.name, active=Pincode.is_active)
+    try:
+        response = [PincodeTableResponse(**data.__dict__, state_name=state_name, city_name=city_name)
+                    for data, state_name, city_name in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: pincode | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/rto_table/", response_model=Page[RtoTableResponse])
-async def rto_show_table():
+@router.get("/rto_table/", response_model=KeysetPage[RtoTableResponse])
+async def rto_show_table(state_id: int = None, city_id: int = None, params: KeysetParams = Depends()):
     logger.info(f"get all request for class: rto")
-    query = await Rto.fetch_all()
-    response = []
-    try:
-        for data in query:
-            if data.state_id:
-                state_obj = await State.fetch(key=data.state_id)
-                data.__dict__['state_name'] = state_obj.name
-            if data.city_id:
-                city_obj = await City.fetch(key=data.city_id)
-                data.__dict__['city_name'] = city_obj.name
-            response.append(RtoTableResponse(**data.__dict__))
-        return paginate(response)
+    query = select(Rto, State.name, City.name).outerjoin(State, State.id == Rto.state_id).outerjoin(
+        City, City.id == Rto.city_id)
+    if state_id:
+        query = query.where(Rto.state_id == state_id)
+    if city_id:
+        query = query.where(Rto.city_id == city_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=Rto.id, sortable={"name": Rto.name, "code": Rto.code}, search=Rto.name,
+        active=Rto.is_active)
+    try:
+        response = [RtoTableResponse(**data.__dict__, state_name=state_name, city_name=city_name)
+                    for data, state_name, city_name in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: rto | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/Vehicle_model_table/", response_model=Page[VehicleModelTableResponse])
-async def vehicle_model_show_table():
-    query = await VehicleModel.fetch_all()
-    response = []
+@router.get("/Vehicle_model_table/", response_model=KeysetPage[VehicleModelTableResponse])
+async def vehicle_model_show_table(oem_id: int = None, params: KeysetParams = Depends()):
+    query = select(VehicleModel, Oem.name).outerjoin(Oem, Oem.id == VehicleModel.oem_id)
+    if oem_id:
+        query = query.where(VehicleModel.oem_id == oem_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=VehicleModel.id, sortable={"name": VehicleModel.name, "code": VehicleModel.code,
+                                                      "oem_name": Oem.name},
+        search=VehicleModel.name, active=VehicleModel.is_active)
     try:
-        for data in query:
-            if data.oem_id:
-                oem_obj = await Oem.fetch(key=data.oem_id)
-                data.__dict__['oem_name'] = oem_obj.name
-            response.append(VehicleModelTableResponse(**data.__dict__))
-        return paginate(response)
+        response = [VehicleModelTableResponse(**data.__dict__, oem_name=oem_name) for data, oem_name in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: Model | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/variant_table/", response_model=Page[VehicleVariantTableResponse])
-async def variant_show_table():
+async def get_last_sub_variants(variant_ids: List[int]) -> Dict[int, SubVariant]:
+    # the tables show the last sub variant of a variant
+    query = select(SubVariant).where(SubVariant.variant_id.in_(variant_ids)).order_by(SubVariant.id)
+    sub_variants = (await sqldb.execute(query)).scalars().all()
+    return {sub_variant.variant_id: sub_variant for sub_variant in sub_variants}
+
+
+@router.get("/variant_table/", response_model=KeysetPage[VehicleVariantTableResponse])
+async def variant_show_table(model_id: int = None, params: KeysetParams = Depends()):
     logger.info(f"get all request for class: variant")
-    query = await Variant.fetch_all()
-    response = []
-    try:
-        for data in query:
-            if data.fuel_type_id:
-                fuel_obj = await FuelType.fetch(key=data.fuel_type_id)
-                data.__dict__['fuel_name'] = fuel_obj.name
-            if data.id:
-                sub_variant_obj = await VehicleRepository.get_color_tone_for_variant_table(data.id)
-                for item in sub_variant_obj:
-                    data.__dict__['sub_variant_id'] = item.id
-                    data.__dict__['color'] = item.color
-                    data.__dict__['tone'] = item.tone
-            model = await VehicleModel.fetch(key=data.model_id)
-            data.__dict__['model_name'] = model.name
-            oem = await Oem.fetch(key=model.oem_id)
-            data.__dict__['oem_name'] = oem.name
-            response.append(VehicleVariantTableResponse(**data.__dict__))
-        return paginate(response)
+    query = select(Variant, FuelType.name, VehicleModel.name, Oem.name).outerjoin(
+        FuelType, FuelType.id == Variant.fuel_type_id).join(VehicleModel, VehicleModel.id == Variant.model_id).join(
+        Oem, Oem.id == VehicleModel.oem_id)
+    if model_id:
+        query = query.where(Variant.model_id == model_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=Variant.id, sortable={"name": Variant.name, "variant_code": Variant.variant_code,
+                                                 "model_name": VehicleModel.name},
+        search=Variant.name, active=Variant.is_active)
+    try:
+        sub_variants = await get_last_sub_variants([data.id for data, *_ in rows])
+        response = []
+        for data, fuel_name, model_name, oem_name in rows:
+            sub_variant = sub_variants.get(data.id)
+            if sub_variant:
+                data.__dict__.update(sub_variant_id=sub_variant.id, color=sub_variant.color, tone=sub_variant.tone)
+            response.append(VehicleVariantTableResponse(**data.__dict__, fuel_name=fuel_name, model_name=model_name,
+                                                        oem_name=oem_name))
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: variant | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/variant_price_table/", response_model=Page[VehicleVariantPriceTableResponse])
-async def variant_price_show_table():
+@router.get("/variant_price_table/", response_model=KeysetPage[VehicleVariantPriceTableResponse])
+async def variant_price_show_table(variant_id: int = None, state_id: int = None, params: KeysetParams = Depends()):
     logger.info(f"get all request for class: cls")
-    query = await ExShowRoomPrice.fetch_all()
-    response = []
-    try:
-        for data in query:
-            if data.variant_id:
-                data.__dict__['ex_showroom_price_id'] = data.id
-                variant_obj = await Variant.fetch(key=data.variant_id)
-                model = await VehicleModel.fetch(key=variant_obj.model_id)
-                data.__dict__['model_name'] = model.name
-                data.__dict__['variant_name'] = variant_obj.name
-                sub_variant_obj = await VehicleRepository.get_color_tone_for_variant_table(data.variant_id)
-                for item in sub_variant_obj:
-                    data.__dict__['color'] = item.color
-                    data.__dict__['tone'] = item.tone
-            if data.state_id:
-                state_obj = await State.fetch(key=data.state_id)
-                data.__dict__['state_name'] = state_obj.name
-            response.append(VehicleVariantPriceTableResponse(**data.__dict__))
-        return paginate(response)
+    query = select(ExShowRoomPrice, Variant.name, VehicleModel.name, State.name).join(
+        Variant, Variant.id == ExShowRoomPrice.variant_id).join(
+        VehicleModel, VehicleModel.id == Variant.model_id).outerjoin(State, State.id == ExShowRoomPrice.state_id)
+    if variant_id:
+        query = query.where(ExShowRoomPrice.variant_id == variant_id)
+    if state_id:
+        query = query.where(ExShowRoomPrice.state_id == state_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=ExShowRoomPrice.id, sortable={"variant_name": Variant.name,
+                                                         "ex_showroom_price": ExShowRoomPrice.exShowRoomPrice},
+        search=Variant.name)
+    try:
+        sub_variants = await get_last_sub_variants([data.variant_id for data, *_ in rows])
+        response = []
+        for data, variant_name, model_name, state_name in rows:
+            sub_variant = sub_variants.get(data.variant_id)
+            if sub_variant:
+                data.__dict__.update(color=sub_variant.color, tone=sub_variant.tone)
+            response.append(VehicleVariantPriceTableResponse(**data.__dict__, ex_showroom_price_id=data.id,
+                                                             variant_name=variant_name, model_name=model_name,
+                                                             state_name=state_name))
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: Ex_showroom_price | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/rto_zone_table/", response_model=Page[RtoZoneTableResponse])
-async def rto_zone_show_table():
+@router.get("/rto_zone_table/", response_model=KeysetPage[RtoZoneTableResponse])
+async def rto_zone_show_table(params: KeysetParams = Depends()):
     logger.info(f"get all request for class: zone")
+    rows, next_cursor, total = await keyset_paginate(
+        select(RtoZone), params, key=RtoZone.id, sortable={"zone_name": RtoZone.zone_name}, search=RtoZone.zone_name,
+        active=RtoZone.is_active)
     try:
-        rto_zone_obj = await RtoZone.fetch_all()
-        return paginate(
-            [RtoZoneTableResponse(id=data.id, zone_name=data.zone_name, is_active=data.is_active)
-             for data in rto_zone_obj])
+        response = [RtoZoneTableResponse(id=data.id, zone_name=data.zone_name, is_active=data.is_active)
+                    for (data,) in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: zone | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/region_table/", response_model=Page[RegionTableResponse])
-async def region_show_table():
+@router.get("/region_table/", response_model=KeysetPage[RegionTableResponse])
+async def region_show_table(rto_zone_id: int = None, params: KeysetParams = Depends()):
     logger.info(f"get all request for class: region")
-    query = await Region.fetch_all()
-    response = []
+    query = select(Region, RtoZone.zone_name).outerjoin(RtoZone, RtoZone.id == Region.rto_zone_id)
+    if rto_zone_id:
+        query = query.where(Region.rto_zone_id == rto_zone_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=Region.id, sortable={"name": Region.name}, search=Region.name, active=Region.is_active)
     try:
-        for data in query:
-            if data.rto_zone_id:
-                rto_zone_obj = await RtoZone.fetch(key=data.rto_zone_id)
-                data.__dict__['rto_zone_id'] = data.rto_zone_id
-                data.__dict__['rto_zone_name'] = rto_zone_obj.zone_name
-            response.append(RegionTableResponse(**data.__dict__))
-        return paginate(response)
+        response = [RegionTableResponse(**data.__dict__, rto_zone_name=rto_zone_name) for data, rto_zone_name in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: region | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/city_cluster_table/", response_model=Page[CityClusterTableResponse])
-async def city_cluster_show_table():
+@router.get("/city_cluster_table/", response_model=KeysetPage[CityClusterTableResponse])
+async def city_cluster_show_table(params: KeysetParams = Depends()):
     logger.info(f"get all request for class: city cluster")
-    city_cluster_query = await CityClusterCityMapping.fetch_all(is_active=True)
-    try:
-        city_cluster_segregation = {}
-        for city_cluster in city_cluster_query:
-            if city_cluster_segregation.get(city_cluster.city_cluster_id) is None:
-                city_cluster_segregation[city_cluster.city_cluster_id] = [city_cluster.city_id]
-            else:
-                city_cluster_segregation[city_cluster.city_cluster_id].append(city_cluster.city_id)
-
-        response = []
-        for city_cluster_id, city_ids in city_cluster_segregation.items():
-            data = {}
-            query = await sqldb.execute(select(CityCluster).where(CityCluster.id == city_cluster_id))
-            city_cluster_data = query.scalars().first()
-            cluster_obj = await CityCluster.fetch(key=city_cluster_id)
-            data['city_cluster_id'] = city_cluster_id
-            data['is_active'] = city_cluster_data.is_active
-            data['city_cluster_name'] = cluster_obj.name
-            data['cluster_cities'] = []
-            for city_id in city_ids:
-                city_obj = await City.fetch(key=city_id)
-                data['cluster_cities'].append({"city_id": city_id, "city_name": city_obj.name,
-                                               "city_status": city_obj.is_active})
-
-            response.append(CityClusterTableResponse(**data))
-        return paginate(response)
+    # a page of the clusters with an active city, then the active cities of the clusters of the page
+    query = select(CityCluster).where(select(CityClusterCityMapping.id).where(
+        CityClusterCityMapping.city_cluster_id == CityCluster.id,
+        CityClusterCityMapping.is_active.is_(True)).exists())
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=CityCluster.id, sortable={"name": CityCluster.name}, search=CityCluster.name,
+        active=CityCluster.is_active)
+    try:
+        city_query = await sqldb.execute(
+            select(CityClusterCityMapping.city_cluster_id, City).join(
+                City, City.id == CityClusterCityMapping.city_id).where(
+                CityClusterCityMapping.city_cluster_id.in_([cluster.id for (cluster,) in rows]),
+                CityClusterCityMapping.is_active.is_(True)).order_by(CityClusterCityMapping.id))
+        cluster_cities = defaultdict(list)
+        for city_cluster_id, city in city_query.all():
+            cluster_cities[city_cluster_id].append({"city_id": city.id, "city_name": city.name,
+                                                    "city_status": city.is_active})
+        response = [CityClusterTableResponse(city_cluster_id=cluster.id, is_active=cluster.is_active,
+                                             city_cluster_name=cluster.name, cluster_cities=cluster_cities[cluster.id])
+                    for (cluster,) in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: city cluster | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/rto_cluster_table/", response_model=Page[RtoClusterTableResponse])
-async def rto_cluster_show_table():
+@router.get("/rto_cluster_table/", response_model=KeysetPage[RtoClusterTableResponse])
+async def rto_cluster_show_table(params: KeysetParams = Depends()):
     logger.info(f"get all request for class: cls")
-    rto_cluster_query = await RtoClusterRtoMapping.fetch_all(is_active=True)
-    try:
-        rto_cluster_segregation = {}
-        for rto_cluster in rto_cluster_query:
-            if rto_cluster_segregation.get(rto_cluster.rto_cluster_id) is None:
-                rto_cluster_segregation[rto_cluster.rto_cluster_id] = [rto_cluster.rto_id]
-            else:
-                rto_cluster_segregation[rto_cluster.rto_cluster_id].append(rto_cluster.rto_id)
-
-        response = []
-        for rto_cluster_id, rto_ids in rto_cluster_segregation.items():
-            data = {}
-            query = await sqldb.execute(select(RtoCluster).where(RtoCluster.id == rto_cluster_id))
-            rto_cluster_data = query.scalars().first()
-            cluster_obj = await RtoCluster.fetch(key=rto_cluster_id)
-            data['rto_cluster_id'] = rto_cluster_id
-            data['is_active'] = rto_cluster_data.is_active
-            data['rto_cluster_name'] = cluster_obj.name
-            data['cluster_rto'] = []
-            for rto_id in rto_ids:
-                rto_obj = await Rto.fetch(key=rto_id)
-                data['cluster_rto'].append({"rto_id": rto_id, "rto_code": rto_obj.code,
-                                            "rto_status": rto_obj.is_active})
-
-            response.append(RtoClusterTableResponse(**data))
-        return paginate(response)
+    # a page of the clusters with an active rto, then the active rtos of the clusters of the page
+    query = select(RtoCluster).where(select(RtoClusterRtoMapping.id).where(
+        RtoClusterRtoMapping.rto_cluster_id == RtoCluster.id,
+        RtoClusterRtoMapping.is_active.is_(True)).exists())
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=RtoCluster.id, sortable={"name": RtoCluster.name}, search=RtoCluster.name,
+        active=RtoCluster.is_active)
+    try:
+        rto_query = await sqldb.execute(
+            select(RtoClusterRtoMapping.rto_cluster_id, Rto).join(Rto, Rto.id == RtoClusterRtoMapping.rto_id).where(
+                RtoClusterRtoMapping.rto_cluster_id.in_([cluster.id for (cluster,) in rows]),
+                RtoClusterRtoMapping.is_active.is_(True)).order_by(RtoClusterRtoMapping.id))
+        cluster_rto = defaultdict(list)
+        for rto_cluster_id, rto in rto_query.all():
+            cluster_rto[rto_cluster_id].append({"rto_id": rto.id, "rto_code": rto.code, "rto_status": rto.is_active})
+        response = [RtoClusterTableResponse(rto_cluster_id=cluster.id, is_active=cluster.is_active,
+                                            rto_cluster_name=cluster.name, cluster_rto=cluster_rto[cluster.id])
+                    for (cluster,) in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: rto cluster | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/insurer_table/", response_model=Page[InsurerTableResponse])
-async def insurer_show_table():
+@router.get("/insurer_table/", response_model=KeysetPage[InsurerTableResponse])
+async def insurer_show_table(params: KeysetParams = Depends()):
     logger.info(f"get all request for class: insurer")
-    query = await Insurer.fetch_all()
+    rows, next_cursor, total = await keyset_paginate(
+        select(Insurer), params, key=Insurer.id, sortable={"name": Insurer.name, "code": Insurer.code},
+        search=Insurer.name, active=Insurer.is_active)
     response = []
     try:
-        for data in query:
+        for (data,) in rows:
             if data.user_obj_id:
                 user_details_url = f'{USER_DETAILS_URL}?user_id={data.user_obj_id}'
                 user_details = await call_auth_api(user_details_url)
@@ -630,51 +657,58 @@ async def insurer_show_table():
                 data.__dict__['user_email'] = user_data["email"]
                 data.__dict__['user_status'] = user_data["is_active"]
             response.append(InsurerTableResponse(**data.__dict__))
-        return paginate(response)
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: insurer | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/insurer_local_office_table/", response_model=Page[InsurerLocalOfficeTableResponse])
-async def insurer_local_office_show_table():
+@router.get("/insurer_local_office_table/", response_model=KeysetPage[InsurerLocalOfficeTableResponse])
+async def insurer_local_office_show_table(insurer_id: int = None, state_id: int = None,
+                                          params: KeysetParams = Depends()):
     logger.info(f"get all request for class: insurer local office")
-    query = await InsurerLocalOffice.fetch_all()
-    response = []
-    try:
-        for data in query:
-            if data.insurer_id:
-                insurer_obj = await Insurer.fetch(key=data.insurer_id)
-                data.__dict__["insurer_name"] = insurer_obj.name
-            if data.state_id:
-                state_obj = await State.fetch(key=data.state_id)
-                data.__dict__['dealer_state_name'] = state_obj.name
-            if data.city_id:
-                city_obj = await City.fetch(key=data.city_id)
-                data.__dict__['dealer_city_name'] = city_obj.name
-            response.append(InsurerLocalOfficeTableResponse(**data.__dict__))
-        return paginate(response)
+    query = select(InsurerLocalOffice, Insurer.name, State.name, City.name).outerjoin(
+        Insurer, Insurer.id == InsurerLocalOffice.insurer_id).outerjoin(
+        State, State.id == InsurerLocalOffice.state_id).outerjoin(City, City.id == InsurerLocalOffice.city_id)
+    if insurer_id:
+        query = query.where(InsurerLocalOffice.insurer_id == insurer_id)
+    if state_id:
+        query = query.where(InsurerLocalOffice.state_id == state_id)
+    rows, next_cursor, total = await keyset_paginate(
+        query, params, key=InsurerLocalOffice.id, sortable={"local_office_code": InsurerLocalOffice.local_office_code,
+                                                            "insurer_name": Insurer.name},
+        search=InsurerLocalOffice.local_office_code, active=InsurerLocalOffice.is_active)
+    try:
+        response = [InsurerLocalOfficeTableResponse(**data.__dict__, insurer_name=insurer_name,
+                                                    dealer_state_id=data.state_id, dealer_state_name=state_name,
+                                                    dealer_city_id=data.city_id, dealer_city_name=city_name)
+                    for data, insurer_name, state_name, city_name in rows]
+        return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
     except Exception as e:
         logger.exception(f"Not able to get all records for class: insurer local office | exception encounter {e}.")
         raise HTTPException(status_code=400, detail=f"Error while fetching all records")
 
 
-@router.get("/financier_table/", response_model=Page[FinancierResponse])
-async def financier_show_table():
+@router.get("/financier_table/", response_model=KeysetPage[FinancierResponse])
+async def financier_show_table(params: KeysetParams = Depends()):
     logger.info(f"get all request for class: financier")
-    financier_obj = await Financier.fetch_all()
-    return paginate(
-        [FinancierResponse(id=financier.id, financier_name=financier.name, code=financier.code,
-                           is_active=financier.is_active) for
-         financier in financier_obj])
+    rows, next_cursor, total = await keyset_paginate(
+        select(Financier), params, key=Financier.id, sortable={"name": Financier.name, "code": Financier.code},
+        search=Financier.name, active=Financier.is_active)
+    response = [FinancierResponse(id=financier.id, financier_name=financier.name, code=financier.code,
+                                  is_active=financier.is_active) for (financier,) in rows]
+    return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
 
 
-@router.get("/bank_table/", response_model=Page[BankResponse])
-async def bank_show_table():
+@router.get("/bank_table/", response_model=KeysetPage[BankResponse])
+async def bank_show_table(params: KeysetParams = Depends()):
     logger.info(f"get all request for class: bank")
-    bank_obj = await Bank.fetch_all()
-    return paginate(
-        [BankResponse(id=bank.id, bank_name=bank.name, code=bank.code, is_active=bank.is_active) for bank in bank_obj])
+    rows, next_cursor, total = await keyset_paginate(
+        select(Bank), params, key=Bank.id, sortable={"name": Bank.name, "code": Bank.code}, search=Bank.name,
+        active=Bank.is_active)
+    response = [BankResponse(id=bank.id, bank_name=bank.name, code=bank.code, is_active=bank.is_active)
+                for (bank,) in rows]
+    return KeysetPage(items=response, size=params.size, next_cursor=next_cursor, total=total)
 
 
 # for variant dropdown in variant price add new entry
@@ -693,6 +727,7 @@ async def get_variants_and_sub_variant(model_id: int):
 
 # TODO: Add dealer and get dealer API needs to be update for now these apis are not in use.
 @router.post("/add_dealer/")
+@MasterDataCache.invalidates(Dealer, Workshop)
 async def add_dealer(admin_dealer_request: AdminDealerRequest):
     dealer = await AdminRepository.add_dealer_details(admin_dealer_request)
     if not dealer:
@@ -3,7 +3,7 @@ import logging
 import pandas as pd
 from fastapi import UploadFile
 from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
-from app.data_insertion.main import insert_bulk_data
+from app.data_insertion.main import get_insert_class, insert_bulk_data
 from app.models.admin_details import Oem
 from app.schemas.admin_db_details import AssestUploadResponse
 from app.settings import ERROR_FILE_URL, S3_BUCKET_URL
@@ -17,6 +17,7 @@ import pathlib
 from botocore.client import BaseClient
 from fastapi import APIRouter, Depends, status
 from app.utils.code_utils import get_async_s3_client, check_validation
+from app.utils.master_data_cache import MasterDataCache
 
 logger = logging.getLogger('api')
 router = APIRouter()
@@ -24,13 +25,21 @@ router = APIRouter()
 path = 'app/templates/'
 
 
+def uploaded_models(data_type: str) -> list:
+    # an upload inserts into SQLALCHEMY_MODEL and, for variants and clusters, a second model
+    return [model for name, model in vars(get_insert_class(data_type)).items() if name.startswith("SQLALCHEMY_MODEL")]
+
+
 @router.post("/upload_master/{data_type}/")
 async def upload_document(data_type: str, document_file: UploadFile):
     logger.info(f"Upload master csv request -> table_name: {data_type}")
     db_data = pd.read_csv(document_file.file)
     data = {"error": "Uploaded file is empty."}
     if not db_data.empty:
-        data = await insert_bulk_data(data_type, db_data)
+        try:
+            data = await insert_bulk_data(data_type, db_data)
+        finally:
+            MasterDataCache.invalidate(*uploaded_models(data_type))
         if data.get('status'):
             # slicing prefix(temp_) and suffix(.csv)
             url = ERROR_FILE_URL.format(data['filename'][5:-4])
@@ -148,5 +157,8 @@ async def update_status(id: int, table_name: str, is_active: bool):
         "insurer_local_office": InsurerLocalOffice,
         "insurer_dealer_mapping": ICDealerMapping
     }
-    await res[table_name].update(id, **{"is_active": is_active})
+    try:
+        await res[table_name].update(id, **{"is_active": is_active})
+    finally:
+        MasterDataCache.invalidate(res[table_name])
     return {"msg": "Status is updated"}
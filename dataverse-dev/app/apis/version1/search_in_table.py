@@ -7,7 +7,6 @@ from app.models.location import *
 from app.models.vehicle_details import *
 from app.schemas.admin_db_details import *
 from app.models.financier import Bank, Financier
-from app.services.vehicle import VehicleRepository
 from sqlalchemy import select
 
 logger = logging.getLogger('api')
@@ -29,20 +28,20 @@ async def search_zone(zone_name: str):
 async def search_region(zone_id: int = None, region_name: str = None):
     logger.info(f"search on class: region | arguments: {zone_id} | {region_name}")
     response = []
+    query = select(Region, RtoZone.zone_name).join(RtoZone, RtoZone.id == Region.rto_zone_id)
     if region_name:
-        query = select(Region).where(Region.name == region_name)
+        query = query.where(Region.name == region_name)
 
     elif zone_id:
-        query = select(Region).where(Region.rto_zone_id == zone_id)
+        query = query.where(Region.rto_zone_id == zone_id)
     else:
-        query = select(Region).where(Region.name == region_name, Region.rto_zone_id == zone_id)
+        query = query.where(Region.name == region_name, Region.rto_zone_id == zone_id)
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            zone_obj = await RtoZone.fetch(key=item.rto_zone_id)
+        for item, zone_name in data:
             response.append(
-                SearchRegionResponse(name=item.name, rto_zone_name=zone_obj.zone_name, is_active=item.is_active))
+                SearchRegionResponse(name=item.name, rto_zone_name=zone_name, is_active=item.is_active))
         return response
     logger.exception("No data found related to search keyword for class region")
     return JSONResponse({"error_msg": "No data found related to search keyword"})
@@ -52,18 +51,18 @@ async def search_region(zone_id: int = None, region_name: str = None):
 async def search_region(region_id: int = None, state_name: str = None):
     logger.info(f"search on class: state | arguments: {region_id} | {state_name}")
     response = []
+    query = select(State, Region.name).join(Region, Region.id == State.region)
     if state_name:
-        query = select(State).where(State.name == state_name)
+        query = query.where(State.name == state_name)
     elif region_id:
-        query = select(State).where(State.region == region_id)
+        query = query.where(State.region == region_id)
     else:
-        query = await sqldb.execute(select(State).where(State.region == region_id, State.name == state_name))
+        query = query.where(State.region == region_id, State.name == state_name)
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            region_obj = await Region.fetch(key=item.region)
-            response.append(SearchStateResponse(name=item.name, region_name=region_obj.name, is_active=item.is_active))
+        for item, region_name in data:
+            response.append(SearchStateResponse(name=item.name, region_name=region_name, is_active=item.is_active))
         return response
     logger.exception("No data found related to search keyword for class state")
     return JSONResponse({"error_msg": "No data found related to search keyword"})
@@ -73,18 +72,18 @@ async def search_region(region_id: int = None, state_name: str = None):
 async def search_city(state_id: int = None, city_name: str = None):
     logger.info(f"search on class: city | arguments: {state_id} | {city_name}")
     response = []
+    query = select(City, State.name).join(State, State.id == City.state_id)
     if city_name:
-        query = select(City).where(City.name == city_name)
+        query = query.where(City.name == city_name)
     elif state_id:
-        query = select(City).where(City.state_id == state_id)
+        query = query.where(City.state_id == state_id)
     else:
-        query = select(City).where(City.state_id == state_id, City.name == city_name)
+        query = query.where(City.state_id == state_id, City.name == city_name)
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            state_obj = await State.fetch(key=item.state_id)
-            response.append(SearchCityResponse(state_name=state_obj.name, name=item.name, is_active=item.is_active))
+        for item, state_name in data:
+            response.append(SearchCityResponse(state_name=state_name, name=item.name, is_active=item.is_active))
         return response
     logger.exception("No data found related to search keyword for class city")
     return JSONResponse({"error_msg": "No data found related to search keyword"})
@@ -94,21 +93,21 @@ async def search_city(state_id: int = None, city_name: str = None):
 async def search_pincode(state_id: int = None, city_id: int = None, pincode: str = None):
     logger.info(f"search on class: pincode | arguments: {state_id} | {city_id} | {pincode}")
     response = []
+    query = select(Pincode, State.name, City.name).join(State, State.id == Pincode.state_id).join(
+        City, City.id == Pincode.city_id)
     if pincode:
-        query = select(Pincode).where(Pincode.name == pincode)
+        query = query.where(Pincode.name == pincode)
     elif state_id:
-        query = select(Pincode).where(Pincode.state_id == state_id)
+        query = query.where(Pincode.state_id == state_id)
     elif city_id:
-        query = select(Pincode).where(Pincode.city_id == city_id)
+        query = query.where(Pincode.city_id == city_id)
     else:
-        query = select(Pincode).where(Pincode.state_id == state_id, Pincode.city_id == city_id, Pincode.name == pincode)
+        query = query.where(Pincode.state_id == state_id, Pincode.city_id == city_id, Pincode.name == pincode)
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            state_obj = await State.fetch(key=item.state_id)
-            city_obj = await City.fetch(key=item.city_id)
-            response.append(SearchPincodeResponse(state_name=state_obj.name, city_name=city_obj.name, name=item.name,
+        for item, state_name, city_name in data:
+            response.append(SearchPincodeResponse(state_name=state_name, city_name=city_name, name=item.name,
                                                   is_active=item.is_active))
         return response
     logger.exception("No data found related to search keyword for class pincode")
@@ -119,21 +118,20 @@ async def search_pincode(state_id: int = None, city_id: int = None, pincode: str
 async def search_rto(state_id: int = None, city_id: int = None, rto: str = None):
     logger.info(f"search on class: rto | arguments: {state_id} | {city_id} | {rto}")
     response = []
+    query = select(Rto, State.name, City.name).join(State, State.id == Rto.state_id).join(City, City.id == Rto.city_id)
     if rto:
-        query = select(Rto).where(Rto.name == rto)
+        query = query.where(Rto.name == rto)
     elif state_id:
-        query = select(Rto).where(Rto.state_id == state_id)
+        query = query.where(Rto.state_id == state_id)
     elif city_id:
-        query = select(Rto).where(Rto.city_id == city_id)
+        query = query.where(Rto.city_id == city_id)
     else:
-        query = select(Rto).where(Rto.state_id == state_id, Rto.city_id == city_id, Rto.name == rto)
+        query = query.where(Rto.state_id == state_id, Rto.city_id == city_id, Rto.name == rto)
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            state_obj = await State.fetch(key=item.state_id)
-            city_obj = await City.fetch(key=item.city_id)
-            response.append(SearchRtoResponse(state_name=state_obj.name, city_name=city_obj.name, name=item.name,
+        for item, state_name, city_name in data:
+            response.append(SearchRtoResponse(state_name=state_name, city_name=city_name, name=item.name,
                                               code=item.code, is_active=item.is_active))
         return response
     logger.exception("No data found related to search keyword for class city rto")
@@ -143,34 +141,27 @@ async def search_rto(state_id: int = None, city_id: int = None, rto: str = None)
 @router.patch("/search_city_cluster/")
 async def search_city_cluster(city_ids: List[int], cluster_id: int):
     logger.info(f"search on class: city cluster | arguments: {city_ids} | {cluster_id}")
-    res = []
-    for city_ids in city_ids:
-        city_cluster_query = await sqldb.execute(
-            select(CityClusterCityMapping).filter(CityClusterCityMapping.city_id == city_ids,
-                                                  CityClusterCityMapping.city_cluster_id == cluster_id
-                                                  ))
-        res.append(city_cluster_query.scalars().first())
+    city_cluster_query = await sqldb.execute(
+        select(CityClusterCityMapping, CityCluster.name, City.name).join(
+            CityCluster, CityCluster.id == CityClusterCityMapping.city_cluster_id).join(
+            City, City.id == CityClusterCityMapping.city_id).filter(
+            CityClusterCityMapping.city_id.in_(city_ids),
+            CityClusterCityMapping.city_cluster_id == cluster_id
+        ))
+    # first mapping of every city, in the order the cities were asked for
+    city_clusters = {}
+    for city_cluster, cluster_name, city_name in city_cluster_query.all():
+        city_clusters.setdefault(city_cluster.city_id, (city_cluster, cluster_name, city_name))
+    res = [city_clusters[city_id] for city_id in dict.fromkeys(city_ids) if city_id in city_clusters]
 
     if res:
-        city_cluster_segregation = {}
-        for city_cluster in res:
-            if city_cluster_segregation.get(city_cluster.city_cluster_id) is None:
-                city_cluster_segregation[city_cluster.city_cluster_id] = [city_cluster.city_id]
-            else:
-                city_cluster_segregation[city_cluster.city_cluster_id].append(city_cluster.city_id)
-
-        response = []
-        for city_cluster_id, city_ids in city_cluster_segregation.items():
-            data = {}
-            cluster_obj = await CityCluster.fetch(key=city_cluster_id)
-            data['city_cluster_id'] = city_cluster_id
-            data['city_cluster_name'] = cluster_obj.name
-            data['cluster_cities'] = []
-            for city_id in city_ids:
-                city_obj = await City.fetch(key=city_id)
-                data['cluster_cities'].append({"city_id": city_id, "city_name": city_obj.name})
-            response.append(data)
-        return response
+        response = {}
+        for city_cluster, cluster_name, city_name in res:
+            data = response.setdefault(city_cluster.city_cluster_id, {'city_cluster_id': city_cluster.city_cluster_id,
+                                                                      'city_cluster_name': cluster_name,
+                                                                      'cluster_cities': []})
+            data['cluster_cities'].append({"city_id": city_cluster.city_id, "city_name": city_name})
+        return list(response.values())
     logger.exception("No data found related to search keyword for class city cluster")
     return JSONResponse({"error_msg": "No data found related to search keyword"})
 
@@ -178,19 +169,21 @@ async def search_city_cluster(city_ids: List[int], cluster_id: int):
 @router.get("/search_rto_cluster/", response_model=List[SearchRtoClusterResponse])
 async def search_rto_cluster(state_id: int, city_id: int, rto_id: int, rto_cluster_name: str):
     logger.info(f"search on class: rto cluster | arguments: {state_id} | {city_id} | {rto_cluster_name}")
-    query = await sqldb.execute(select(RtoCluster).where(RtoCluster.state_id == state_id,
-                                                         RtoCluster.city_id == city_id,
-                                                         RtoCluster.rto_id == rto_id,
-                                                         RtoCluster.name == rto_cluster_name
-                                                         ))
-    data = query.scalars().all()
+    # a cluster has no location of its own, it is searched through the rtos mapped to it
+    query = await sqldb.execute(
+        select(RtoCluster, State.name, City.name, Rto.name).join(
+            RtoClusterRtoMapping, RtoClusterRtoMapping.rto_cluster_id == RtoCluster.id).join(
+            Rto, Rto.id == RtoClusterRtoMapping.rto_id).join(State, State.id == Rto.state_id).join(
+            City, City.id == Rto.city_id).where(Rto.state_id == state_id,
+                                                Rto.city_id == city_id,
+                                                Rto.id == rto_id,
+                                                RtoCluster.name == rto_cluster_name
+                                                ))
+    data = query.first()
     if data:
-        for item in data:
-            state_obj = await State.fetch(key=item.state_id)
-            city_obj = await City.fetch(key=item.city_id)
-            rto_obj = await Rto.fetch(key=item.rto_id)
-            return [SearchRtoClusterResponse(state_name=state_obj.name, city_name=city_obj.name, rto_name=rto_obj.name,
-                                             name=item.name, is_active=item.is_active)]
+        item, state_name, city_name, rto_name = data
+        return [SearchRtoClusterResponse(state_name=state_name, city_name=city_name, rto_name=rto_name,
+                                         name=item.name, is_active=item.is_active)]
     logger.exception("No data found related to search keyword for class rto cluster")
     return JSONResponse({"error_msg": "No data found related to search keyword"})
 
@@ -198,12 +191,12 @@ async def search_rto_cluster(state_id: int, city_id: int, rto_id: int, rto_clust
 @router.get("/search_vehicle_model/", response_model=List[SearchVehicleModelResponse])
 async def search_vehicle_model(model_name: str):
     logger.info(f"search on class: model | arguments: {model_name}")
-    query = await sqldb.execute(select(VehicleModel).where(VehicleModel.name == model_name))
-    data = query.scalars().all()
+    query = await sqldb.execute(select(VehicleModel, Oem.name).join(Oem, Oem.id == VehicleModel.oem_id).where(
+        VehicleModel.name == model_name))
+    data = query.first()
     if data:
-        for item in data:
-            oem_obj = await Oem.fetch(key=item.oem_id)
-            return [SearchVehicleModelResponse(name=item.name, oem_name=oem_obj.name, is_active=item.is_active)]
+        item, oem_name = data
+        return [SearchVehicleModelResponse(name=item.name, oem_name=oem_name, is_active=item.is_active)]
     logger.exception("No data found related to search keyword for class model ")
     return JSONResponse({"error_msg": "No data found related to search keyword"})
 
@@ -212,30 +205,28 @@ async def search_vehicle_model(model_name: str):
 async def search_vehicle_variant(model_id: int = None, variant_name: str = None):
     logger.info(f"search on class: variant | arguments: {model_id} | {variant_name}")
     response = []
+    # a row per sub variant of every variant
+    query = select(Variant, VehicleModel.name, FuelType.name, Oem.name, SubVariant.color, SubVariant.tone).join(
+        VehicleModel, VehicleModel.id == Variant.model_id).join(FuelType, FuelType.id == Variant.fuel_type_id).join(
+        Oem, Oem.id == VehicleModel.oem_id).join(SubVariant, SubVariant.variant_id == Variant.id).order_by(
+        Variant.id, SubVariant.id)
     if variant_name:
-        query = select(Variant).where(Variant.name == variant_name)
+        query = query.where(Variant.name == variant_name)
     elif model_id:
-        query = select(Variant).where(Variant.model_id == model_id)
+        query = query.where(Variant.model_id == model_id)
     else:
-        query = select(Variant).where(Variant.model_id == model_id, Variant.name == variant_name)
+        query = query.where(Variant.model_id == model_id, Variant.name == variant_name)
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            model_obj = await VehicleModel.fetch(key=item.model_id)
-            fuel_obj = await FuelType.fetch(key=item.fuel_type_id)
-            oem_obj = await Oem.fetch(key=model_obj.oem_id)
-            sub_variant_obj = await VehicleRepository.get_color_tone_for_variant_table(item.id)
-            for items in sub_variant_obj:
-                color = items.color
-                tone = items.tone
-                response.append(
-                    SearchVehicleVariantResponse(oem_name=oem_obj.name, name=item.name, model_name=model_obj.name,
-                                                 fuel_type_name=fuel_obj.name,
-                                                 color=color, tone=tone,
-                                                 cubic_capacity=item.cubic_capacity,
-                                                 seating_capacity=item.seating_capacity, is_bifuel=item.is_bifuel,
-                                                 is_active=item.is_active))
+        for item, model_name, fuel_type_name, oem_name, color, tone in data:
+            response.append(
+                SearchVehicleVariantResponse(oem_name=oem_name, name=item.name, model_name=model_name,
+                                             fuel_type_name=fuel_type_name,
+                                             color=color, tone=tone,
+                                             cubic_capacity=item.cubic_capacity,
+                                             seating_capacity=item.seating_capacity, is_bifuel=item.is_bifuel,
+                                             is_active=item.is_active))
         return response
     logger.exception("No data found related to search keyword for class variant ")
     return JSONResponse({"error_msg": "No data found related to search keyword"})
@@ -245,22 +236,22 @@ async def search_vehicle_variant(model_id: int = None, variant_name: str = None)
 async def search_vehicle_variant_price(variant_id: int = None, state_id: int = None):
     logger.info(f"search on class: exshowroomprice | arguments: {variant_id} | {state_id}")
     response = []
+    query = select(ExShowRoomPrice, Variant.name, State.name).join(
+        Variant, Variant.id == ExShowRoomPrice.variant_id).join(State, State.id == ExShowRoomPrice.state_id)
     if variant_id:
-        query = select(ExShowRoomPrice).where(ExShowRoomPrice.variant_id == variant_id)
+        query = query.where(ExShowRoomPrice.variant_id == variant_id)
     elif state_id:
-        query = select(ExShowRoomPrice).where(ExShowRoomPrice.state_id == state_id)
+        query = query.where(ExShowRoomPrice.state_id == state_id)
     else:
-        query = select(ExShowRoomPrice).where(ExShowRoomPrice.variant_id == variant_id,
-                                              ExShowRoomPrice.state_id == state_id)
+        query = query.where(ExShowRoomPrice.variant_id == variant_id,
+                            ExShowRoomPrice.state_id == state_id)
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            variant_obj = await Variant.fetch(key=item.variant_id)
-            state_obj = await State.fetch(key=item.state_id)
+        for item, variant_name, state_name in data:
             response.append(SearchVehicleVariantPriceResponse(charges_price=item.charges_price,
                                                               exShowRoomPrice=item.exShowRoomPrice,
-                                                              variant_name=variant_obj.name, state_name=state_obj.name))
+                                                              variant_name=variant_name, state_name=state_name))
         return response
     logger.exception("No data found related to search keyword for class exshowroomprice ")
     return JSONResponse({"error_msg": "No data found related to search keyword"})
@@ -297,27 +288,29 @@ async def search_vehicle_variant_price(variant_id: int = None, state_id: int = N
 async def search_dealer_mapping(insurer_id: int = None, dealer_name: str = None):
     logger.info(f"search on class: insurer dealer mapping | arguments: {insurer_id} |  {dealer_name}")
     response = []
+    # the dealer and local office details of a mapping are on the dealer and local office it maps
+    query = select(ICDealerMapping, Insurer.name, Dealer, InsurerLocalOffice).join(
+        Insurer, Insurer.id == ICDealerMapping.insurer_id).join(Dealer, Dealer.id == ICDealerMapping.dealer_id).join(
+        InsurerLocalOffice, InsurerLocalOffice.id == ICDealerMapping.local_office_id)
     if dealer_name:
-        query = select(ICDealerMapping).where(ICDealerMapping.dealer_name == dealer_name)
+        query = query.where(Dealer.dealer_name == dealer_name)
     elif insurer_id:
-        query = select(ICDealerMapping).where(ICDealerMapping.insurer_id == insurer_id)
+        query = query.where(ICDealerMapping.insurer_id == insurer_id)
     else:
-        query = select(ICDealerMapping).where(ICDealerMapping.insurer_id == insurer_id,
-                                              ICDealerMapping.dealer_name == dealer_name)
+        query = query.where(ICDealerMapping.insurer_id == insurer_id,
+                            Dealer.dealer_name == dealer_name)
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            insurer_obj = await Insurer.fetch(key=item.insurer_id)
-            local_office_obj = await InsurerLocalOffice.fetch(key=item.local_office_code)
+        for item, insurer_name, dealer_obj, local_office_obj in data:
             response.append(SearchICDealerMappingRequest(
-                insurer_name=insurer_obj.name,
-                dealer_name=item.dealer_name,
-                dealer_code=item.dealer_code,
-                dealer_state=item.dealer_state,
-                dealer_city=item.dealer_city,
-                local_office_state=item.local_office_state,
-                local_office_code=item.local_office_code,
+                insurer_name=insurer_name,
+                dealer_name=dealer_obj.dealer_name,
+                dealer_code=dealer_obj.dealer_code,
+                dealer_state=dealer_obj.state_id,
+                dealer_city=dealer_obj.city_id,
+                local_office_state=local_office_obj.state_id,
+                local_office_code=local_office_obj.id,
                 local_office_code_name=local_office_obj.local_office_code,
                 payment_mode_code_new=item.payment_mode_code_new,
                 payment_mode_code_renew=item.payment_mode_code_renew,
@@ -332,27 +325,27 @@ async def search_dealer_mapping(insurer_id: int = None, dealer_name: str = None)
 async def search_ic_local_office(insurer_id: int = None, local_office_code: str = None, state_id: int = None):
     logger.info(f"search on class: insurer local office | arguments: {insurer_id} | {local_office_code} | {state_id}")
     response = []
+    query = select(InsurerLocalOffice, State.name, City.name, Insurer.name).join(
+        State, State.id == InsurerLocalOffice.state_id).join(City, City.id == InsurerLocalOffice.city_id).join(
+        Insurer, Insurer.id == InsurerLocalOffice.insurer_id)
     if local_office_code:
-        query = select(InsurerLocalOffice).where(InsurerLocalOffice.local_office_code == local_office_code)
+        query = query.where(InsurerLocalOffice.local_office_code == local_office_code)
     elif insurer_id:
-        query = select(InsurerLocalOffice).where(InsurerLocalOffice.insurer_id == insurer_id)
+        query = query.where(InsurerLocalOffice.insurer_id == insurer_id)
     elif state_id:
-        query = select(InsurerLocalOffice).where(InsurerLocalOffice.dealer_state_id == state_id)
+        query = query.where(InsurerLocalOffice.state_id == state_id)
     else:
-        query = select(InsurerLocalOffice).where(InsurerLocalOffice.insurer_id == insurer_id,
-                                                 InsurerLocalOffice.local_office_code == local_office_code,
-                                                 InsurerLocalOffice.dealer_state_id == state_id,
-                                                 )
+        query = query.where(InsurerLocalOffice.insurer_id == insurer_id,
+                            InsurerLocalOffice.local_office_code == local_office_code,
+                            InsurerLocalOffice.state_id == state_id,
+                            )
     query_session = await sqldb.execute(query)
-    data = query_session.scalars().all()
+    data = query_session.all()
     if data:
-        for item in data:
-            state_obj = await State.fetch(key=item.dealer_state_id)
-            city_obj = await City.fetch(key=item.dealer_city_id)
-            insurer_obj = await Insurer.fetch(key=item.insurer_id)
+        for item, state_name, city_name, insurer_name in data:
             response.append(
-                SearchInsurerLocalOfficeResponse(dealer_state_name=state_obj.name, dealer_city_name=city_obj.name,
-                                                 insurer_name=insurer_obj.name,
+                SearchInsurerLocalOfficeResponse(dealer_state_name=state_name, dealer_city_name=city_name,
+                                                 insurer_name=insurer_name,
                                                  local_office_code=item.local_office_code,
                                                  address_1=item.address_1, is_active=item.is_active))
         return response
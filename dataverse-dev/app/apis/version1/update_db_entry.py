@@ -11,12 +11,14 @@ from app.models.financier import *
 from rb_utils.database import sqldb
 
 from app.settings import USER_DETAILS_UPDATE_URL
+from app.utils.master_data_cache import MasterDataCache
 
 logger = logging.getLogger('api')
 router = APIRouter()
 
 
 @router.patch("/update_state/{id}/")
+@MasterDataCache.invalidates(State)
 async def update_state(id: int, state_request: UpdateStateRequest):
     logger.info(f"update object request for class: state | object_id: {id} ")
     request = state_request.dict()
@@ -35,6 +37,7 @@ async def update_state(id: int, state_request: UpdateStateRequest):
 
 
 @router.patch("/update_city/{id}/")
+@MasterDataCache.invalidates(City)
 async def update_city(id: int, city_request: UpdateCityRequest):
     logger.info(f"update object request for class: city | object_id: {id} ")
     request = city_request.dict()
@@ -52,6 +55,7 @@ async def update_city(id: int, city_request: UpdateCityRequest):
 
 
 @router.patch("/update_rto_zone/{id}/")
+@MasterDataCache.invalidates(RtoZone)
 async def update_rto_zone(id: int, rto_zone_request: UpdateRtoZoneRequest):
     logger.info(f"update object request for class: zone | object_id: {id} ")
     request = rto_zone_request.dict()
@@ -68,6 +72,7 @@ async def update_rto_zone(id: int, rto_zone_request: UpdateRtoZoneRequest):
 
 
 @router.patch("/update_region/{id}/")
+@MasterDataCache.invalidates(Region)
 async def update_region(id: int, region_request: UpdateRegionRequest):
     logger.info(f"update object request for class: region | object_id: {id} ")
     request = region_request.dict()
@@ -85,6 +90,7 @@ async def update_region(id: int, region_request: UpdateRegionRequest):
 
 
 @router.patch("/update_rto/{id}/")
+@MasterDataCache.invalidates(Region)
 async def update_rto(id: int, rto_request: UpdateRtoRequest):
     logger.info(f"update object request for class: rto | object_id: {id} ")
     request = rto_request.dict()
@@ -103,6 +109,7 @@ async def update_rto(id: int, rto_request: UpdateRtoRequest):
 
 
 @router.patch("/update_pincode/{id}/")
+@MasterDataCache.invalidates(Pincode)
 async def update_pincode(id: int, pincode_request: UpdatePincodeRequest):
     logger.info(f"update object request for class: pincode | object_id: {id} ")
     request = pincode_request.dict()
@@ -121,6 +128,7 @@ async def update_pincode(id: int, pincode_request: UpdatePincodeRequest):
 
 
 @router.patch("/update_rto_cluster/{rto_cluster_id}/")
+@MasterDataCache.invalidates(RtoCluster, RtoClusterRtoMapping)
 async def update_rto_cluster(rto_cluster_id: int, rto_cluster_request: UpdateRtoClusterRequest):
     logger.info(f"update object request for class: rto cluster | object_id: {id} ")
     request = rto_cluster_request.dict()
@@ -152,6 +160,7 @@ async def update_rto_cluster(rto_cluster_id: int, rto_cluster_request: UpdateRto
 
 
 @router.patch("/update_city_cluster/{city_cluster_id}/")
+@MasterDataCache.invalidates(CityCluster, CityClusterCityMapping)
 async def update_city_cluster(city_cluster_id: int, city_cluster_request: UpdateCityClusterRequest):
     logger.info(f"update object request for class: city cluster | object_id: {id} ")
     request = city_cluster_request.dict()
@@ -184,6 +193,7 @@ async def update_city_cluster(city_cluster_id: int, city_cluster_request: Update
 
 
 @router.patch("/update_bank/{id}/")
+@MasterDataCache.invalidates(Bank)
 async def update_bank(id: int, bank_request: UpdateBankRequest):
     logger.info(f"update object request for class: bank | object_id: {id} ")
     request = bank_request.dict()
@@ -200,6 +210,7 @@ async def update_bank(id: int, bank_request: UpdateBankRequest):
 
 
 @router.patch("/update_financier/{id}/")
+@MasterDataCache.invalidates(Financier)
 async def update_financier(id: int, financier_request: UpdateFinancierRequest):
     logger.info(f"update object request for class: financier | object_id: {id} ")
     request = financier_request.dict()
@@ -216,6 +227,7 @@ async def update_financier(id: int, financier_request: UpdateFinancierRequest):
 
 
 @router.patch("/update_insurer/{id}/")
+@MasterDataCache.invalidates(Insurer)
 async def update_insurer(id: int, ic_request: UpdateIcUserInfo):
     logger.info(f"update object request for class: insurer | object_id: {id} ")
     insurer_query = await sqldb.execute(select(Insurer).where(Insurer.id == id))
@@ -236,6 +248,7 @@ async def update_insurer(id: int, ic_request: UpdateIcUserInfo):
 
 
 @router.patch("/update_insurer_local_office/{id}/")
+@MasterDataCache.invalidates(InsurerLocalOffice)
 async def update_insurer_local_office(id: int, ic_local_office_request: UpdateInsurerLocalOffice):
     logger.info(f"update object request for class: insurer local office | object_id: {id} ")
     request = ic_local_office_request.dict()
@@ -249,6 +262,7 @@ async def update_insurer_local_office(id: int, ic_local_office_request: UpdateIn
 
 
 @router.patch("/update_insurer_dealer_mapping/{id}/")
+@MasterDataCache.invalidates(ICDealerMapping)
 async def update_insurer_dealer_mapping(id: int, ic_dealer_mapping_request: UpdateInsurerDealerMapping):
     logger.info(f"update object request for class: insurer dealer mapping | object_id: {id} ")
     request = ic_dealer_mapping_request.dict()
@@ -265,6 +279,7 @@ async def update_insurer_dealer_mapping(id: int, ic_dealer_mapping_request: Upda
 
 
 @router.patch("/update_vehicle_model/{id}/")
+@MasterDataCache.invalidates(VehicleModel)
 async def update_vehicle_model(id: int, model_request: UpdateModelRequest):
     logger.info(f"update object request for class: vehicle model | object_id: {id} ")
     request = model_request.dict()
@@ -281,6 +296,7 @@ async def update_vehicle_model(id: int, model_request: UpdateModelRequest):
 
 
 @router.patch("/update_vehicle_variant/{id}/")
+@MasterDataCache.invalidates(Variant, SubVariant)
 async def update_vehicle_variant(id: int, subvariant_id: int, variant_request: UpdateVehicleVariantRequest):
     logger.info(f"update object request for class: vehicle variant | object_id: {id} ")
     request = variant_request.dict()
@@ -314,6 +330,7 @@ async def update_vehicle_variant(id: int, subvariant_id: int, variant_request: U
 
 
 @router.patch("/update_vehicle_variant_price/{id}/")
+@MasterDataCache.invalidates(ExShowRoomPrice)
 async def update_vehicle_variant_price(id: int, variant_price_request: UpdateVehicleVariantPriceRequest):
     logger.info(f"update object request for class: region | object_id: {id} ")
     request = variant_price_request.dict()
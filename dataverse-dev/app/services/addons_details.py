@@ -1,4 +1,5 @@
 import logging
+from collections import defaultdict
 from typing import List, Dict, Any
 
 from rb_utils.database import sqldb
@@ -226,6 +227,73 @@ class AddonDetailRepository:
             policy_dict[key.replace("_id", "").replace("_code", "")] = model_detail
         return policy_dict
 
+    @classmethod
+    def summary_column(cls, key: str, value) -> str:
+        """The column of the `model_dict` model `policy_summary` looks the value of a request key up by."""
+        if isinstance(value, int):
+            return "id"
+        return "dealer_code" if key == "dealer_code" else "code"
+
+    @classmethod
+    async def policy_summaries(cls, policy_summary_requests: List[dict]) -> List[dict]:
+        """
+        `policy_summary` of every request, in request order. The ids and codes of all the requests are collected
+        per table and column and every table is read with a single IN query, whatever the number of requests.
+        """
+        logger = logging.getLogger("db.services.addon_details.policy_summaries")
+        requests = [{key: value for key, value in request.items() if value} for request in policy_summary_requests]
+        lookups = defaultdict(set)
+        geo_extension_ids = {}
+        vehicle_covers = set()
+        for request, policy_summary_request in zip(requests, policy_summary_requests):
+            for key, value in request.items():
+                if key == "geo_extension_ids":
+                    geo_extension_ids[value] = [int(city_id) for city_id in value.split(",")]
+                    lookups[(GeoExtension, "id")].update(geo_extension_ids[value])
+                elif key == "vehicle_cover_id":
+                    vehicle_covers.add((value, policy_summary_request.get("insurer_code")))
+                elif key == "prev_vehicle_cover_id":
+                    vehicle_covers.add((value, None))
+                else:
+                    lookups[(cls.model_dict.get(key), cls.summary_column(key, value))].add(value)
+
+        records = {}
+        try:
+            for (model, column), values in lookups.items():
+                records[(model, column)] = found = {}
+                policy_summary_session = await sqldb.execute(select(model).where(getattr(model, column).in_(values)))
+                for model_detail in policy_summary_session.scalars().all():
+                    found.setdefault(getattr(model_detail, column), model_detail)
+            oem_names = await PolicyDetailRepository.get_oem_names(
+                {request["vehicle_model_id"] for request in requests if "vehicle_model_id" in request})
+            vehicle_cover_details = await PolicyDetailRepository.get_vehicle_covers_by_ids(vehicle_covers)
+        except Exception as e:
+            logger.exception(f"Exception encounter {e} while fetching records.")
+            raise DatabaseConnectionException(logger.name, f"Exception encounter {e} while fetching records.")
+
+        policy_dicts = []
+        for request, policy_summary_request in zip(requests, policy_summary_requests):
+            policy_dict = {}
+            for key, value in request.items():
+                if key == "geo_extension_ids":
+                    geo_cities = records[(GeoExtension, "id")]
+                    policy_dict["geo_extension"] = ", ".join(
+                        geo_cities[city_id].name for city_id in geo_extension_ids[value] if city_id in geo_cities)
+                    continue
+                if key == "vehicle_cover_id":
+                    policy_dict["vehicle_cover"] = vehicle_cover_details.get(
+                        (value, policy_summary_request.get("insurer_code")))
+                    continue
+                if key == "prev_vehicle_cover_id":
+                    policy_dict["prev_vehicle_cover"] = vehicle_cover_details.get((value, None))
+                    continue
+                if key == "vehicle_model_id":
+                    policy_dict["oem_name"] = oem_names.get(value)
+                model_detail = records[(cls.model_dict.get(key), cls.summary_column(key, value))].get(value)
+                policy_dict[key.replace("_id", "").replace("_code", "")] = model_detail
+            policy_dicts.append(policy_dict)
+        return policy_dicts
+
     @classmethod
     async def get_policy_details(cls, details, service_address=None, gstin_number=None):
         summary_details = {}
@@ -236,10 +304,12 @@ class AddonDetailRepository:
                 continue
             if key in cls.schema_dict:
                 schema_class = cls.schema_dict.get(key)
+                # a copy, the instance is shared across requests and would be flushed with these attributes
+                value = dict(value.__dict__)
                 if key == 'insurer':
-                    value.servicing_office_address = service_address
-                    value.gstin_number = gstin_number
-                validated_data = schema_class(**value.__dict__)
+                    value["servicing_office_address"] = service_address
+                    value["gstin_number"] = gstin_number
+                validated_data = schema_class(**value)
                 summary_details.update({
                     key: validated_data
                 })
@@ -1,6 +1,6 @@
 import datetime
 import logging
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
 
 from rb_utils.database import sqldb
 from sqlalchemy import select
@@ -244,4 +244,64 @@ class PolicyDetailRepository:
     async def get_oem_name(cls,vehicle_model_id: int):
         oem_id = (await sqldb.execute(select(VehicleModel.oem_id).where(VehicleModel.id==vehicle_model_id))).scalars().first()
         oem_name =  (await sqldb.execute(select(Oem.name).where(Oem.id==oem_id))).scalars().first()
-        return oem_name
\ No newline at end of file
+        return oem_name
+
+    @classmethod
+    async def get_oem_names(cls, vehicle_model_ids: Set[int]) -> Dict[int, str]:
+        """`get_oem_name` of every vehicle model, by vehicle model id, read with a single query."""
+        if not vehicle_model_ids:
+            return {}
+        query = select(VehicleModel.id, Oem.name).join(Oem, Oem.id == VehicleModel.oem_id).where(
+            VehicleModel.id.in_(vehicle_model_ids))
+        return {vehicle_model_id: oem_name for vehicle_model_id, oem_name in (await sqldb.execute(query)).all()}
+
+    @classmethod
+    async def get_vehicle_covers_by_ids(cls, vehicle_covers: Set[Tuple[int, Optional[str]]]) \
+            -> Dict[Tuple[int, Optional[str]], VehicleCoverByIdResponse]:
+        """
+        `get_vehicle_cover_by_id` of every (vehicle cover id, insurer code) pair, by pair, read with two queries
+        whatever the number of pairs. A pair whose vehicle cover, or insurer vehicle cover, is not found is left
+        out instead of failing every other one.
+        """
+        if not vehicle_covers:
+            return {}
+        vehicle_cover_ids = {vehicle_cover_id for vehicle_cover_id, _ in vehicle_covers}
+        insurer_codes = {insurer_code for _, insurer_code in vehicle_covers if insurer_code}
+        query = select(PolicyTypeVehicleCoverMapping, VehicleCover).join(
+            VehicleCover, VehicleCover.id == PolicyTypeVehicleCoverMapping.vehicle_cover_id).where(
+            PolicyTypeVehicleCoverMapping.id.in_(vehicle_cover_ids))
+        vehicle_cover_data = {policy_type_vehicle_cover.id: (policy_type_vehicle_cover, vehicle_cover)
+                              for policy_type_vehicle_cover, vehicle_cover in (await sqldb.execute(query)).all()}
+        insurer_vehicle_covers = {}
+        if insurer_codes:
+            insurer_vehicle_cover = select(InsurerVehicleCoverMapping).filter(
+                InsurerVehicleCoverMapping.is_active.is_(True),
+                InsurerVehicleCoverMapping.policy_type_vehicle_cover_id.in_(vehicle_cover_ids),
+                InsurerVehicleCoverMapping.insurer_code.in_(insurer_codes))
+            for insurer_vehicle_cover_obj in (await sqldb.execute(insurer_vehicle_cover)).scalars().all():
+                insurer_vehicle_covers.setdefault((insurer_vehicle_cover_obj.policy_type_vehicle_cover_id,
+                                                   insurer_vehicle_cover_obj.insurer_code), insurer_vehicle_cover_obj)
+
+        response = {}
+        for vehicle_cover_id, insurer_code in vehicle_covers:
+            if vehicle_cover_id not in vehicle_cover_data:
+                continue
+            policy_type_vehicle_cover_by_id, vehicle_cover = vehicle_cover_data[vehicle_cover_id]
+            vehicle_cover_response = {
+                "id": vehicle_cover.id,
+                "name": vehicle_cover.name,
+                "policy_type_id": policy_type_vehicle_cover_by_id.policy_type_id,
+                "vehicle_class_id": policy_type_vehicle_cover_by_id.vehicle_class_id,
+                "vehicle_type_id": policy_type_vehicle_cover_by_id.vehicle_type_id,
+                "od_tenure": vehicle_cover.od_tenure,
+                "tp_tenure": vehicle_cover.tp_tenure
+            }
+            if insurer_code:
+                insurer_vehicle_cover_obj = insurer_vehicle_covers.get((vehicle_cover_id, insurer_code))
+                if insurer_vehicle_cover_obj is None:
+                    continue
+                vehicle_cover_response.update({"full_name": insurer_vehicle_cover_obj.full_name,
+                                               "insurer_code": insurer_vehicle_cover_obj.insurer_code,
+                                               "uin": insurer_vehicle_cover_obj.uin})
+            response[(vehicle_cover_id, insurer_code)] = VehicleCoverByIdResponse(**vehicle_cover_response)
+        return response
@@ -42,3 +42,11 @@ PAYMENT_LIST_URL = environ.get("PAYMENT_LIST_URL", default="http://muneem.sleepd
 USER_DETAILS_URL = environ.get("USER_DETAILS_URL", default="http://auth.sleepdev.renewbuy.in/api/v1/get_user_details/")
 USER_DETAILS_UPDATE_URL = environ.get("USER_DETAILS_UPDATE_URL", default="http://auth.sleepdev.renewbuy.in/api/v1"
                                                                          "/edit_user_detail/")
+
+# master data cache of the list endpoints, the ttl bounds how long a write through another worker is not seen
+MASTER_DATA_CACHE_ENABLED = environ.get("MASTER_DATA_CACHE_ENABLED", default="true").lower() == "true"
+MASTER_DATA_CACHE_TTL = float(environ.get("MASTER_DATA_CACHE_TTL", default="300"))
+# entries kept per worker, the least recently used one is dropped past it
+MASTER_DATA_CACHE_MAX_SIZE = int(environ.get("MASTER_DATA_CACHE_MAX_SIZE", default="2048"))
+# Cache-Control of the master data responses, no-cache lets clients keep them and revalidate with their ETag
+MASTER_DATA_CACHE_CONTROL = environ.get("MASTER_DATA_CACHE_CONTROL", default="no-cache")
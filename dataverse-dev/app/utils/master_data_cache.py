@@ -0,0 +1,210 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import itertools
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.settings import MASTER_DATA_CACHE_CONTROL, MASTER_DATA_CACHE_ENABLED, MASTER_DATA_CACHE_MAX_SIZE, \
+    MASTER_DATA_CACHE_TTL
+
+
+def table_name(table) -> str:
+    return table if isinstance(table, str) else table.__tablename__
+
+
+def render(content) -> Tuple[bytes, str]:
+    """The JSON body FastAPI would send for the content and its ETag, a hash of the body."""
+    body = JSONResponse(jsonable_encoder(content)).body
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match holds the ETag or is *, compared weakly as If-None-Match is."""
+    for tag in (if_none_match or "").split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class MasterDataCache:
+    """
+    In process cache of the master data endpoints. Every master table has a version, bumped by `invalidate`
+    whenever a write path wrote it, and an entry is served only while the tables it was read from are at
+    the version they were read at, so a write is seen by the very next read of the worker it went through.
+    An entry also expires after MASTER_DATA_CACHE_TTL seconds, which bounds how long a write made through
+    another worker or straight in the database is not seen. Past MASTER_DATA_CACHE_MAX_SIZE entries the least
+    recently used one is dropped. Concurrent misses at the same table versions share one load, run in its
+    own task so a cancelled request does not cancel it for the others, and failed loads are not cached.
+
+    The write endpoints invalidate the tables they write with `invalidates`, the upload and status endpoints
+    the table they were called for. Writes committed by any other session, sqladmin among them, invalidate
+    the tables they flushed through the session hooks below.
+    """
+    logger = logging.getLogger("app.utils.master_data_cache")
+    versions: Dict[str, int] = defaultdict(int)
+    entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+    in_flight: Dict[Hashable, asyncio.Task] = {}
+    hits: Dict[str, int] = defaultdict(int)
+    misses: Dict[str, int] = defaultdict(int)
+    coalesced: Dict[str, int] = defaultdict(int)
+    evictions: Dict[str, int] = defaultdict(int)
+    not_modified: Dict[str, int] = defaultdict(int)
+
+    @classmethod
+    def version(cls, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(cls.versions[table] for table in tables)
+
+    @classmethod
+    def invalidate(cls, *tables):
+        tables = {table_name(table) for table in tables}
+        for table in tables:
+            cls.versions[table] += 1
+        for key in [key for key, entry in cls.entries.items() if tables.intersection(entry[3])]:
+            cls.entries.pop(key, None)
+        cls.logger.info(f"Master data of {', '.join(sorted(tables))} invalidated.")
+
+    @classmethod
+    async def get_or_load(cls, name: str, tables: Tuple[str, ...], key: Hashable, loader):
+        # the version is read before loading, a miss after a write never joins a load started before it
+        version = cls.version(tables)
+        entry = cls.entries.get((name, key))
+        if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+            cls.entries.move_to_end((name, key))
+            cls.hits[name] += 1
+            return entry[2]
+
+        task = cls.in_flight.get((name, key, version))
+        if task is not None:
+            cls.coalesced[name] += 1
+        else:
+            cls.misses[name] += 1
+            task = asyncio.ensure_future(loader())
+            cls.in_flight[(name, key, version)] = task
+            task.add_done_callback(lambda finished: cls._finish(name, tables, key, version, finished))
+        return await asyncio.shield(task)
+
+    @classmethod
+    def _finish(cls, name: str, tables: Tuple[str, ...], key: Hashable, version: Tuple[int, ...],
+                task: asyncio.Task):
+        if cls.in_flight.get((name, key, version)) is task:
+            del cls.in_flight[(name, key, version)]
+        # the exception reaches every request still waiting, this only marks it retrieved when none is
+        if task.cancelled() or task.exception() is not None:
+            return
+        # a load a write overtook is already stale, it is served to the requests that waited for it only
+        if version != cls.version(tables):
+            return
+        cls.entries[(name, key)] = (version, time.monotonic() + MASTER_DATA_CACHE_TTL, task.result(), tables)
+        cls.entries.move_to_end((name, key))
+        while len(cls.entries) > MASTER_DATA_CACHE_MAX_SIZE:
+            (evicted_name, _), _ = cls.entries.popitem(last=False)
+            cls.evictions[evicted_name] += 1
+
+    @classmethod
+    def cached(cls, name: str, *tables):
+        """
+        Serves a master data endpoint from the cache per query parameters, tables are the ones it reads. The
+        response is kept rendered, with a hash of its body as ETag, and a request whose If-None-Match holds
+        the ETag gets an empty 304. A body hash, unlike the table versions of this worker, is the same ETag
+        on every worker.
+        """
+        tables = tuple(table_name(table) for table in tables)
+
+        def decorator(endpoint):
+            signature = inspect.signature(endpoint)
+
+            @functools.wraps(endpoint)
+            async def cached_endpoint(*args, master_data_request: Request, **kwargs):
+                async def load():
+                    return render(await endpoint(*args, **kwargs))
+
+                if MASTER_DATA_CACHE_ENABLED:
+                    key = args + tuple(sorted(kwargs.items()))
+                    body, etag = await cls.get_or_load(name, tables, key, load)
+                else:
+                    body, etag = await load()
+                headers = {"ETag": etag, "Cache-Control": MASTER_DATA_CACHE_CONTROL}
+                if etag_matches(master_data_request.headers.get("if-none-match"), etag):
+                    cls.not_modified[name] += 1
+                    return Response(status_code=304, headers=headers)
+                return Response(body, media_type="application/json", headers=headers)
+
+            # FastAPI resolves the parameters of this signature, the endpoint's and the request
+            cached_endpoint.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("master_data_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)])
+            return cached_endpoint
+
+        return decorator
+
+    @classmethod
+    def invalidates(cls, *tables):
+        """Invalidates the tables a write endpoint writes once it returned, or failed part way through."""
+
+        def decorator(endpoint):
+            @functools.wraps(endpoint)
+            async def writing_endpoint(*args, **kwargs):
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    cls.invalidate(*tables)
+
+            return writing_endpoint
+
+        return decorator
+
+    @classmethod
+    def stats(cls) -> dict:
+        names = sorted(set(cls.hits) | set(cls.misses))
+        hits, misses = sum(cls.hits.values()), sum(cls.misses.values())
+        return {
+            "enabled": MASTER_DATA_CACHE_ENABLED,
+            "ttl": MASTER_DATA_CACHE_TTL,
+            "entries": len(cls.entries),
+            "max_entries": MASTER_DATA_CACHE_MAX_SIZE,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "endpoints": {name: {"hits": cls.hits[name], "misses": cls.misses[name],
+                                 "hit_ratio": round(cls.hits[name] / (cls.hits[name] + cls.misses[name]), 4),
+                                 "coalesced": cls.coalesced[name], "evictions": cls.evictions[name],
+                                 "not_modified": cls.not_modified[name]}
+                          for name in names},
+            "versions": dict(cls.versions),
+        }
+
+
+@event.listens_for(Session, "after_flush")
+def collect_flushed_tables(session, flush_context):
+    written = session.info.setdefault("master_data_tables", set())
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        written.add(table_name(type(instance)))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_executed_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            orm_execute_state.session.info.setdefault("master_data_tables", set()).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_tables(session):
+    written = session.info.pop("master_data_tables", None)
+    if written:
+        MasterDataCache.invalidate(*written)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_tables(session):
+    session.info.pop("master_data_tables", None)
@@ -0,0 +1,136 @@
+import base64
+import json
+import logging
+from typing import Dict, Generic, List, Literal, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from pydantic.generics import GenericModel
+from rb_utils.database import sqldb
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.utils.exceptions import DatabaseConnectionException
+
+T = TypeVar("T")
+
+
+class KeysetParams(BaseModel):
+    size: int = Query(50, ge=1, le=100, description="Page size")
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, left out for the first page")
+    sort_by: str = Query("id", description="Column the rows are sorted by")
+    order: Literal["asc", "desc"] = Query("asc", description="Sort order")
+    search: Optional[str] = Query(None, description="Part of the name, case insensitive")
+    is_active: Optional[bool] = Query(None, description="Only the active, or inactive, rows")
+    with_total: bool = Query(False, description="Include an estimate of the number of matching rows")
+
+
+class KeysetPage(GenericModel, Generic[T]):
+    items: Sequence[T]
+    size: int
+    next_cursor: Optional[str]
+    total: Optional[int]
+
+
+def encode_cursor(params: KeysetParams, value, key) -> str:
+    cursor = json.dumps([params.sort_by, params.order, value, key], default=str)
+    return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
+def decode_cursor(params: KeysetParams) -> Tuple:
+    try:
+        sort_by, order, value, key = json.loads(base64.urlsafe_b64decode(params.cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (sort_by, order) != (params.sort_by, params.order):
+        raise HTTPException(status_code=400, detail="The cursor is of another sort_by or order")
+    return value, key
+
+
+def after_cursor(sort_column, key, value, last_key, descending: bool):
+    """Rows after the (sort value, key) of the cursor in the ordering of `keyset_paginate`, nulls last."""
+    key_after = key < last_key if descending else key > last_key
+    if sort_column is key:
+        return key_after
+    if value is None:
+        return and_(sort_column.is_(None), key_after)
+    return or_(sort_column < value if descending else sort_column > value,
+               and_(sort_column == value, key_after),
+               sort_column.is_(None))
+
+
+class ExplainJson(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a query, its parameters stay bound parameters of the driver."""
+    inherit_cache = False
+
+    def __init__(self, query):
+        self.query = query
+
+
+@compiles(ExplainJson, "postgresql")
+def compile_explain_json(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.query, **kw)
+
+
+async def estimate_total(query) -> int:
+    """
+    The planner's estimate of the rows of the query on PostgreSQL, which is read from the table statistics
+    instead of counting the rows. Other databases count them.
+    """
+    dialect = sqldb.get_engine().dialect
+    if dialect.name != "postgresql":
+        return (await sqldb.execute(select(func.count()).select_from(query.subquery()))).scalar()
+    plan = (await sqldb.execute(ExplainJson(query))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def keyset_paginate(query, params: KeysetParams, key, sortable: Dict[str, object] = None, search=None,
+                          active=None) -> Tuple[List[tuple], Optional[str], Optional[int]]:
+    """
+    Reads the page of the query the params ask for, the rows after the cursor in the order of the sort_by column
+    and then the key, the primary key of the listed table. Only size + 1 rows are read, whatever the size of the
+    table, the one past the page tells whether there is a next page.
+
+    Returns the rows of the page, as tuples of what the query selects, the cursor of the next page, None on the
+    last page, and the estimated total when asked for. sortable maps the sort_by values allowed besides id to
+    their columns, search and active are the columns the search and is_active params filter on.
+    """
+    logger = logging.getLogger("app.utils.pagination")
+    sortable = dict(sortable or {}, id=key)
+    if params.sort_by not in sortable:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of {', '.join(sortable)}")
+    if params.search is not None:
+        if search is None:
+            raise HTTPException(status_code=400, detail="search is not supported on this table")
+        query = query.where(func.lower(search).contains(params.search.lower(), autoescape=True))
+    if params.is_active is not None:
+        if active is None:
+            raise HTTPException(status_code=400, detail="is_active is not supported on this table")
+        query = query.where(active.is_(params.is_active))
+
+    sort_column = sortable[params.sort_by]
+    descending = params.order == "desc"
+    # the sort value and key of every row are selected last, for the cursor of the next page
+    page_query = query.add_columns(sort_column, key)
+    if params.cursor:
+        value, last_key = decode_cursor(params)
+        page_query = page_query.where(after_cursor(sort_column, key, value, last_key, descending))
+    ordering = [key.desc() if descending else key.asc()]
+    if sort_column is not key:
+        ordering.insert(0, (sort_column.desc() if descending else sort_column.asc()).nulls_last())
+    page_query = page_query.order_by(*ordering).limit(params.size + 1)
+    try:
+        rows = (await sqldb.execute(page_query)).all()
+        total = await estimate_total(query) if params.with_total else None
+    except Exception as e:
+        logger.exception(f"Exception encounter {e} while fetching a page of records.")
+        raise DatabaseConnectionException(logger.name, f"Exception encounter {e} while fetching a page of records.")
+
+    next_cursor = None
+    if len(rows) > params.size:
+        rows = rows[:params.size]
+        next_cursor = encode_cursor(params, rows[-1][-2], rows[-1][-1])
+    return [tuple(row)[:-2] for row in rows], next_cursor, total